@@ -0,0 +1,107 @@
+"""
+musas_tagger_bench.py
+
+Benchmark for the ciall_musas_tagger component.
+This shows how the cost of building the tagger and of tagging a document change with the size of the lexicons.
+Since the lexicons are only read when the pipeline is built, the per-document cost should stay flat
+as the lexicon size grows.
+
+Run it like so:
+
+    $ python3 -m benchmarks.musas_tagger_bench
+
+"""
+
+import os
+import random
+import argparse
+import tempfile
+import time
+
+import spacy
+
+import ciall.components.token_attributes
+import ciall.components.musas_tagger
+
+
+POS_TAGS = ["Nc", "Vm", "Aq", "Sp", "Pp", "Dq", "Td", "Rg", "Np"]
+SEM_TAGS = ["A1.1.1", "A3+", "B1", "E4.1-", "F1", "I2.1", "M1", "N3.2", "S2mf", "T1.1.1", "X2.4", "Z5"]
+
+
+def random_word(rng, length=7):
+    return "".join(rng.choice("abcdefghilmnoprstuáéíóú") for _ in range(length))
+
+
+def write_sw_lexicon(path, num_entries, rng):
+    with open(path, "w", encoding="utf-8") as fout:
+        fout.write("lemma\tpos\tsemantic_tags\n")
+        for i in range(num_entries):
+            tags = " ".join(rng.sample(SEM_TAGS, rng.randint(1, 3)))
+            fout.write("%s%d\t%s\t%s\n" % (random_word(rng), i, rng.choice(POS_TAGS), tags))
+
+
+def write_mw_lexicon(path, num_entries, rng):
+    with open(path, "w", encoding="utf-8") as fout:
+        fout.write("mwe_template\tsemantic_tags\n")
+        for i in range(num_entries):
+            words = ["%s_%s" % (random_word(rng), rng.choice(POS_TAGS)) for _ in range(rng.randint(2, 4))]
+            fout.write("%s%d\t%s\n" % (" ".join(words), i, rng.choice(SEM_TAGS)))
+
+
+def make_docs(nlp, num_docs, doc_length, rng):
+    docs = []
+    for _ in range(num_docs):
+        words = [random_word(rng, 5) for _ in range(doc_length)]
+        doc = spacy.tokens.doc.Doc(vocab=nlp.vocab, words=words, spaces=[True] * doc_length)
+        for token in doc:
+            token.lemma_ = token.text
+            token._.par_short = rng.choice(POS_TAGS)
+        docs.append(doc)
+    return docs
+
+
+def run(sizes, num_docs, doc_length, seed=0):
+    rng = random.Random(seed)
+    print("%10s %12s %19s %14s" % ("entries", "build (s)", "cached build (s)", "per doc (ms)"))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache_dir = os.path.join(tmpdir, "cache")
+        for size in sizes:
+            sw_lexicon = os.path.join(tmpdir, "sw_%d.tsv" % size)
+            mw_lexicon = os.path.join(tmpdir, "mw_%d.tsv" % size)
+            write_sw_lexicon(sw_lexicon, size, rng)
+            write_mw_lexicon(mw_lexicon, max(1, size // 10), rng)
+            config = {'sw_lexicon': sw_lexicon, 'mw_lexicon': mw_lexicon, 'cache_dir': cache_dir}
+
+            # The first build parses the lexicon files and compiles them into the cache
+            nlp = spacy.blank("ga")
+            start = time.perf_counter()
+            nlp.add_pipe("ciall_musas_tagger", config=config)
+            build_time = time.perf_counter() - start
+
+            # The second build loads the compiled lexicons
+            nlp = spacy.blank("ga")
+            start = time.perf_counter()
+            nlp.add_pipe("ciall_musas_tagger", config=config)
+            cached_build_time = time.perf_counter() - start
+
+            docs = make_docs(nlp, num_docs, doc_length, rng)
+            start = time.perf_counter()
+            for doc in docs:
+                nlp(doc)
+            per_doc = (time.perf_counter() - start) / num_docs
+
+            print("%10d %12.3f %19.3f %14.3f" % (size, build_time, cached_build_time, per_doc * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ciall_musas_tagger component")
+    parser.add_argument('--sizes', default="1000,10000,100000",
+                        help="Comma-separated list of single-word lexicon sizes to test.")
+    parser.add_argument('--docs', type=int, default=200, help="The number of documents to tag.")
+    parser.add_argument('--doc-length', type=int, default=20, help="The number of tokens per document.")
+    args = parser.parse_args()
+    run([int(s) for s in args.sizes.split(",")], args.docs, args.doc_length)
+
+
+if __name__ == "__main__":
+    main()
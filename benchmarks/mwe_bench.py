@@ -0,0 +1,105 @@
+"""
+mwe_bench.py
+
+Benchmark for multi-word expression (MWE) matching.
+This shows how the cost of tagging a document changes with the size of the MWE lexicon,
+for the native engine and (for the smaller lexicons) for pymusas.
+Since the native engine walks a trie from each token, its per-document cost should stay flat
+as the MWE lexicon grows.
+
+Run it like so:
+
+    $ python3 -m benchmarks.mwe_bench
+
+"""
+
+import random
+import argparse
+import time
+
+from ciall.utils.native_tagger import NativeTagger
+from benchmarks.musas_tagger_bench import POS_TAGS, SEM_TAGS, random_word
+
+
+def make_mw_lexicon(num_entries, vocab, rng, wildcard_ratio=0.01):
+    mw_lexicon = {}
+    while len(mw_lexicon) < num_entries:
+        words = rng.sample(vocab, rng.randint(2, 4))
+        if rng.random() < wildcard_ratio:
+            template = " ".join("%s_*" % word for word in words)
+        else:
+            template = " ".join("%s_%s" % (word, rng.choice(POS_TAGS)) for word in words)
+        mw_lexicon[template] = [rng.choice(SEM_TAGS)]
+    return mw_lexicon
+
+
+def make_text(mw_lexicon, vocab, length, rng, mwe_ratio=0.1):
+    templates = list(mw_lexicon)
+    tokens, pos_tags = [], []
+    while len(tokens) < length:
+        if rng.random() < mwe_ratio:
+            for token_pos in rng.choice(templates).split():
+                word, pos = token_pos.split("_")
+                tokens.append(word)
+                pos_tags.append(rng.choice(POS_TAGS) if pos == "*" else pos)
+        else:
+            tokens.append(rng.choice(vocab))
+            pos_tags.append(rng.choice(POS_TAGS))
+    return tokens, list(tokens), pos_tags
+
+
+def pymusas_tagger(mw_lexicon):
+    # Imported here so the benchmark can be run without the pymusas comparison
+    from pymusas.rankers.lexicon_entry import ContextualRuleBasedRanker
+    from pymusas.taggers.rules.mwe import MWERule
+    from pymusas.taggers.rule_based import RuleBasedTagger
+    rules = [MWERule(mw_lexicon)]
+    ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments(rules))
+    return RuleBasedTagger(rules, ranker)
+
+
+def time_tagging(tagger, text, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        tagger(*text)
+    return (time.perf_counter() - start) / repeats
+
+
+def run(sizes, doc_length, repeats, pymusas_max_size, wildcard_ratio, seed=0):
+    rng = random.Random(seed)
+    vocab = [random_word(rng, 6) for _ in range(20000)]
+    print("%10s %17s %17s %20s" % ("entries", "native build (s)", "native doc (ms)", "pymusas doc (ms)"))
+    for size in sizes:
+        mw_lexicon = make_mw_lexicon(size, vocab, rng, wildcard_ratio)
+        text = make_text(mw_lexicon, vocab, doc_length, rng)
+
+        start = time.perf_counter()
+        tagger = NativeTagger({}, {}, mw_lexicon)
+        build_time = time.perf_counter() - start
+        native_time = time_tagging(tagger, text, repeats)
+
+        if size <= pymusas_max_size:
+            pymusas_time = "%.3f" % (time_tagging(pymusas_tagger(mw_lexicon), text, 1) * 1000)
+        else:
+            pymusas_time = "-"
+
+        print("%10d %17.3f %17.3f %20s" % (size, build_time, native_time * 1000, pymusas_time))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MWE matching against the MWE lexicon size")
+    parser.add_argument('--sizes', default="1000,10000,100000,500000",
+                        help="Comma-separated list of MWE lexicon sizes to test.")
+    parser.add_argument('--doc-length', type=int, default=5000, help="The number of tokens in the document.")
+    parser.add_argument('--repeats', type=int, default=5, help="The number of times to tag the document.")
+    parser.add_argument('--pymusas-max-size', type=int, default=10000,
+                        help="The largest lexicon to time pymusas on (it gets slow).")
+    parser.add_argument('--wildcard-ratio', type=float, default=0.01,
+                        help="The proportion of MWE templates that contain wildcards.")
+    args = parser.parse_args()
+    run([int(s) for s in args.sizes.split(",")], args.doc_length, args.repeats, args.pymusas_max_size,
+        args.wildcard_ratio)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+pos2par_bench.py
+
+Benchmark for converting the morphological tags of cg3 input into PAROLE tags (ciall.utils.pos2par).
+A text only has a few hundred distinct sets of morphological tags, so with the pos2par() cache
+the cost of the conversion should collapse to a lookup per reading.
+
+By default a cg3 text is generated from a set of real readings, with the tag sets following a
+Zipf-like distribution. A real cg3 file can be given instead with --cg3.
+
+Run it like so:
+
+    $ python3 -m benchmarks.pos2par_bench
+
+"""
+
+import io
+import random
+import argparse
+import time
+
+import spacy
+
+from ciall.utils import cg3
+from ciall.utils import pos2par
+
+
+# Readings as the Irish cg3 parser outputs them: (token, lemma, morphological tags)
+READINGS = [
+    ("an", "an", "Art Sg Def"),
+    ("na", "an", "Art Pl Def"),
+    ("na", "an", "Art Sg Fem Gen"),
+    ("agus", "agus", "Conj Coord"),
+    ("go", "go", "Conj Subord"),
+    ("i", "i", "Prep Simp"),
+    ("ar", "ar", "Prep Simp"),
+    ("leis", "le", "Prep Simp DefArt"),
+    ("tar", "tar", "Prep Cmpd"),
+    ("a", "a", "Prep Poss 3P Sg Fem"),
+    ("agam", "ag", "Pron Prep 1P Sg"),
+    ("mé", "mé", "Pron Pers 1P Sg"),
+    ("sé", "sé", "Pron Pers 3P Sg Masc Sbj"),
+    ("é", "é", "Pron Pers 3P Sg Masc"),
+    ("seo", "seo", "Pron Dem"),
+    ("aon", "aon", "Det Qty Idf"),
+    ("sin", "sin", "Det Dem"),
+    ("is", "is", "Cop Pres"),
+    ("níl", "bí", "Verb VI PresInd Neg"),
+    ("bhuail", "buail", "Verb VTI PastInd Len"),
+    ("rachaidh", "téigh", "Verb VI FutInd"),
+    ("déanfar", "déan", "Verb VD FutInd Auto"),
+    ("ndeachaigh", "téigh", "Verb VI PastInd Dep Ecl"),
+    ("fear", "fear", "Noun Masc Com Sg"),
+    ("fir", "fear", "Noun Masc Gen Sg"),
+    ("bhfear", "fear", "Noun Masc Gen Pl Ecl"),
+    ("mná", "bean", "Noun Fem Com Pl"),
+    ("mbeann", "beann", "Noun Fem Com Pl Ecl"),
+    ("léachtóir", "léachtóir", "Noun Masc Com Sg Ecl"),
+    ("scrúduithe", "scrúdú", "Noun Masc Com Pl Len"),
+    ("Éireann", "Éire", "Prop Noun Fem Gen Sg"),
+    ("Éirinn", "Éire", "Prop Noun Fem Dat Sg"),
+    ("déanamh", "déan", "Verbal Noun"),
+    ("mór", "mór", "Adj Com NotSlen Sg"),
+    ("móra", "mór", "Adj Com NotSlen Pl"),
+    ("inné", "inné", "Adj Base"),
+    ("briste", "bris", "Adj Verbal"),
+    ("thuas", "thuas", "Adv Dir"),
+    ("anseo", "anseo", "Adv Loc"),
+    ("a", "a", "Part Vb Rel Direct"),
+    ("ní", "ní", "Part Vb Neg"),
+    ("níor", "níor", "Part Vb Neg Q Past"),
+    ("dó", "dó", "Num Card"),
+    ("dara", "dara", "Num Ord"),
+    ("beirt", "beirt", "Num Pers"),
+    ("ó", "ó", "Itj"),
+    ("computer", "computer", "Foreign English Noun"),
+    ("xyzzy", "xyzzy", "Noun Guess"),
+    (",", ",", "Punct"),
+    (".", ".", "Punct Fin"),
+]
+
+
+def make_cg3_text(num_tokens, rng, max_readings=3):
+    # A Zipf-like distribution, with the first readings the most common
+    weights = [1 / rank for rank in range(1, len(READINGS) + 1)]
+    lines = []
+    for i in range(num_tokens):
+        readings = rng.choices(READINGS, weights, k=rng.randint(1, max_readings))
+        lines.append('"<%s>"\n' % readings[0][0])
+        for _, lemma, tags in readings:
+            lines.append('\t"%s" %s @SUBJ #%d->0\n' % (lemma, tags, i % 20 + 1))
+    return "".join(lines)
+
+
+def time_parsing(nlp, text, repeats):
+    # Reading the Docs, which converts the first reading of each token
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for _ in cg3.docs_from_cg3_stream(nlp, io.StringIO(text)):
+            pass
+    return (time.perf_counter() - start) / repeats
+
+
+def time_conversion(convert, masks, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for mask in masks:
+            convert(mask)
+    return (time.perf_counter() - start) / repeats
+
+
+def run(text, repeats):
+    nlp = spacy.blank("ga")
+    cg3doc = cg3.CG3Document.from_stream(io.StringIO(text))
+    # The readings' tags, as bitmasks (see ciall.utils.morph_vocab)
+    masks = [match.morph_mask for entry in cg3doc.tokens for match in entry.matches]
+
+    # Without the cache, every reading is converted from scratch
+    uncached_pos2par = pos2par.pos2par_mask.__wrapped__
+    uncached_time = time_conversion(uncached_pos2par, masks, repeats)
+    cg3.pos2par_mask = uncached_pos2par
+    try:
+        uncached_parse_time = time_parsing(nlp, text, repeats)
+    finally:
+        cg3.pos2par_mask = pos2par.pos2par_mask
+
+    pos2par.pos2par_mask.cache_clear()
+    cached_time = time_conversion(pos2par.pos2par_mask, masks, 1)
+    info = pos2par.pos2par_cache_info()
+    cached_parse_time = time_parsing(nlp, text, repeats)
+
+    print("%d tokens, %d readings, %d distinct tag sets, %.2f%% cache hit rate" %
+          (len(cg3doc.tokens), len(masks), info.currsize, info.hits / max(info.hits + info.misses, 1) * 100))
+    print("%10s %17s %17s" % ("", "convert (ms)", "parse (ms)"))
+    print("%10s %17.3f %17.3f" % ("uncached", uncached_time * 1000, uncached_parse_time * 1000))
+    print("%10s %17.3f %17.3f" % ("cached", cached_time * 1000, cached_parse_time * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the conversion of cg3 morphological tags to PAROLE tags")
+    parser.add_argument('--cg3', default=None, help="A cg3 file to parse, instead of a generated one.")
+    parser.add_argument('--num-tokens', type=int, default=100000, help="The number of tokens to generate.")
+    parser.add_argument('--repeats', type=int, default=3, help="The number of times to parse the text.")
+    args = parser.parse_args()
+    if args.cg3 is not None:
+        with open(args.cg3, encoding="utf-8") as fin:
+            text = fin.read()
+    else:
+        text = make_cg3_text(args.num_tokens, random.Random(0))
+    run(text, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
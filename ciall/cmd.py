@@ -3,113 +3,247 @@ import os
 import traceback
 import argparse
 import yaml
+from concurrent.futures import ProcessPoolExecutor
 
 from ciall import pipeline
 from ciall.utils import tsv
 from ciall.utils import cg3
-from ciall.components.accuracy import AccuracyReport
+from ciall.utils.accuracy import AccuracyReport
+from ciall.utils.accuracy_cache import AccuracyCache, doc_words
+from ciall.utils.lexicon import file_digest
+from ciall.utils.files import find_files, paths_overlap, OutputSink, DEFAULT_BUFFER_SIZE
+
+
+class PipelineError(Exception):
+    """
+    Raised when an input file can't be read or processed.
+    It's raised instead of exiting, so it can come back from an accuracy worker process,
+    and main() or run_accuracy() print it and return 1.
+    """
+
+    def __init__(self, message: str, details: str):
+        super().__init__(message, details)
+        self.message = message
+        # The traceback of the original exception
+        self.details = details
+
+    def print(self):
+        print(self.message)
+        print(self.details, end="", file=sys.stderr)
 
 
 def main(args, conf):
-    # Gather the input
-    filenames = []
-    instrs = []
+    # Gather the input files, None means STDIN
     if args.infile is None:
-        filenames.append("stdin")
-        instrs.append("\n".join([line for line in sys.stdin]))
+        filenames = [None]
     else:
         if os.path.isdir(args.infile):
-            files = []
-            for file in os.listdir(args.infile):
-                if file.startswith("."):  # Exclude any 'dotfiles' found
-                    continue
-                dirpath = os.path.abspath(args.infile)
-                files.append(os.path.join(dirpath, file))
+            # All the files in the folder and its subfolders, excluding any 'dotfiles' found
+            filenames = find_files(os.path.abspath(args.infile))
         elif os.path.isfile(args.infile):
-            files = [args.infile]
+            filenames = [args.infile]
         else:
             print("Input file doesn't exist: %s" % args.infile)
             return 1
-        for file in files:
-            with open(file, "r") as fin:
-                try:
-                    filenames.append(file)
-                    instrs.append(fin.read())
-                except Exception:
-                    print("When reading %s got exception:" % file)
-                    traceback.print_exc()
-                    exit(1)
-    if (len(instrs) == 0) or (instrs[0] == ""):
+    if len(filenames) == 0:
         print("No input data!")
         return 1
 
-    # For saving accuracy reports
-    accuracy_reports = []
+    if args.accuracy:
+        return run_accuracy(args, conf, filenames)
 
     # Make the pipeline
     nlp = pipeline.make_pipeline(conf, accuracy=args.accuracy)
 
-    # Process each input string
-    for filename, instr in zip(filenames, instrs):
-        # Make the Doc object from the input
-        if isinstance(conf.get('input'), dict) and (conf['input'].get('format') == "tsv"):
-            # if input format is tsv parse it into a doc first
-            infields = conf['input'].get('fields', None)
+    # Get the output fields
+    if isinstance(conf.get('output'), dict) and conf['output'].get('fields') is not None:
+        writer = tsv.TSVWriter(conf['output']['fields'].split("|"))
+    else:
+        print("Must specify configuration value output.fields as a |-separated list of fields to output")
+        return 1
+
+    # Make the output sink, which is opened once for the whole run
+    if args.outdir is not None and args.infile is None:
+        print("--outdir can only be used with --infile")
+        return 1
+    indir = os.path.abspath(args.infile) if args.infile is not None and os.path.isdir(args.infile) else None
+    sink = OutputSink(outfile=args.outfile, outdir=args.outdir, indir=indir,
+                      buffer_size=args.buffer_size, fsync_every=args.fsync_every)
+    # The outputs mustn't overwrite the inputs, or be read as inputs
+    if args.outdir is not None and indir is not None and paths_overlap(args.outdir, indir):
+        print("--outdir can't be the same as, inside or around the --infile folder")
+        return 1
+    if args.outdir is not None:
+        output_paths = [sink.output_path(filename) for filename in filenames]
+    else:
+        output_paths = [args.outfile] if args.outfile is not None else []
+    input_paths = {os.path.realpath(filename) for filename in filenames if filename is not None}
+    if any(os.path.realpath(output_path) in input_paths for output_path in output_paths):
+        print("The output would overwrite an input file")
+        return 1
+
+    # Process each document in each input file, one at a time
+    num_docs = 0
+    try:
+        for filename in filenames:
+            for doc in read_docs(nlp, conf, filename, args.accuracy):
+                num_docs += 1
+                doc = process(nlp, filename, doc)
+
+                # Write the output, the output file is only opened once the first document has been read
+                writer.write(doc, sink.stream(filename))
+                sink.doc_written()
+    except PipelineError as e:
+        e.print()
+        return 1
+    finally:
+        # Close the output
+        sink.close()
+
+    if num_docs == 0:
+        print("No input data!")
+        return 1
+
+    return 0
+
+
+def run_accuracy(args, conf, filenames):
+    """
+    Runs the accuracy tests on the input files and prints the combined report.
+    Reports are reused from the accuracy cache where possible, and the other files are evaluated,
+    in parallel if there are several jobs.
+    """
+    cache = None
+    if args.accuracy_cache is not None:
+        if None in filenames:
+            print("--accuracy-cache can only be used with --infile")
+            return 1
+        cache = AccuracyCache(args.accuracy_cache, conf, lemma_diff=args.lemma_diff)
+        digests = [file_digest(filename) for filename in filenames]
+    elif args.lemma_diff:
+        print("--lemma-diff can only be used with --accuracy-cache")
+        return 1
+
+    # The reports for each file, None until they've been evaluated
+    accuracy_reports = [cache.get(digest) for digest in digests] if cache is not None else [None] * len(filenames)
+    todo = [i for i, report in enumerate(accuracy_reports) if report is None]
+    with_words = cache is not None and cache.lemma_diff
+
+    try:
+        if args.jobs > 1 and len(todo) > 1:
+            # Evaluate the files in parallel, each worker making its own pipeline and reading its own files
+            with ProcessPoolExecutor(max_workers=min(args.jobs, len(todo)),
+                                     initializer=_init_accuracy_worker, initargs=(conf,)) as executor:
+                try:
+                    results = list(executor.map(_accuracy_result, [filenames[i] for i in todo],
+                                                [with_words] * len(todo)))
+                except PipelineError:
+                    # Don't start on the files that are still waiting
+                    executor.shutdown(cancel_futures=True)
+                    raise
+        elif todo:
+            _init_accuracy_worker(conf)
+            results = [_accuracy_result(filenames[i], with_words) for i in todo]
+        else:
+            results = []
+    except PipelineError as e:
+        e.print()
+        return 1
+
+    for i, (report, words) in zip(todo, results):
+        accuracy_reports[i] = report
+        if cache is not None:
+            cache.put(digests[i], report, words)
+
+    if cache is not None:
+        cache.save()
+        print("Reused %s of %s file report(s) from the accuracy cache" % (cache.hits, len(filenames)),
+              file=sys.stderr)
+
+    # Print the combined accuracy report
+    # The reports are combined in file order, so the figures don't depend on the number of jobs or the cache
+    # The totals are only worked out once there are tokens, as they're divided by the number of tokens
+    combined_accuracy_report = AccuracyReport()
+    for report in accuracy_reports:
+        combined_accuracy_report.merge(report)
+    if combined_accuracy_report.num_tokens == 0:
+        print("No input data!")
+        return 1
+    combined_accuracy_report.calculate_totals()
+    print(combined_accuracy_report.report_str)
+    if args.histogram:
+        print(combined_accuracy_report.histogram_str)
+    return 0
+
+
+def read_docs(nlp, conf, filename, accuracy):
+    """
+    Yields the Doc objects from an input file (or STDIN if filename is None), one document at a time.
+    Raises a PipelineError if there's an error reading the input.
+    """
+    input_conf = conf['input'] if isinstance(conf.get('input'), dict) else {}
+    fin = sys.stdin if filename is None else open(filename, "r")
+    try:
+        if input_conf.get('format') == "tsv":
+            # if input format is tsv parse it into docs first
+            infields = input_conf.get('fields', None)
             if infields:
                 fields = infields.split("|")
             else:
                 fields = []
-            try:
-                doc = tsv.doc_from_tsv(nlp, instr, fields=fields, accuracy=args.accuracy)
-            except Exception:
-                print("When reading %s got exception:" % filename)
-                traceback.print_exc()
-                exit(1)
-        elif isinstance(conf.get('input'), dict) and (conf['input'].get('format') == "cg3"):
-            try:
-                doc = cg3.doc_from_cg3(nlp, instr)
-            except Exception:
-                print("When reading %s got exception:" % filename)
-                traceback.print_exc()
-                exit(1)
-
-        # Run the pipeline
-        try:
-            doc = nlp(doc)
-        except Exception:
-            print("When processing %s got exception:" % filename)
-            traceback.print_exc()
-            exit(1)
-
-        # Save the accuracy report
-        if args.accuracy:
-            accuracy_reports.append(doc._.accuracy_report)
-        else: # Print the output
-            # Make the output stream
-            if args.outfile is None:
-                outstr = sys.stdout
-            else:
-                # In the case of multiple input files, append mode ('a') means the outputs will all be in the same file
-                outstr = open(args.outfile, "a")
+            yield from tsv.docs_from_tsv_stream(nlp, fin, fields=fields, accuracy=accuracy,
+                                                doc_boundary=input_conf.get('doc_boundary', "file"))
+        elif input_conf.get('format') == "cg3":
+            yield from cg3.docs_from_cg3_stream(nlp, fin, doc_boundary=input_conf.get('doc_boundary', "file"),
+                                                max_readings=input_conf.get('max_readings'))
+    except Exception:
+        raise PipelineError("When reading %s got exception:" % (filename or "stdin"), traceback.format_exc())
+    finally:
+        if filename is not None:
+            fin.close()
 
-            # Write the output
-            if isinstance(conf.get('output'), dict) and conf['output'].get('fields') is not None:
-                outfields = conf['output']['fields'].split("|")
-            else:
-                print("Must specify configuration value output.fields as a |-separated list of fields to output")
-                return 1
-            outstr.write(tsv.output_tsv(doc, outfields))
 
-            # Close the output
-            if args.outfile is not None:
-                outstr.close()
+def process(nlp, filename, doc):
+    """
+    Runs the pipeline on a Doc object.
+    Raises a PipelineError if there's an error.
+    """
+    try:
+        doc = nlp(doc)
+    except Exception:
+        raise PipelineError("When processing %s got exception:" % (filename or "stdin"), traceback.format_exc())
 
-    if args.accuracy:
-        # Print the combined accuracy report
-        combined_accuracy_report = AccuracyReport.combine_reports(accuracy_reports)
-        print(combined_accuracy_report.report_str)
+    return doc
 
-    return 0
+
+# The config and pipeline used by each accuracy worker process, the pipeline is made once when the worker starts
+_worker_conf = None
+_worker_nlp = None
+
+
+def _init_accuracy_worker(conf):
+    global _worker_conf, _worker_nlp
+    _worker_conf = conf
+    _worker_nlp = pipeline.make_pipeline(conf, accuracy=True)
+
+
+def _accuracy_result(filename, with_words):
+    # Only the file's report (and its words, for the accuracy cache's word index) is sent back to the main process
+    report = AccuracyReport()
+    words = set() if with_words else None
+    for doc in read_docs(_worker_nlp, _worker_conf, filename, True):
+        doc = process(_worker_nlp, filename, doc)
+        report.merge(doc._.accuracy_report)
+        if with_words:
+            words |= doc_words(doc)
+    return report, words
+
+
+def _positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return number
 
 
 # This is separate to make the main() function more testable
@@ -128,16 +262,55 @@ def parse_args_conf():
                         default=None,
                         help="The destination file for output. " \
                              "If unspecified, STDOUT is used.")
+    parser.add_argument('--outdir',
+                        default=None,
+                        help="A folder to write a separate output file for each input file to, " \
+                             "at the same path as the input file has under the --infile folder. " \
+                             "This can't be used with --outfile.")
+    parser.add_argument('--buffer-size',
+                        type=_positive_int,
+                        default=DEFAULT_BUFFER_SIZE,
+                        help="The size of the output file buffer, in bytes. Defaults to %s." % DEFAULT_BUFFER_SIZE)
+    parser.add_argument('--fsync-every',
+                        type=_positive_int,
+                        default=0,
+                        metavar='N',
+                        help="Make sure the output is written to disk after every N documents. " \
+                             "By default this is left to the operating system.")
     parser.add_argument('-A', '--accuracy',
                         action='store_true',
                         default=False,
                         help="Run accuracy tests using the input as a test file. " \
                              "This only works with TSV input. " \
                              "If specified, the output itself is not printed.")
+    parser.add_argument('--histogram',
+                        action='store_true',
+                        default=False,
+                        help="With --accuracy, also print the distribution of match values.")
+    parser.add_argument('-j', '--jobs',
+                        type=_positive_int,
+                        default=1,
+                        help="The number of processes to use for accuracy tests (--accuracy) " \
+                             "on a folder of input files. Defaults to 1.")
+    parser.add_argument('--accuracy-cache',
+                        default=None,
+                        metavar='DIR',
+                        help="A folder to save the accuracy report for each input file in, " \
+                             "so that later accuracy tests only evaluate files that have changed, " \
+                             "or that were tested with a different configuration, lexicons, or ciall version.")
+    parser.add_argument('--lemma-diff',
+                        action='store_true',
+                        default=False,
+                        help="With --accuracy-cache, when the lexicons change only evaluate the files " \
+                             "containing words from the lexicon entries that changed.")
     # TODO: Add this when we find a good way to do logging
     # parser.add_argument('-v', '--verbose', default=False, action='store_true',
     #                     help="When specified, log messages will be sent to STDOUT.")
     args = parser.parse_args()
+    if args.outfile is not None and args.outdir is not None:
+        parser.error("--outfile and --outdir can't be used together")
+    if args.histogram and not args.accuracy:
+        parser.error("--histogram can only be used with --accuracy")
     
     # Parse config
     with open(args.config, 'r') as conf_file:
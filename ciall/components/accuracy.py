@@ -1,101 +1,39 @@
 import spacy
-from spacy.tokens import Token, Doc
+from spacy.tokens import Doc
 from spacy.language import Language
 
-from ciall.utils.musas_tags import CompoundTag, MultiSenseTag
+# AccuracyReport lives in ciall.utils.accuracy so it can be used without spaCy (see ciall.score)
+from ciall.utils.accuracy import AccuracyReport
+from ciall.components.token_attributes import set_column_extension, doc_column
 
 
-Token.set_extension("expected_musas_tag", default=None)
+set_column_extension("expected_musas_tag", lambda: None)
 Doc.set_extension("accuracy_report", default=None)
 
 
-class AccuracyReport(object):
-    def __init__(self):
-        # Initialise members that can then be 
-        self.num_tokens = 0              # The total number of tokens in the doc
-        self.num_z99 = 0                 # The number of tokens with no Semantic Tag matched (Z99: Unmatched)
-        self.num_fully_correct = 0       # The number of tokens with fully correct MUSAS tags
-        self.num_cont_fully_correct = 0  # The number of content word tokens with fully correct MUSAS tags
-        self.all_match_values = []       # match values for all tokens
-        self.cont_match_values = []      # match values for content words
-    
-    def add_token(self, par_short: str, musas_tags: list[str], expected_musas_tag: str):
-        # Increment number of tokens
-        self.num_tokens += 1
-
-        # Is it unmatched?
-        if musas_tags[0] == "Z99":
-            self.num_z99 += 1
-
-        # Calculate and save the MUSAS accuracy value
-        # If the expected tag field contains multiple senses, this only uses the first one
-        mv = MultiSenseTag(" ".join(musas_tags)).match(MultiSenseTag(expected_musas_tag).senses[0])
-        self.all_match_values.append(mv)
-
-        # Is it fully correct?
-        if mv == 1.0:
-            self.num_fully_correct += 1
-
-        # If it's a content word, add info to content calculation
-        if par_short[0] in ('N', 'V', 'A', 'R', 'M'):  # content words
-            if mv == 1.0:
-                self.num_cont_fully_correct += 1
-            self.cont_match_values.append(mv)
-
-    def calculate_totals(self):
-        self.lexical_coverage = round(((self.num_tokens - self.num_z99) / self.num_tokens) * 100.0, 3)
-
-        self.pc_all_fully_correct = round((self.num_fully_correct / self.num_tokens) * 100, 3)
-        self.pc_cont_fully_correct = round((self.num_cont_fully_correct / len(self.cont_match_values)) * 100, 3)
-
-        self.all_accuracy = sum(self.all_match_values) / len(self.all_match_values)
-        self.pc_all_accuracy = round(self.all_accuracy * 100, 3)
-        self.cont_accuracy = sum(self.cont_match_values) / len(self.cont_match_values)
-        self.pc_cont_accuracy = round(self.cont_accuracy * 100, 3)
-
-    @property
-    def report_str(self):
-        # printed results
-        report_str = "### Accuracy Report\n"
-        report_str += "Num tokens: %s\n" % self.num_tokens
-        report_str += "Lexical coverage: %s%%\n" % self.lexical_coverage
-        report_str += "Fully correct MUSAS tags (all tokens): %s%% (%s token(s))\n" % \
-                      (self.pc_all_fully_correct, self.num_fully_correct)
-        report_str += "Fully correct MUSAS tags (content tokens): %s%% (%s token(s))\n" % \
-                      (self.pc_cont_fully_correct, self.num_cont_fully_correct)
-        report_str += "Overall semantic tag accuracy (all tokens): %s%%\n" % self.pc_all_accuracy
-        report_str += "Overall semantic tag accuracy (content tokens): %s%%\n" % self.pc_cont_accuracy
-        return report_str
-    
-    @classmethod
-    def combine_reports(cls, reports: list[object]):
-        combined_report = AccuracyReport()
-        for report in reports:
-            combined_report.num_tokens += report.num_tokens
-            combined_report.num_z99 += report.num_z99
-            combined_report.num_fully_correct += report.num_fully_correct
-            combined_report.num_cont_fully_correct += report.num_cont_fully_correct
-            combined_report.all_match_values.extend(report.all_match_values)
-            combined_report.cont_match_values.extend(report.cont_match_values)
-        combined_report.calculate_totals()
-        return combined_report
-
-
 # Accuracy reporter
 @Language.component("ciall_accuracy")
 def accuracy_function(doc):
     # Create the report
     report = AccuracyReport()
 
-    # Run through the doc adding all the tokens
-    for token in doc:
-        try:
-            report.add_token(par_short=token._.par_short,
-                            musas_tags=token._.musas_tags,
-                            expected_musas_tag=token._.expected_musas_tag)
-        except Exception:
-            print("problem with token", token.text, token._.par_short, token._.musas_tags)
-            raise
+    # Add all the tokens in the doc
+    try:
+        report.add_tokens(par_shorts=doc_column(doc, "par_short"),
+                          musas_tags_list=[token._.musas_tags for token in doc],
+                          expected_musas_tags=doc_column(doc, "expected_musas_tag"))
+    except Exception:
+        # Go through the tokens one by one to find the one with the problem
+        report = AccuracyReport()
+        for token in doc:
+            try:
+                report.add_token(par_short=token._.par_short,
+                                musas_tags=token._.musas_tags,
+                                expected_musas_tag=token._.expected_musas_tag)
+            except Exception:
+                print("problem with token", token.text, token._.par_short, token._.musas_tags)
+                raise
+        raise
 
     # Calculate totals
     report.calculate_totals()
@@ -32,7 +32,7 @@ def doc_tags_function(doc):
     # and calculate the number for each USAS 'field'
     for token in doc:
         if token._.musas_tags and len(token._.musas_tags) == 1:
-            ct = CompoundTag(token._.musas_tags[0])
+            ct = CompoundTag.parse(token._.musas_tags[0])
             if len(ct.tags) == 1:
                 t = ct.tags[0]
                 #print(token._.musas_tags[0], t.field)
@@ -57,7 +57,7 @@ def doc_tags_function(doc):
             def sortfunc(compound_tag):
                 if compound_tag == '':
                     return -1000
-                ct = CompoundTag(compound_tag)
+                ct = CompoundTag.parse(compound_tag)
                 fs = [t.field for t in ct.tags]
                 fstats = [doc._.musas_field_stats[f] for f in fs if f in doc._.musas_field_stats]
                 if len(fstats) > 0:
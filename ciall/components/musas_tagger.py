@@ -1,12 +1,15 @@
 import os
 import csv
+import time
+import logging
+import threading
+from typing import Optional
 from io import StringIO
 
 import spacy
 from spacy.language import Language
 from spacy.tokens import Token, Doc
 
-from pymusas.lexicon_collection import LexiconCollection, MWELexiconCollection
 from pymusas.rankers.lexicon_entry import ContextualRuleBasedRanker
 from pymusas.taggers.rules.single_word import SingleWordRule
 from pymusas.taggers.rules.mwe import MWERule
@@ -14,6 +17,10 @@ from pymusas.taggers.rule_based import RuleBasedTagger
 # from pymusas.spacy_api.taggers.rule_based import RuleBasedTagger as SpacyRuleBasedTagger  # Not used directly
 
 from ciall.utils.musas_tags import MultiSenseTag
+from ciall.utils.lexicon import load_sw_lexicon, load_mw_lexicon, load_mw_trie
+from ciall.utils.lemmafreq import use_lemmafreq_cache
+from ciall.utils.native_tagger import NativeTagger
+from ciall.components.token_attributes import doc_column
 
 
 # This is a duplicate of 'pymusas_tags' set by pymusas' spacy RuleBasedTagger.__init__() function
@@ -31,7 +38,7 @@ def pymusas_desc_str(token):
     if token._.musas_tags is None:
         desc_str = ""
     else:
-        mst = MultiSenseTag(token._.musas_tags[0])
+        mst = MultiSenseTag.parse(token._.musas_tags[0])
         desc_str = mst.senses[0].description
     return desc_str
 Token.set_extension("musas_desc_str", method=pymusas_desc_str)
@@ -98,16 +105,28 @@ WILDCARD_LEXICON = {
 }
 
 
+# The available tagging engines
+ENGINES = ("pymusas", "native")
+
+logger = logging.getLogger(__name__)
+
+
 # The PyMUSAS component factory
-@Language.factory("ciall_musas_tagger", default_config={"sw_lexicon": None, "mw_lexicon": None})
-def create_musas_tagger_component(nlp: Language, name: str, sw_lexicon: str, mw_lexicon: str):
-    return MUSASTagger(nlp, sw_lexicon, mw_lexicon)
+@Language.factory("ciall_musas_tagger", default_config={"sw_lexicon": None, "mw_lexicon": None, "engine": "pymusas",
+                                                        "lexicon_cache": False, "cache_dir": None,
+                                                        "result_cache_size": 0, "watch_lexicons": False})
+def create_musas_tagger_component(nlp: Language, name: str, sw_lexicon: str, mw_lexicon: str, engine: str,
+                                  lexicon_cache: bool, cache_dir: Optional[str], result_cache_size: int,
+                                  watch_lexicons: bool):
+    return MUSASTagger(nlp, sw_lexicon, mw_lexicon, engine=engine, lexicon_cache=lexicon_cache, cache_dir=cache_dir,
+                       result_cache_size=result_cache_size, watch_lexicons=watch_lexicons)
 
 
 # The PyMUSAS pipeline component
 class MUSASTagger:
 
-    def __init__(self, nlp: Language, sw_lexicon = None, mw_lexicon = None):
+    def __init__(self, nlp: Language, sw_lexicon = None, mw_lexicon = None, engine = "pymusas",
+                 lexicon_cache = False, cache_dir = None, result_cache_size = 0, watch_lexicons = False):
         if sw_lexicon is None:
             raise TypeError("sw_lexicon must be a file path")
         elif os.path.isfile(sw_lexicon):
@@ -124,6 +143,133 @@ class MUSASTagger:
 
         # self.wc_lexicon = ""
 
+        # Which tagger to use:
+        # - pymusas: pymusas' RuleBasedTagger, which ranks token-based matches above lemma-based ones
+        # - native: ciall's NativeTagger, which ranks lemma-based matches above token-based ones
+        if engine not in ENGINES:
+            raise TypeError("engine must be one of %s, got '%s'" % (ENGINES, engine))
+        self.engine = engine
+
+        # With lexicon_cache on, compiled copies of the lexicons are kept in cache_dir,
+        # so they don't need to be parsed on every run
+        self.lexicon_cache = lexicon_cache
+        self.cache_dir = cache_dir
+        if lexicon_cache:
+            # The lemma frequencies that the cg3 reader sorts readings by are kept in the same cache
+            use_lemmafreq_cache(cache_dir)
+
+        # The native engine can keep the results for the most frequent words in a LRU cache of this size
+        if result_cache_size < 0:
+            raise TypeError("result_cache_size must be 0 or more, got %s" % result_cache_size)
+        if result_cache_size > 0 and engine != "native":
+            raise TypeError("result_cache_size can only be used with the native engine")
+        self.result_cache_size = result_cache_size
+
+        # If watch_lexicons is True, the lexicons are reloaded in the background when the files change
+        self.watch_lexicons = watch_lexicons
+        self.reload_metrics = {}
+        self._loaded_lexicon_state = None
+        # Only one reload (a read, build and swap) runs at a time, so a slower, older build can't replace a newer one
+        self._reload_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._reload_thread = None
+
+        # Build the tagger once, it is re-used for every Doc until the lexicons are reloaded
+        self.tagger = None
+        self._reload()
+
+    def _lexicon_state(self):
+        """
+        Returns the modification times and sizes of the lexicon files, or None if they can't be read
+        """
+        try:
+            return tuple((stat.st_mtime_ns, stat.st_size)
+                         for stat in (os.stat(self.sw_lexicon), os.stat(self.mw_lexicon)))
+        except OSError:
+            return None
+
+    def reload(self, background: bool = False):
+        """
+        Re-reads the lexicon files and swaps in a new tagger.
+        A Doc that is already being tagged carries on with the old tagger, and the next Doc uses the new one.
+
+        If background is True, the new tagger is built in a background thread, and the old tagger is used
+        until it's ready. The thread is returned, so it can be joined. If the background reload fails, the
+        error is logged and the old tagger is kept.
+        """
+        if not background:
+            self._reload()
+            return None
+
+        with self._thread_lock:
+            if self._reload_thread is None or not self._reload_thread.is_alive():
+                self._reload_thread = threading.Thread(target=self._background_reload, daemon=True)
+                self._reload_thread.start()
+            return self._reload_thread
+
+    def _background_reload(self):
+        try:
+            self._reload()
+        except Exception:
+            logger.exception("Failed to reload the lexicons %s and %s, still using the old ones",
+                             self.sw_lexicon, self.mw_lexicon)
+
+    def _reload(self):
+        with self._reload_lock:
+            # The lexicon state is taken first, so any change made during the build is picked up next time.
+            # It's kept even if the build fails, so a broken lexicon isn't re-read until it changes again.
+            self._loaded_lexicon_state = self._lexicon_state()
+
+            start = time.perf_counter()
+            tagger, index_size = self._build_tagger()
+            duration = time.perf_counter() - start
+
+            # Assigning the attribute is atomic, so each Doc is tagged entirely by either the old or the new tagger
+            self.tagger = tagger
+            self.reload_metrics = {
+                'builds': self.reload_metrics.get('builds', 0) + 1,
+                'duration': duration,      # How long the build took, in seconds
+                'index_size': index_size,  # The number of lexicon entries
+            }
+        logger.info("Loaded the lexicons %s and %s in %.3fs (%d entries)",
+                    self.sw_lexicon, self.mw_lexicon, duration, index_size)
+
+    def _check_lexicons(self):
+        # Starts a background reload if the lexicon files have changed since they were loaded
+        if self.watch_lexicons and self._lexicon_state() != self._loaded_lexicon_state:
+            self.reload(background=True)
+
+    def _build_tagger(self):
+        """
+        Returns the tagger and its index size (the number of lexicon entries)
+        """
+        # Single-word lexicon
+        # The file is read once to get both the POS-keyed and the lemma-only lexicons
+        # With the lexicon cache on, these are read-only CompactMaps that all processes share
+        single_lexicon, single_lemma_lexicon = load_sw_lexicon(self.sw_lexicon, self.cache_dir, self.lexicon_cache)
+
+        # Multi-word lexicon
+        mwe_lexicon = load_mw_lexicon(self.mw_lexicon, self.cache_dir, self.lexicon_cache)
+        index_size = len(single_lexicon) + len(single_lemma_lexicon) + len(mwe_lexicon)
+
+        if self.engine == "native":
+            mwe_trie = load_mw_trie(self.mw_lexicon, self.cache_dir, self.lexicon_cache)
+            # The result cache is new and empty whenever the tagger is (re-)built, so it never holds stale results
+            tagger = NativeTagger(single_lexicon, single_lemma_lexicon, mwe_lexicon, self.result_cache_size, mwe_trie)
+            return tagger, index_size
+
+        # pymusas needs its own copy of the lexicons as dicts, so it doesn't get much from the lexicon cache
+        single_lexicon = dict(single_lexicon.items())
+        single_lemma_lexicon = dict(single_lemma_lexicon.items())
+        mwe_lexicon = dict(mwe_lexicon.items())
+        single_rule = SingleWordRule(single_lexicon, single_lemma_lexicon, pos_mapper=None)
+        mwe_rule = MWERule(mwe_lexicon, pos_mapper=None)
+
+        # Build the tagger
+        rules = [single_rule, mwe_rule]  # single and multi word rules
+        ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments(rules))
+        return RuleBasedTagger(rules, ranker), index_size
+
     def __call__(self, doc: Doc):
         """
         This PyMUSAS component is re-implemented here because:
@@ -133,6 +279,7 @@ class MUSASTagger:
         - PyMUSAS ranks token-based matches higher than lemma-based ones. In Irish, single-word matches should
           prioritise lemma-based matches because there are mutations that can lead to mis-matches.
           e.g. 'láir' is the genetive of 'lár' (NOUN, 'centre'), but there is a clash with 'láir' (NOUN, 'mare')
+          The 'native' engine (see ciall.utils.native_tagger) does prioritise lemma-based matches.
 
         A note about the Wildcard lemma lexicon:
         The wildcard lexicon file is formatted like the single-word
@@ -143,26 +290,46 @@ class MUSASTagger:
         This exists because PyMUSAS doesn't do this by default
         """
 
-        # Single-word lexicon
-        single_lexicon = LexiconCollection.from_tsv(self.sw_lexicon)
-        single_lemma_lexicon = LexiconCollection.from_tsv(self.sw_lexicon, include_pos=False)
-        single_rule = SingleWordRule(single_lexicon, single_lemma_lexicon, pos_mapper=None)
+        # Run the tagger
+        self._check_lexicons()
+        tagger_results = self.tagger(*self._tagger_input(doc))
+        self._set_annotations(doc, tagger_results)
+        return doc
 
-        # Multi-word lexicon
-        mwe_lexicon = MWELexiconCollection.from_tsv(self.mw_lexicon)
-        mwe_rule = MWERule(mwe_lexicon, pos_mapper=None)
+    def result_cache_info(self):
+        """
+        Returns the hits, misses, maxsize and currsize of the result cache, or None if it isn't used
+        """
+        if self.engine == "native":
+            return self.tagger.cache_info()
+        return None
 
-        # Build the tagger
-        rules = [single_rule, mwe_rule]  # single and multi word rules
-        ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments(rules))
-        tagger = RuleBasedTagger(rules, ranker)
+    def pipe(self, docs, batch_size: int = 128):
+        """
+        Tags a stream of Docs, e.g. when called by nlp.pipe().
+        With the native engine the Docs are tagged in batches, so repeated words in the batch are only
+        looked up in the lexicon once. The pymusas engine tags one Doc at a time.
+        """
+        for batch in spacy.util.minibatch(docs, size=batch_size):
+            self._check_lexicons()
+            # The whole batch is tagged by the same tagger, even if it's reloaded part way through
+            tagger = self.tagger
+            if self.engine == "native":
+                batch_results = tagger.tag_batch([self._tagger_input(doc) for doc in batch])
+            else:
+                batch_results = [tagger(*self._tagger_input(doc)) for doc in batch]
+            for doc, tagger_results in zip(batch, batch_results):
+                self._set_annotations(doc, tagger_results)
+                yield doc
 
-        # Run the tagger
+    @staticmethod
+    def _tagger_input(doc: Doc) -> tuple[list[str], list[str], list[str]]:
         tokens = [token.text for token in doc]
         lemmas = [token.lemma_ for token in doc]
-        par_tags = [token._.par_short for token in doc]
-        tagger_results = tagger(tokens, lemmas, par_tags)
+        par_tags = doc_column(doc, "par_short")
+        return tokens, lemmas, par_tags
 
+    def _set_annotations(self, doc: Doc, tagger_results: list):
         # Store results
         for (token, result) in zip(doc, tagger_results):
             if token.text.strip() == "":  # do nothing for blank tokens, newlines etc
@@ -183,10 +350,8 @@ class MUSASTagger:
         #         wildcards[par_short] = semantic_tags.split(" ")
 
         # Run wildcard lemma lexicon
-        for token in doc:
-            #print(token, token._.par_short, token._.musas_tags)
-            if token._.par_short in WILDCARD_LEXICON and token._.musas_tags[0] == "Z99":
-                #print(token.text, token._.musas_tags, wildcards[token._.par_short])
-                token._.musas_tags = [WILDCARD_LEXICON[token._.par_short]]
-
-        return doc
\ No newline at end of file
+        for token, par_short in zip(doc, doc_column(doc, "par_short")):
+            #print(token, par_short, token._.musas_tags)
+            if par_short in WILDCARD_LEXICON and token._.musas_tags[0] == "Z99":
+                #print(token.text, token._.musas_tags, wildcards[par_short])
+                token._.musas_tags = [WILDCARD_LEXICON[par_short]]
\ No newline at end of file
@@ -1,13 +1,17 @@
 import spacy
 from spacy.language import Language
 
+from ciall.components.token_attributes import doc_column, doc_morph_masks
+from ciall.utils.morph_vocab import MORPH_VOCAB
+
 
 PAR_TAG_PROP_NOUN = "Np"
-MORPH_TAG_PERS = "Pers"
-MORPH_TAG_PNAME = "PName"
-MORPH_TAG_PERSNAME = "PersName"
-MORPH_TAG_FAM = "Fam"
-MORPH_TAG_PLACE = "Place"
+# The bits of the morphological tags (see ciall.utils.morph_vocab)
+MORPH_TAG_PERS = MORPH_VOCAB.intern("Pers")
+MORPH_TAG_PNAME = MORPH_VOCAB.intern("PName")
+MORPH_TAG_PERSNAME = MORPH_VOCAB.intern("PersName")
+MORPH_TAG_FAM = MORPH_VOCAB.intern("Fam")
+MORPH_TAG_PLACE = MORPH_VOCAB.intern("Place")
 PERS_NAME_USAS_TAG = "Z1"
 PLACE_USAS_TAG = "Z2"
 
@@ -20,22 +24,21 @@ def prop_nouns_function(doc):
     pipeline to re-assign tokens with Z0 tags to either Z1 (Personal names) or Z2 (Geographical names) where it can.
     """
 
-    for token in doc:
-        if token._.par_short == PAR_TAG_PROP_NOUN:
-            #print(token.text, token._.morph_tags)
+    for token, par_short, morph_mask in zip(doc, doc_column(doc, "par_short"), doc_morph_masks(doc)):
+        if par_short == PAR_TAG_PROP_NOUN:
             tag_to_assign = None
-            if MORPH_TAG_PERS in token._.morph_tags:  # Personal name - Z1
+            if morph_mask & MORPH_TAG_PERS:  # Personal name - Z1
                 # This is an old way of tagging Personal names
                 tag_to_assign = PERS_NAME_USAS_TAG
-            elif MORPH_TAG_PNAME in token._.morph_tags:  # Personal name - Z1
+            elif morph_mask & MORPH_TAG_PNAME:  # Personal name - Z1
                 # This is the new way of tagging Personal names
                 tag_to_assign = PERS_NAME_USAS_TAG
-            elif MORPH_TAG_PERSNAME in token._.morph_tags:  # Personal name - Z1
+            elif morph_mask & MORPH_TAG_PERSNAME:  # Personal name - Z1
                 # This is the new way of tagging Personal names
                 tag_to_assign = PERS_NAME_USAS_TAG
-            elif MORPH_TAG_FAM in token._.morph_tags:  # Family name - Z1
+            elif morph_mask & MORPH_TAG_FAM:  # Family name - Z1
                 tag_to_assign = PERS_NAME_USAS_TAG
-            elif MORPH_TAG_PLACE in token._.morph_tags:  # Placename - Z2
+            elif morph_mask & MORPH_TAG_PLACE:  # Placename - Z2
                 tag_to_assign = PLACE_USAS_TAG
 
             if tag_to_assign != None:
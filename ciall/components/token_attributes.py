@@ -1,9 +1,115 @@
-from spacy.tokens import Token
+import warnings
+
+from spacy.tokens import Token, Doc
+
+from ciall.utils.morph_vocab import MORPH_VOCAB
+
+
+# Token attributes that come from the input are stored in doc-level columns, e.g. doc._.par_short_column,
+# which are lists with a value for each token (or None if the attribute hasn't been set).
+# This means a Doc can be made from the columns of the input in one go, and components can read a whole column.
+# Each one is also a Token extension, e.g. token._.par_short, which reads and writes the token's value in the column.
+#
+# spaCy doesn't know about the columns, so they're lost when a Span is made into a Doc (Span.as_doc()), and
+# Doc.from_docs() skips them with a warning (W101). Use doc_from_docs() below to join Docs and keep their columns.
+COLUMN_DEFAULTS = {}
+
+# The types of default values that can be changed in place
+MUTABLE_DEFAULTS = (list, dict, set)
+
+
+def set_column_extension(name: str, default, derived: list[str] = ()):
+    """
+    Adds the Doc extension '<name>_column' and the Token extension '<name>', which reads and writes it.
+    default is a function which returns the value for tokens that haven't been set.
+    derived are the names of the columns which are worked out from this one, they're cleared when a token is set.
+    """
+    column_name = name + "_column"
+    COLUMN_DEFAULTS[name] = default
+    Doc.set_extension(column_name, default=None)
+    mutable = isinstance(default(), MUTABLE_DEFAULTS)
+
+    def getter(token):
+        column = token.doc._.get(column_name)
+        if column is None:
+            if not mutable:
+                return default()
+            # The value could be changed in place (e.g. token._.ifst_matches.append()), so it has to be kept
+            column = _new_column(token.doc, column_name, default)
+        return column[token.i]
+
+    def setter(token, value):
+        column = token.doc._.get(column_name)
+        if column is None:
+            column = _new_column(token.doc, column_name, default)
+        column[token.i] = value
+        for derived_name in derived:
+            token.doc._.set(derived_name + "_column", None)
+
+    Token.set_extension(name, getter=getter, setter=setter)
+
+
+def _new_column(doc: Doc, column_name: str, default) -> list:
+    column = [default() for _ in range(len(doc))]
+    doc._.set(column_name, column)
+    return column
+
+
+def doc_column(doc: Doc, name: str) -> list:
+    """
+    Returns the values of a column extension (see set_column_extension()) for every token in the doc.
+    The list returned shouldn't be changed, set the token extensions (or the whole column) instead.
+    """
+    column = doc._.get(name + "_column")
+    if column is None:
+        default = COLUMN_DEFAULTS[name]
+        if isinstance(default(), MUTABLE_DEFAULTS):
+            column = _new_column(doc, name + "_column", default)
+        else:
+            column = [default() for _ in range(len(doc))]
+    return column
+
+
+def doc_from_docs(docs: list[Doc]) -> Doc:
+    """
+    Joins Docs together with Doc.from_docs(), keeping their column extensions
+    """
+    with warnings.catch_warnings():
+        # spaCy warns that it skips the columns (W101), they're joined below
+        warnings.filterwarnings("ignore", message=r"\[W101\]")
+        doc = Doc.from_docs(docs)
+    for name in COLUMN_DEFAULTS:
+        if any(d._.get(name + "_column") is not None for d in docs):
+            doc._.set(name + "_column", [value for d in docs for value in doc_column(d, name)])
+    return doc
 
 
 # Extensions to the spacy Token class
-Token.set_extension("ifst_matches", default=[])
-Token.set_extension("morph_tags", default=[])
+set_column_extension("ifst_matches", list)
+# The morphological tags of each token are a tuple interned by MORPH_VOCAB (see ciall.utils.morph_vocab),
+# and their bitmasks are kept in doc._.morph_mask_column, for testing for tags with an AND.
+# When setting doc._.morph_tags_column, set the bitmasks too (or set them to None, to be worked out when needed).
+set_column_extension("morph_tags", tuple, derived=["morph_mask"])
+Doc.set_extension("morph_mask_column", default=None)
+
+
+def doc_morph_masks(doc: Doc) -> list[int]:
+    """
+    Returns the bitmask of the morphological tags (see ciall.utils.morph_vocab) of every token in the doc
+    """
+    masks = doc._.morph_mask_column
+    if masks is None:
+        masks = doc._.morph_mask_column = [MORPH_VOCAB.intern_tags(tags)[1] for tags in doc_column(doc, "morph_tags")]
+    return masks
+
+
+def morph_mask(token):
+    return doc_morph_masks(token.doc)[token.i]
+
+
+Token.set_extension("morph_mask", getter=morph_mask)
+
+
 def morph_tags_str(token):
     if token._.morph_tags is None:
         tags_str = ""
@@ -11,7 +117,7 @@ def morph_tags_str(token):
         tags_str = ",".join(token._.morph_tags)
     return tags_str
 Token.set_extension("morph_tags_str", method=morph_tags_str)
-Token.set_extension("dep_tags", default=[])
+set_column_extension("dep_tags", list)
 def dep_tags_str(token):
     if token._.dep_tags is None:
         tags_str = ""
@@ -19,7 +125,7 @@ def dep_tags_str(token):
         tags_str = ",".join(token._.dep_tags)
     return tags_str
 Token.set_extension("dep_tags_str", method=dep_tags_str)
-Token.set_extension("par_long", default="")
-Token.set_extension("par_short", default="")
+set_column_extension("par_long", str)
+set_column_extension("par_short", str)
 Token.set_extension("parent", default=None)
 Token.set_extension("deptree_tag", default="")
\ No newline at end of file
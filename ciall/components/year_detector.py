@@ -1,6 +1,8 @@
 import spacy
 from spacy.language import Language
 
+from ciall.components.token_attributes import doc_column
+
 
 TIME_PERIOD_USAS_TAG = "T1.3"
 
@@ -12,8 +14,8 @@ def year_detector_function(doc):
     This component depends on the ciall_musas_tagger being in the pipeline before it
     """
 
-    for token in doc:
-        pos_is_number = (token._.par_short[0] == 'M') if token._.par_short else False
+    for token, par_short in zip(doc, doc_column(doc, "par_short")):
+        pos_is_number = (par_short[0] == 'M') if par_short else False
         token_is_numeric = str(token.text).isnumeric()
         
         if pos_is_number and token_is_numeric:
@@ -0,0 +1,192 @@
+"""
+score.py
+
+Scores ciall's TSV output against the pre-tagged and checked (gold standard) TSV files it was made from,
+giving the same report as running the pipeline with --accuracy, but without running the pipeline again.
+This doesn't load spaCy or pymusas, so saved outputs (e.g. from different configurations) can be scored quickly.
+
+The output file must have the USAS field, and the gold file must have the USAS field with the expected tags.
+One of them must have the PAR_SHORT or PAROLE field. Both files are read a line at a time, in step with each other.
+
+Run it like so:
+
+    $ python3 -m ciall.score --output=output.tsv --gold=gold.tsv
+
+or on folders of files, where each output file has the same path under the output folder as its gold file
+(e.g. made with ciall.cmd's --outdir):
+
+    $ python3 -m ciall.score --output=my_outputs/ --gold=my_corpus_of_tsv_texts/
+
+"""
+
+import sys
+import os
+import csv
+import argparse
+import itertools
+
+from ciall.utils.accuracy import AccuracyReport
+from ciall.utils.pos2par import shorten_par_tag
+from ciall.utils.files import find_files
+
+
+# The number of tokens scored together, see AccuracyReport.add_tokens()
+CHUNK_SIZE = 8192
+
+
+def read_tsv(fin, fields: list[str] = None):
+    """
+    Reads the rows of a TSV file one at a time, skipping blank rows and repeated header rows.
+
+    Returns a tuple of the field names and an iterator of rows. As with the pipeline's TSV input,
+    if fields isn't given the first line is the header, and if it is, the first line is only skipped
+    if it's the same as the fields.
+    """
+    # <doc ...> and </doc> document markers are skipped too (see ciall.utils.tsv.DOC_BOUNDARIES)
+    rows = (row for row in csv.reader(fin, delimiter="\t", quoting=csv.QUOTE_NONE)
+            if len(row) > 0 and not row[0].startswith(("<doc", "</doc")))
+    first_row = next(rows, None)
+    if not fields:
+        fields = first_row or []
+    elif first_row is not None and first_row != fields:
+        rows = itertools.chain([first_row], rows)
+    # The header is repeated for each document in the output
+    return fields, (row for row in rows if row != fields)
+
+
+def _column(fields: list[str], field: str):
+    return fields.index(field) if field in fields else None
+
+
+def score_file(output_path: str, gold_path: str, gold_fields: list[str] = None,
+               report: AccuracyReport = None) -> AccuracyReport:
+    """
+    Adds the tokens of an output file and its gold standard file to an AccuracyReport
+    (a new one unless one is given), and returns the report.
+    Raises ValueError if the files don't match up.
+    """
+    if report is None:
+        report = AccuracyReport()
+
+    with open(output_path, 'r', newline='', encoding='utf-8') as output_in, \
+            open(gold_path, 'r', newline='', encoding='utf-8') as gold_in:
+        output_fields, output_rows = read_tsv(output_in)
+        gold_fields, gold_rows = read_tsv(gold_in, gold_fields)
+
+        usas = _column(output_fields, 'USAS')
+        expected_usas = _column(gold_fields, 'USAS')
+        if usas is None:
+            raise ValueError("%s doesn't have a USAS field" % output_path)
+        if expected_usas is None:
+            raise ValueError("%s doesn't have a USAS field" % gold_path)
+
+        # The PAR_SHORT tags come from the gold file if possible, as they do when running the pipeline
+        for fields, side in ((gold_fields, 'gold'), (output_fields, 'output')):
+            if 'PAR_SHORT' in fields or 'PAROLE' in fields:
+                par_side = side
+                par_column = _column(fields, 'PAR_SHORT')
+                parole_column = _column(fields, 'PAROLE')
+                break
+        else:
+            raise ValueError("Neither %s nor %s has a PAR_SHORT or PAROLE field" % (output_path, gold_path))
+
+        # The tokens are checked against each other, to catch files that don't match up
+        token = _column(output_fields, 'TOKEN')
+        expected_token = _column(gold_fields, 'TOKEN')
+        if token is None or expected_token is None:
+            token = expected_token = None
+
+        par_shorts, musas_tags_list, expected_musas_tags = [], [], []
+        for line_number, (output_row, gold_row) in enumerate(itertools.zip_longest(output_rows, gold_rows), 1):
+            if output_row is None or gold_row is None:
+                raise ValueError("%s and %s have a different number of tokens" % (output_path, gold_path))
+            if len(output_row) != len(output_fields) or len(gold_row) != len(gold_fields):
+                raise ValueError("Token %s of %s or %s doesn't match the header length" %
+                                 (line_number, output_path, gold_path))
+            if token is not None and output_row[token] != gold_row[expected_token].replace('\n', '\\n'):
+                raise ValueError("Token %s is '%s' in %s but '%s' in %s" %
+                                 (line_number, output_row[token], output_path, gold_row[expected_token], gold_path))
+
+            par_row = gold_row if par_side == 'gold' else output_row
+            if par_column is not None:
+                par_shorts.append(par_row[par_column])
+            else:
+                par_shorts.append(shorten_par_tag(par_row[parole_column]))
+            # An empty USAS field means the token wasn't tagged at all
+            musas_tags_list.append(output_row[usas].split() or ["Z99"])
+            expected_musas_tags.append(gold_row[expected_usas])
+
+            if len(par_shorts) == CHUNK_SIZE:
+                report.add_tokens(par_shorts, musas_tags_list, expected_musas_tags)
+                par_shorts, musas_tags_list, expected_musas_tags = [], [], []
+
+        if par_shorts:
+            report.add_tokens(par_shorts, musas_tags_list, expected_musas_tags)
+
+    return report
+
+
+def file_pairs(output: str, gold: str) -> list[tuple[str, str]]:
+    """
+    Returns a list of (output file, gold file) pairs, either for two files or for two folders of files.
+    Raises ValueError if they can't be paired up.
+    """
+    if os.path.isfile(output) and os.path.isfile(gold):
+        return [(output, gold)]
+    if os.path.isdir(output) and os.path.isdir(gold):
+        # The output folder mirrors the gold folder, as with ciall.cmd's --outdir
+        pairs = []
+        for gold_file in find_files(gold):
+            output_file = os.path.join(output, os.path.relpath(gold_file, gold))
+            if not os.path.isfile(output_file):
+                raise ValueError("No output file for %s: %s" % (gold_file, output_file))
+            pairs.append((output_file, gold_file))
+        return pairs
+    raise ValueError("--output and --gold must both be existing files, or both be existing folders")
+
+
+def main(args):
+    gold_fields = args.gold_fields.split("|") if args.gold_fields else None
+    report = AccuracyReport()
+    try:
+        for output_path, gold_path in file_pairs(args.output, args.gold):
+            score_file(output_path, gold_path, gold_fields, report)
+    except ValueError as e:
+        print(e)
+        return 1
+
+    if report.num_tokens == 0:
+        print("No input data!")
+        return 1
+
+    report.calculate_totals()
+    print(report.report_str)
+    if args.histogram:
+        print(report.histogram_str)
+    return 0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog='ciall.score',
+                                     description="Score ciall's TSV output against gold standard TSV files, "
+                                                 "without running the pipeline")
+    parser.add_argument('-o', '--output',
+                        required=True,
+                        help="The ciall TSV output file to score, or a folder of output files.")
+    parser.add_argument('-g', '--gold',
+                        required=True,
+                        help="The gold standard TSV file, or a folder of gold standard files " \
+                             "with the same names as the output files.")
+    parser.add_argument('--gold-fields',
+                        default=None,
+                        help="A |-separated list of the fields in the gold standard files, " \
+                             "if they don't have a header line (the same as input.fields in the configuration).")
+    parser.add_argument('--histogram',
+                        action='store_true',
+                        default=False,
+                        help="Also print the distribution of match values.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
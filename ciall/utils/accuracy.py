@@ -0,0 +1,155 @@
+"""
+accuracy.py
+
+Accuracy figures for semantic tagging, compared against pre-tagged and checked texts.
+This doesn't depend on spaCy, so it can be used to score saved output (see ciall.score).
+The spaCy pipeline component is in ciall.components.accuracy.
+
+"""
+
+from ciall.utils.musas_tags import MultiSenseTag, match_batch
+
+
+# The number of equal-width buckets in the match value histograms, from 0.0 to 1.0
+HISTOGRAM_BUCKETS = 10
+
+
+class AccuracyReport(object):
+    """
+    Accuracy figures for a set of tokens.
+    Only running totals are kept, so a report takes the same amount of memory however many tokens are added,
+    and reports (e.g. for different files) can be combined with merge().
+    """
+
+    # The running totals, which are all that's needed to merge or save a report
+    TOTALS = ("num_tokens", "num_z99", "num_fully_correct", "num_cont_tokens", "num_cont_fully_correct",
+              "all_match_sum", "cont_match_sum", "all_histogram", "cont_histogram")
+
+    def __init__(self):
+        # Initialise members that can then be 
+        self.num_tokens = 0              # The total number of tokens in the doc
+        self.num_z99 = 0                 # The number of tokens with no Semantic Tag matched (Z99: Unmatched)
+        self.num_fully_correct = 0       # The number of tokens with fully correct MUSAS tags
+        self.num_cont_tokens = 0         # The number of content word tokens
+        self.num_cont_fully_correct = 0  # The number of content word tokens with fully correct MUSAS tags
+        self.all_match_sum = 0.0         # The sum of the match values for all tokens
+        self.cont_match_sum = 0.0        # The sum of the match values for content words
+        self.all_histogram = [0] * HISTOGRAM_BUCKETS   # The number of match values in each bucket, for all tokens
+        self.cont_histogram = [0] * HISTOGRAM_BUCKETS  # The same for content words
+
+    def add_token(self, par_short: str, musas_tags: list[str], expected_musas_tag: str):
+        # Increment number of tokens
+        self.num_tokens += 1
+
+        # Is it unmatched?
+        if musas_tags[0] == "Z99":
+            self.num_z99 += 1
+
+        # Calculate and save the MUSAS accuracy value
+        # If the expected tag field contains multiple senses, this only uses the first one
+        mv = MultiSenseTag.parse(" ".join(musas_tags)).match(MultiSenseTag.parse(expected_musas_tag).senses[0])
+        self._add_match_value(par_short, mv)
+
+    def add_tokens(self, par_shorts: list[str], musas_tags_list: list[list[str]], expected_musas_tags: list[str]):
+        """
+        The same as calling add_token() for each token, but the match values are calculated for all the tokens
+        together (see ciall.utils.musas_tags.match_batch)
+        """
+        match_values = match_batch(musas_tags_list, expected_musas_tags).tolist()
+        for par_short, musas_tags, mv in zip(par_shorts, musas_tags_list, match_values):
+            self.num_tokens += 1
+            if musas_tags[0] == "Z99":
+                self.num_z99 += 1
+            self._add_match_value(par_short, mv)
+
+    def _add_match_value(self, par_short: str, mv: float):
+        self.all_match_sum += mv
+        bucket = min(int(mv * HISTOGRAM_BUCKETS), HISTOGRAM_BUCKETS - 1)
+        self.all_histogram[bucket] += 1
+
+        # Is it fully correct?
+        if mv == 1.0:
+            self.num_fully_correct += 1
+
+        # If it's a content word, add info to content calculation
+        if par_short[0] in ('N', 'V', 'A', 'R', 'M'):  # content words
+            self.num_cont_tokens += 1
+            if mv == 1.0:
+                self.num_cont_fully_correct += 1
+            self.cont_match_sum += mv
+            self.cont_histogram[bucket] += 1
+
+    def merge(self, other: 'AccuracyReport') -> 'AccuracyReport':
+        """
+        Adds the totals from another report to this one, and returns this report.
+        Merging is associative, so reports can be merged in any grouping (e.g. per worker, then overall).
+        Call calculate_totals() afterwards to update the percentages.
+        """
+        self.num_tokens += other.num_tokens
+        self.num_z99 += other.num_z99
+        self.num_fully_correct += other.num_fully_correct
+        self.num_cont_tokens += other.num_cont_tokens
+        self.num_cont_fully_correct += other.num_cont_fully_correct
+        self.all_match_sum += other.all_match_sum
+        self.cont_match_sum += other.cont_match_sum
+        self.all_histogram = [a + b for a, b in zip(self.all_histogram, other.all_histogram)]
+        self.cont_histogram = [a + b for a, b in zip(self.cont_histogram, other.cont_histogram)]
+        return self
+
+    def totals(self) -> dict:
+        """
+        Returns the running totals as a dict that can be saved (e.g. as JSON) and read with from_totals()
+        """
+        return {name: getattr(self, name) for name in self.TOTALS}
+
+    @classmethod
+    def from_totals(cls, totals: dict) -> 'AccuracyReport':
+        report = cls()
+        for name in cls.TOTALS:
+            setattr(report, name, totals[name])
+        return report
+
+    def calculate_totals(self):
+        self.lexical_coverage = round(((self.num_tokens - self.num_z99) / self.num_tokens) * 100.0, 3)
+
+        self.pc_all_fully_correct = round((self.num_fully_correct / self.num_tokens) * 100, 3)
+        self.pc_cont_fully_correct = round((self.num_cont_fully_correct / self.num_cont_tokens) * 100, 3)
+
+        self.all_accuracy = self.all_match_sum / self.num_tokens
+        self.pc_all_accuracy = round(self.all_accuracy * 100, 3)
+        self.cont_accuracy = self.cont_match_sum / self.num_cont_tokens
+        self.pc_cont_accuracy = round(self.cont_accuracy * 100, 3)
+
+    @property
+    def report_str(self):
+        # printed results
+        report_str = "### Accuracy Report\n"
+        report_str += "Num tokens: %s\n" % self.num_tokens
+        report_str += "Lexical coverage: %s%%\n" % self.lexical_coverage
+        report_str += "Fully correct MUSAS tags (all tokens): %s%% (%s token(s))\n" % \
+                      (self.pc_all_fully_correct, self.num_fully_correct)
+        report_str += "Fully correct MUSAS tags (content tokens): %s%% (%s token(s))\n" % \
+                      (self.pc_cont_fully_correct, self.num_cont_fully_correct)
+        report_str += "Overall semantic tag accuracy (all tokens): %s%%\n" % self.pc_all_accuracy
+        report_str += "Overall semantic tag accuracy (content tokens): %s%%\n" % self.pc_cont_accuracy
+        return report_str
+
+    @property
+    def histogram_str(self):
+        # The distribution of match values
+        histogram_str = "### Match Value Distribution\n"
+        histogram_str += "%-12s %12s %16s\n" % ("Match value", "All tokens", "Content tokens")
+        for bucket, (num_all, num_cont) in enumerate(zip(self.all_histogram, self.cont_histogram)):
+            low = bucket / HISTOGRAM_BUCKETS
+            high = (bucket + 1) / HISTOGRAM_BUCKETS
+            bucket_str = "[%.1f, %.1f%s" % (low, high, "]" if bucket == HISTOGRAM_BUCKETS - 1 else ")")
+            histogram_str += "%-12s %12s %16s\n" % (bucket_str, num_all, num_cont)
+        return histogram_str
+
+    @classmethod
+    def combine_reports(cls, reports: list[object]):
+        combined_report = AccuracyReport()
+        for report in reports:
+            combined_report.merge(report)
+        combined_report.calculate_totals()
+        return combined_report
@@ -0,0 +1,226 @@
+"""
+accuracy_cache.py
+
+An on-disk cache of the accuracy reports for each input file, so that rerunning an accuracy test (e.g. after
+a small lexicon edit) only re-evaluates the files whose results could have changed.
+
+A file's report is reused if the file, the configuration, the lexicons and the ciall version are all the same
+as when it was saved. In lemma diff mode a report is also reused after the lexicons change, as long as none of
+the lexicon entries that changed could match a word in the file. This uses an index of the words (tokens and
+lemmas) in each file, saved from the previous runs, and copies of the lexicons each report was made with.
+
+Cache folder layout:
+  - reports/<key>.json: The report totals for a file, and the digests of the lexicons used
+  - lexicons/<digest>.tsv: Copies of the lexicons used (lemma diff mode only)
+  - word_index.json: {"words": {word: [report keys]}, "keys": [report keys]} (lemma diff mode only)
+
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from typing import Optional
+
+import ciall
+from ciall.utils.accuracy import AccuracyReport
+from ciall.utils.lexicon import read_sw_lexicon, read_mw_lexicon, file_digest
+
+
+def _write_json(file_path: str, data):
+    # Written to a temporary file first, so other processes never see a half-written file
+    dir_path = os.path.dirname(file_path)
+    os.makedirs(dir_path, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=dir_path, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as fout:
+            json.dump(data, fout)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _read_json(file_path: str):
+    try:
+        with open(file_path, 'r', encoding='utf-8') as fin:
+            return json.load(fin)
+    except (OSError, ValueError):
+        return None
+
+
+def _sw_words(key: str) -> set[str]:
+    # Single-word lexicon keys are "lemma|pos" or "lemma"
+    return {key.rsplit("|", 1)[0].lower()}
+
+
+def _mw_words(template: str) -> set[str]:
+    # Only the literal words in a template, words with wildcards could match anything
+    words = set()
+    for token_pos in template.split():
+        word = token_pos.split("_")[0]
+        if not any(char in word for char in "*{}"):
+            words.add(word.lower())
+    return words
+
+
+def _changed_keys(old_lexicon: dict, new_lexicon: dict) -> list[str]:
+    return [key for key in old_lexicon.keys() | new_lexicon.keys() if old_lexicon.get(key) != new_lexicon.get(key)]
+
+
+def lexicon_changes(old_sw_lexicon: str, old_mw_lexicon: str, new_sw_lexicon: str, new_mw_lexicon: str) -> list:
+    """
+    Compares two versions of the single-word and multi-word lexicon files.
+
+    Returns a list of the changes, each one a set of (lowercased) words that must all be in a file for
+    the change to affect it. An empty set means the change could affect any file.
+    """
+    changes = []
+
+    old_pos_lexicon, old_lemma_lexicon = read_sw_lexicon(old_sw_lexicon)
+    new_pos_lexicon, new_lemma_lexicon = read_sw_lexicon(new_sw_lexicon)
+    for old_lexicon, new_lexicon in ((old_pos_lexicon, new_pos_lexicon), (old_lemma_lexicon, new_lemma_lexicon)):
+        changes.extend(_sw_words(key) for key in _changed_keys(old_lexicon, new_lexicon))
+
+    old_mw = read_mw_lexicon(old_mw_lexicon)
+    new_mw = read_mw_lexicon(new_mw_lexicon)
+    changes.extend(_mw_words(template) for template in _changed_keys(old_mw, new_mw))
+    # Equally ranked templates are chosen by their order in the lexicon, so reordering them can change any file
+    if [key for key in old_mw if key in new_mw] != [key for key in new_mw if key in old_mw]:
+        changes.append(set())
+
+    return changes
+
+
+def doc_words(doc) -> set[str]:
+    """
+    Returns the (lowercased) tokens and lemmas of a Doc, for the word index
+    """
+    words = set()
+    for token in doc:
+        words.add(token.text.lower())
+        words.add(token.lemma_.lower())
+    return words
+
+
+class AccuracyCache(object):
+    """
+    A cache of the accuracy reports for each input file, kept in the given folder.
+    Use get() to look up the report for an input file, put() to save a new report,
+    and save() at the end of the run to save the word index.
+    """
+
+    def __init__(self, cache_dir: str, conf: dict, lemma_diff: bool = False):
+        self.cache_dir = cache_dir
+        self.lemma_diff = lemma_diff
+
+        musas_conf = conf.get('ciall_musas_tagger') or {}
+        self.sw_lexicon = musas_conf.get('sw_lexicon')
+        self.mw_lexicon = musas_conf.get('mw_lexicon')
+        self.lexicon_digests = [file_digest(path) if path is not None and os.path.isfile(path) else None
+                                for path in (self.sw_lexicon, self.mw_lexicon)]
+        # In lemma diff mode the lexicons are left out of the key, and checked in get() instead
+        self.conf_digest = self._digest(ciall.__version__, json.dumps(conf, sort_keys=True, default=str),
+                                        *(() if lemma_diff else self.lexicon_digests))
+
+        self.hits = 0
+        self.misses = 0
+        self._word_index = None
+        self._affected = {}  # Previous lexicon digests -> the keys of the reports the lexicon changes affect
+        if lemma_diff:
+            self._save_lexicons()
+            index = _read_json(self._word_index_path) or {}
+            self._word_index = {word: set(keys) for word, keys in index.get('words', {}).items()}
+            self._indexed_keys = set(index.get('keys', []))
+
+    @staticmethod
+    def _digest(*parts) -> str:
+        return hashlib.sha256("\0".join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+    @property
+    def _word_index_path(self) -> str:
+        return os.path.join(self.cache_dir, "word_index.json")
+
+    def _report_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, "reports", key + ".json")
+
+    def _lexicon_copy_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, "lexicons", digest + ".tsv")
+
+    def _save_lexicons(self):
+        # Keep a copy of each version of the lexicons, to compare against in later runs
+        for path, digest in zip((self.sw_lexicon, self.mw_lexicon), self.lexicon_digests):
+            if digest is not None and not os.path.isfile(self._lexicon_copy_path(digest)):
+                os.makedirs(os.path.dirname(self._lexicon_copy_path(digest)), exist_ok=True)
+                shutil.copyfile(path, self._lexicon_copy_path(digest))
+
+    def key(self, input_digest: str) -> str:
+        """
+        Returns the cache key of an input file, from the digest of its contents (see ciall.utils.lexicon.file_digest)
+        """
+        return self._digest(self.conf_digest, input_digest)
+
+    def get(self, input_digest: str) -> Optional[AccuracyReport]:
+        """
+        Returns the saved report for an input file, given the digest of its contents,
+        or None if it needs to be evaluated again
+        """
+        key = self.key(input_digest)
+        entry = _read_json(self._report_path(key))
+        if entry is None or (entry['lexicons'] != self.lexicon_digests and not self._unaffected(key, entry)):
+            self.misses += 1
+            return None
+        self.hits += 1
+        report = AccuracyReport.from_totals(entry['report'])
+        report.calculate_totals()
+        return report
+
+    def _unaffected(self, key: str, entry: dict) -> bool:
+        # Whether none of the lexicon changes since the report was saved could affect the file
+        if not self.lemma_diff or key not in self._indexed_keys:
+            return False
+        old_digests = tuple(entry['lexicons'])
+        if old_digests not in self._affected:
+            self._affected[old_digests] = self._affected_keys(old_digests)
+        affected = self._affected[old_digests]
+        return affected is not None and key not in affected
+
+    def _affected_keys(self, old_digests: tuple) -> Optional[set]:
+        # The keys of the reports which contain all the words of at least one change, or None if unknown
+        old_paths = [self._lexicon_copy_path(digest) if digest is not None else None for digest in old_digests]
+        if None in old_paths or None in self.lexicon_digests or not all(os.path.isfile(p) for p in old_paths):
+            return None
+        changes = lexicon_changes(*old_paths, self.sw_lexicon, self.mw_lexicon)
+
+        affected = set()
+        for words in changes:
+            if not words:
+                return None
+            keys = None
+            for word in words:
+                keys = self._word_index.get(word, set()) if keys is None else keys & self._word_index.get(word, set())
+                if not keys:
+                    break
+            affected |= keys
+        return affected
+
+    def put(self, input_digest: str, report: AccuracyReport, words: set[str] = None):
+        """
+        Saves the report for an input file, given the digest of its contents.
+        In lemma diff mode, words should be the (lowercased) tokens and lemmas of the file (see doc_words()).
+        """
+        key = self.key(input_digest)
+        _write_json(self._report_path(key), {'report': report.totals(), 'lexicons': self.lexicon_digests})
+        if self.lemma_diff:
+            for word in words or ():
+                self._word_index.setdefault(word, set()).add(key)
+            self._indexed_keys.add(key)
+
+    def save(self):
+        """
+        Saves the word index, only needed in lemma diff mode
+        """
+        if self.lemma_diff:
+            _write_json(self._word_index_path, {'words': {word: sorted(keys) for word, keys in self._word_index.items()},
+                                                'keys': sorted(self._indexed_keys)})
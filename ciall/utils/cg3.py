@@ -3,31 +3,212 @@ from dataclasses import dataclass, field
 
 import spacy
 
-from ciall.utils.pos2par import pos2par
+import ciall.components.token_attributes  # The doc-level columns
+from ciall.utils.pos2par import pos2par_mask
+from ciall.utils.morph_vocab import MORPH_VOCAB
 from ciall.utils.lemmafreq import lemmafreq
 
 
-@dataclass
-class CG3Match:
-    # Lemma
-    lemma: str
-    # Morphological feature tags
-    morph_tags: list[str] = field(default_factory=list)
-    # PAROLE tag
-    par_tag_long: str = None
-    par_tag_short: str = None
+class CG3Match(object):
+    """
+    A reading (possible analysis) of a token.
+
+    There are several of these for each token of ambiguous input, so they're kept small: the lemma and
+    dependency tag strings are interned, the morphological tags are the tuple and bitmask shared by all readings with
+    the same tags (see ciall.utils.morph_vocab), and the PAROLE and UPOS tags are worked out from the bitmask
+    when they're read.
+    """
+    __slots__ = ("lemma", "_morph", "dep_tags")
+
+    def __init__(self, lemma: str, morph_tags: list[str] = (), dep_tags: list[str] = ()):
+        # Lemma
+        self.lemma = sys.intern(lemma)
+        # (Morphological feature tags, their bitmask)
+        self._morph = MORPH_VOCAB.intern_tags(morph_tags)
+        # Dependency tags
+        self.dep_tags = [sys.intern(tag) for tag in dep_tags]
+
+    @property
+    def morph_tags(self) -> tuple[str, ...]:
+        return self._morph[0]
+
+    @property
+    def morph_mask(self) -> int:
+        return self._morph[1]
+
+    # PAROLE tag, converted from the morphological tags using pos2par(), which caches the conversions
+    @property
+    def par_tag_long(self) -> str:
+        return pos2par_mask(self._morph[1])[0]
+
+    @property
+    def par_tag_short(self) -> str:
+        return pos2par_mask(self._morph[1])[1]
+
     # Universal dependency UPOS tag
-    udep_tag: str = None
-    # Dependency tags
-    dep_tags: list[str] = field(default_factory=list)
+    @property
+    def udep_tag(self) -> str:
+        return pos2par_mask(self._morph[1])[2]
 
+    def __eq__(self, other):
+        if not isinstance(other, CG3Match):
+            return NotImplemented
+        return (self.lemma, self._morph, self.dep_tags) == (other.lemma, other._morph, other.dep_tags)
 
-@dataclass
+    def __repr__(self):
+        return "CG3Match(lemma=%r, morph_tags=%r, dep_tags=%r)" % (self.lemma, self.morph_tags, self.dep_tags)
+
+
+@dataclass(slots=True)
 class CG3Entry:
     token: str
     matches: list[CG3Match] = field(default_factory=list)
 
 
+# Where one document ends and the next begins in a cg3 input:
+#   file:     The whole input is one document
+#   sentence: Each sentence is a document. Sentences end after sentence-final punctuation,
+#             or at <s>, </s>, <doc ...> or </doc> marker lines (other marker lines are skipped)
+#   doc_tag:  Documents are separated by <doc ...> or </doc> marker lines
+DOC_BOUNDARIES = ("file", "sentence", "doc_tag")
+
+# The starts of the marker lines which end a document or a sentence
+DOC_MARKERS = ("<doc", "</doc")
+SENTENCE_MARKERS = ("<s>", "<s ", "</s>") + DOC_MARKERS
+
+# Tokens which end a sentence, as well as any tagged as final punctuation (Punct Fin)
+SENTENCE_FINAL_PUNCTUATION = (".", "!", "?")
+MORPH_TAG_FIN = MORPH_VOCAB.intern("Fin")
+
+
+def _parse_match(line: str) -> CG3Match:
+    # Expected format is \t"LEMMA" TAG1 TAG2 TAG3...
+    entry_words = line.strip().split()
+    lemma = entry_words[0].strip('"')
+    tags = entry_words[1:]
+
+    morph_tags = []
+    dep_tags = []
+    for tag in tags:
+        if tag.startswith('@') or tag.startswith('#') or tag.startswith('^'):
+            dep_tags.append(tag)
+        else:
+            morph_tags.append(tag)
+
+    # create the Match object
+    return CG3Match(lemma=lemma, morph_tags=morph_tags, dep_tags=dep_tags)
+
+
+def iter_cg3_entries(lines):
+    """
+    Reads cg3 lines (e.g. from a file object, sys.stdin can be used too) one at a time.
+
+    Yields a CG3Entry for each token, once all its matches have been read,
+    and the marker lines (lines starting with '<', e.g. "<s>" or "<doc id=1>") as strings.
+    """
+    # Format of cg3 file is:
+    #
+    # "<TOKEN>"\n
+    # \t"LEMMA1" TAG11 TAG12 TAG13...
+    # \t"LEMMA2" TAG21 TAG22 TAG23...
+    #
+    # Each line with lemma and tags is a possible match
+
+    curr_token = None
+    curr_entry = None
+    found_new_token = False
+
+    for line in lines:
+
+        if line.strip() == "":
+            continue
+
+        if line[0] == '"':
+            ## Entry head line
+            if found_new_token:
+                print(f"Found an entry head line, but we're already inside an entry!\n{line}", file=sys.stderr)
+                continue
+
+            # Expected format is "<TOKEN>"\n
+            # We just want TOKEN
+            curr_token = line.strip('\n')  # First strip any trailing newlines
+            curr_token = curr_token[2:-2]  # Take off the initial "< and final >"
+            found_new_token = True
+
+        elif line[0] == '\t':
+            ## Tags line
+            match = _parse_match(line)
+            if found_new_token:
+                # This is the first lemma line for this token, so the previous token is complete
+                if curr_entry is not None:
+                    yield curr_entry
+                curr_entry = CG3Entry(token=curr_token, matches=[match])
+            elif curr_entry is not None:
+                # This is a subsequent lemma line for this token
+                curr_entry.matches.append(match)
+
+            found_new_token = False
+
+        elif line[0] == '<':
+            ## Marker line
+            if curr_entry is not None:
+                yield curr_entry
+                curr_entry = None
+            yield line.strip()
+
+    if curr_entry is not None:
+        yield curr_entry
+
+
+def reorder_entry_by_lemma_freq(entry: CG3Entry):
+    """
+    This re-orders the matches of a CG3Entry by the lemma frequency
+    """
+    # If there's more than one lemma
+    if len(set([m.lemma for m in entry.matches])) > 1:
+        entry.matches = sorted(entry.matches, key=lambda m: lemmafreq(m.lemma), reverse=True)
+
+
+def is_sentence_final(entry: CG3Entry) -> bool:
+    """
+    Returns True if the token ends a sentence.
+    This looks at the first match, so the matches should already have been reordered by lemma frequency.
+    """
+    return entry.token in SENTENCE_FINAL_PUNCTUATION or (entry.matches[0].morph_mask & MORPH_TAG_FIN) != 0
+
+
+def iter_cg3_chunks(lines, doc_boundary: str = "file"):
+    """
+    Reads cg3 lines one at a time, and groups the entries into documents.
+    doc_boundary is one of DOC_BOUNDARIES.
+
+    Yields a list of CG3Entry objects for each (non-empty) document.
+    """
+    if doc_boundary not in DOC_BOUNDARIES:
+        raise TypeError("input.doc_boundary must be one of %s, not '%s'" % (", ".join(DOC_BOUNDARIES), doc_boundary))
+
+    entries = []
+    for entry in iter_cg3_entries(lines):
+        if isinstance(entry, str):
+            end_of_doc = ((doc_boundary == "sentence" and entry.startswith(SENTENCE_MARKERS)) or
+                          (doc_boundary == "doc_tag" and entry.startswith(DOC_MARKERS)))
+        else:
+            entries.append(entry)
+            if doc_boundary == "sentence":
+                # The reading that the token will be tagged with decides whether it ends the sentence
+                reorder_entry_by_lemma_freq(entry)
+                end_of_doc = is_sentence_final(entry)
+            else:
+                end_of_doc = False
+
+        if end_of_doc and entries:
+            yield entries
+            entries = []
+
+    if entries:
+        yield entries
+
+
 class CG3Document(object):
 
     def __init__(self):
@@ -52,105 +233,65 @@ class CG3Document(object):
 
     @classmethod
     def from_lines(cls, lines):
-        # Format of cg3 file is:
-        #
-        # "<TOKEN>"\n
-        # \t"LEMMA1" TAG11 TAG12 TAG13...
-        # \t"LEMMA2" TAG21 TAG22 TAG23...
-        #
-        # Each line with lemma and tags is a possible match
-
+        # See iter_cg3_entries() for the format
         doc = cls()
-
-        curr_token = None
-        found_new_token = False
-
-        for line in lines:
-
-            if line.strip() == "":
-                continue
-
-            if line[0] == '"':
-                ## Entry head line
-                if found_new_token:
-                    print(f"Found an entry head line, but we're already inside an entry!\n{line}", file=sys.stderr)
-                    continue
-
-                # Expected format is "<TOKEN>"\n
-                # We just want TOKEN
-                curr_token = line.strip('\n')  # First strip any trailing newlines
-                curr_token = curr_token[2:-2]  # Take off the initial "< and final >"
-                found_new_token = True
-
-            if line[0] == '\t':
-                ## Tags line
-                entry_words = line.strip().split()
-                lemma = entry_words[0].strip('"')
-                tags = entry_words[1:]
-                
-                morph_tags = []
-                dep_tags = []
-                for tag in tags:
-                    if tag.startswith('@') or tag.startswith('#') or tag.startswith('^'):
-                        dep_tags.append(tag)
-                    else:
-                        morph_tags.append(tag)
-
-                # convert tags from a list of Morphological tags into a single PAROLE tag, using pos2par()
-                l_par_tag, s_par_tag, udep_tag = pos2par(morph_tags)
-
-                # create the Match object
-                match = CG3Match(lemma=lemma,
-                                 morph_tags=morph_tags,
-                                 par_tag_long=l_par_tag,
-                                 par_tag_short=s_par_tag,
-                                 udep_tag=udep_tag,
-                                 dep_tags=dep_tags)
-                if found_new_token:
-                    # This is the first lemma line for this token
-                    doc.tokens.append(CG3Entry(token=curr_token, matches=[match]))
-                else:
-                    # This is a subsequent lemma line for this token
-                    doc.tokens[-1].matches.append(match)
-                
-                found_new_token = False
-
+        doc.tokens = [entry for entry in iter_cg3_entries(lines) if isinstance(entry, CG3Entry)]
         return doc
 
     def reorder_by_lemma_freq(self):
         """
         This re-orders matches by the lemma frequency
         """
-        for i in range(0, len(self.tokens)):
-            # If there's more than one lemma
-            if len(set([m.lemma for m in self.tokens[i].matches])) > 1:
-                # CG3Entry and CG3Match are immutable (they are NamedTuples)
-                self.tokens[i].matches = sorted(self.tokens[i].matches, key=lambda m: lemmafreq(m.lemma), reverse=True)
+        for entry in self.tokens:
+            reorder_entry_by_lemma_freq(entry)
+
+
+def _check_max_readings(max_readings):
+    if max_readings is not None and (not isinstance(max_readings, int) or max_readings < 1):
+        raise TypeError("input.max_readings must be a positive integer, not '%s'" % (max_readings,))
+
+
+def doc_from_cg3_entries(nlp: spacy.language.Language, entries: list[CG3Entry], max_readings: int = None):
+    """
+    Makes a Doc object from a list of CG3Entry objects, using the first match of each token
+    (after reordering the matches by lemma frequency).
+    All the matches are kept in token._.ifst_matches, or just the first max_readings of them if it's given.
+    """
+    _check_max_readings(max_readings)
+    for entry in entries:
+        reorder_entry_by_lemma_freq(entry)
+        if max_readings is not None:
+            del entry.matches[max_readings:]
+    first_matches = [entry.matches[0] for entry in entries]
+
+    # Create the Doc object, with the lemmatizer and POS tagger output
+    doc = spacy.tokens.doc.Doc(vocab=nlp.vocab,
+                               words=[entry.token for entry in entries],
+                               spaces=[True] * len(entries),  # TODO: something more intelligent?
+                               lemmas=[match.lemma for match in first_matches],
+                               pos=[match.udep_tag for match in first_matches])
+
+    # update the doc-level columns (see ciall.components.token_attributes) with cg3 information
+    # Firstly, add all matches from the irishfst pipeline
+    doc._.ifst_matches_column = [entry.matches for entry in entries]
+    doc._.par_long_column = [match.par_tag_long for match in first_matches]
+    doc._.par_short_column = [match.par_tag_short for match in first_matches]
+    doc._.morph_tags_column = [match.morph_tags for match in first_matches]
+    doc._.morph_mask_column = [match.morph_mask for match in first_matches]
+    doc._.dep_tags_column = [match.dep_tags for match in first_matches]
+
+    return doc
+
+
+def docs_from_cg3_stream(nlp: spacy.language.Language, lines, doc_boundary: str = "file", max_readings: int = None):
+    """
+    Reads Doc objects from cg3 lines (e.g. a file object) one document at a time, see iter_cg3_chunks()
+    and doc_from_cg3_entries(). Only one document is held in memory at once.
+    """
+    _check_max_readings(max_readings)
+    for entries in iter_cg3_chunks(lines, doc_boundary):
+        yield doc_from_cg3_entries(nlp, entries, max_readings)
 
 
 def doc_from_cg3(nlp: spacy.language.Language, cg3: str):
-    cg3doc = CG3Document.from_string(cg3)
-    cg3doc.reorder_by_lemma_freq()
-
-    # Create the Doc object
-    words = []
-    spaces = []
-    for token in cg3doc.tokens:
-        words.append(token.token)
-        spaces.append(True)  # TODO: something more intelligent?
-    doc = spacy.tokens.doc.Doc(vocab=nlp.vocab, words=words, spaces=spaces)
-
-    # update the attributes of the doc object with cg3 information
-    for i in range(len(doc)):
-        # Firstly, add all matches from the irishfst pipeline
-        doc[i]._.ifst_matches = cg3doc.tokens[i].matches
-        # Lemmatizer
-        doc[i].lemma_ = doc[i]._.ifst_matches[0].lemma
-        # POS tagger
-        doc[i].pos_ = doc[i]._.ifst_matches[0].udep_tag
-        doc[i]._.par_long = doc[i]._.ifst_matches[0].par_tag_long
-        doc[i]._.par_short = doc[i]._.ifst_matches[0].par_tag_short
-        doc[i]._.morph_tags = doc[i]._.ifst_matches[0].morph_tags
-        doc[i]._.dep_tags = doc[i]._.ifst_matches[0].dep_tags
-
-    return doc
\ No newline at end of file
+    return doc_from_cg3_entries(nlp, CG3Document.from_string(cg3).tokens)
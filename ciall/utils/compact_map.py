@@ -0,0 +1,256 @@
+"""
+compact_map.py
+
+A compact, read-only mapping of strings to values, stored in a file that is memory-mapped when it's opened.
+The values are either lists of strings (e.g. semantic tags) or integers (e.g. lemma frequencies).
+
+The file is mapped read-only, so when several processes open the same file they all share one copy of it
+in memory, and each process only holds a few small Python objects no matter how big the mapping is.
+
+File layout (all integers are little-endian):
+  - Header: see _HEADER
+  - Key offsets: uint32[num_entries + 1], the start of each key in the string buffer
+  - For lists of strings:
+      - Value offsets: uint32[num_entries + 1], the start of each entry's value in the value ids
+      - Value ids: uint32[num_value_ids], indexes into the value strings
+      - Value string offsets: uint32[num_value_strings + 1], the start of each value string in the string buffer
+  - For integers:
+      - Values: int64[num_entries]
+  - Hash table: uint32[num_slots], each one either 0 (empty) or an entry index + 1.
+    The slot of a key is given by its crc32, with linear probing.
+  - String buffer: the UTF-8 encoded keys, followed by the value strings
+
+"""
+
+import os
+import mmap
+import zlib
+import struct
+import tempfile
+from collections.abc import Mapping
+
+
+MAGIC = b"CIALLMAP"
+FORMAT_VERSION = 1
+
+# Value types
+STRINGS = 1
+INT = 2
+
+# magic, format version, value type, num_entries, num_value_ids, num_value_strings, num_slots, string buffer size
+_HEADER = struct.Struct("<8sIIIIIII")
+
+
+def _align(size: int) -> int:
+    # Sections start on 8-byte boundaries
+    return (size + 7) & ~7
+
+
+def _section_sizes(value_type, num_entries, num_value_ids, num_value_strings, num_slots) -> list:
+    if value_type == STRINGS:
+        value_sizes = [('value_offsets', 'I', num_entries + 1),
+                       ('value_ids', 'I', num_value_ids),
+                       ('value_string_offsets', 'I', num_value_strings + 1)]
+    else:
+        value_sizes = [('int_values', 'q', num_entries)]
+    return [('key_offsets', 'I', num_entries + 1)] + value_sizes + [('slots', 'I', num_slots)]
+
+
+def _get_umask() -> int:
+    """
+    Returns the process' umask (which can only be read by setting it)
+    """
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+# The umask is read once, on import, as setting it while other threads are making files
+# (e.g. a background lexicon reload) would give their files the wrong permissions
+_UMASK = _get_umask()
+
+
+def write_compact_map(file_path: str, mapping: Mapping):
+    """
+    Writes a mapping of strings to values (either lists of strings, or integers) to a CompactMap file.
+    The file is written to a temporary file first and then moved into place,
+    so other processes never see a half-written file.
+    """
+    keys = list(mapping)
+    values = [mapping[key] for key in keys]
+    value_type = INT if values and isinstance(values[0], int) else STRINGS
+
+    strings = bytearray()
+    key_offsets = []
+    for key in keys:
+        key_offsets.append(len(strings))
+        strings += key.encode('utf-8')
+    key_offsets.append(len(strings))
+
+    arrays = {'key_offsets': key_offsets}
+    num_value_ids = num_value_strings = 0
+    if value_type == STRINGS:
+        # Each distinct value string is only stored once, after the keys
+        value_string_ids = {}
+        value_offsets = []
+        value_ids = []
+        for value in values:
+            value_offsets.append(len(value_ids))
+            for value_string in value:
+                value_id = value_string_ids.setdefault(value_string, len(value_string_ids))
+                value_ids.append(value_id)
+        value_offsets.append(len(value_ids))
+        value_string_offsets = []
+        for value_string in value_string_ids:
+            value_string_offsets.append(len(strings))
+            strings += value_string.encode('utf-8')
+        value_string_offsets.append(len(strings))
+        arrays.update(value_offsets=value_offsets, value_ids=value_ids, value_string_offsets=value_string_offsets)
+        num_value_ids = len(value_ids)
+        num_value_strings = len(value_string_ids)
+    else:
+        arrays['int_values'] = values
+
+    # The hash table is kept at most half full
+    num_slots = 8
+    while num_slots < 2 * len(keys):
+        num_slots *= 2
+    mask = num_slots - 1
+    slots = [0] * num_slots
+    for i, key in enumerate(keys):
+        slot = zlib.crc32(key.encode('utf-8')) & mask
+        while slots[slot] != 0:
+            slot = (slot + 1) & mask
+        slots[slot] = i + 1
+    arrays['slots'] = slots
+
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, value_type, len(keys), num_value_ids, num_value_strings,
+                          num_slots, len(strings))
+
+    dir_path = os.path.dirname(file_path)
+    os.makedirs(dir_path, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=dir_path, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as fout:
+            position = fout.write(header)
+            for name, item_format, count in _section_sizes(value_type, len(keys), num_value_ids,
+                                                           num_value_strings, num_slots):
+                position += fout.write(b"\0" * (_align(position) - position))
+                position += fout.write(struct.pack("<%d%s" % (count, item_format), *arrays[name]))
+            position += fout.write(b"\0" * (_align(position) - position))
+            fout.write(strings)
+        # mkstemp() makes the file readable by its owner only, so give it the usual permissions
+        # of a new file before it's moved into place, as it's shared with other users' processes too
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class CompactMap(Mapping):
+    """
+    A read-only mapping backed by a memory-mapped file written by write_compact_map().
+    It can be used like a dict, e.g. compact_map["key"], compact_map.get("key"), "key" in compact_map.
+    Values are returned as new lists of strings, or as integers.
+
+    Raises ValueError if the file is not a valid CompactMap file.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        with open(file_path, 'rb') as fin:
+            self._mmap = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+
+        if len(buffer) < _HEADER.size:
+            raise ValueError("%s is not a CompactMap file" % file_path)
+        (magic, version, value_type, num_entries, num_value_ids, num_value_strings,
+         num_slots, strings_size) = _HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != FORMAT_VERSION or value_type not in (STRINGS, INT):
+            raise ValueError("%s is not a CompactMap file, or it's an unsupported version" % file_path)
+
+        position = _HEADER.size
+        for name, item_format, count in _section_sizes(value_type, num_entries, num_value_ids,
+                                                       num_value_strings, num_slots):
+            position = _align(position)
+            size = count * struct.calcsize(item_format)
+            if position + size > len(buffer):
+                raise ValueError("%s is truncated" % file_path)
+            setattr(self, '_' + name, buffer[position:position + size].cast(item_format))
+            position += size
+        position = _align(position)
+        if position + strings_size != len(buffer):
+            raise ValueError("%s has the wrong size" % file_path)
+        self._strings = buffer[position:position + strings_size]
+
+        self.value_type = value_type
+        self._num_entries = num_entries
+        self._mask = num_slots - 1
+        # Value strings are decoded when they're first used, there are few of them (e.g. semantic tags)
+        self._value_strings = [None] * num_value_strings
+
+    def __reduce__(self):
+        # Pickled as the file path, so each process maps the same file
+        return (self.__class__, (self.file_path,))
+
+    def _find(self, key: str) -> int:
+        """
+        Returns the index of the entry for the given key, or -1 if there isn't one
+        """
+        key_bytes = key.encode('utf-8', 'surrogatepass')
+        key_offsets = self._key_offsets
+        strings = self._strings
+        slots = self._slots
+        mask = self._mask
+
+        slot = zlib.crc32(key_bytes) & mask
+        while True:
+            entry = slots[slot]
+            if entry == 0:
+                return -1
+            start = key_offsets[entry - 1]
+            end = key_offsets[entry]
+            if end - start == len(key_bytes) and strings[start:end] == key_bytes:
+                return entry - 1
+            slot = (slot + 1) & mask
+
+    def _value(self, index: int):
+        if self.value_type == INT:
+            return self._int_values[index]
+
+        value_strings = self._value_strings
+        value_string_offsets = self._value_string_offsets
+        value = []
+        for value_id in self._value_ids[self._value_offsets[index]:self._value_offsets[index + 1]]:
+            value_string = value_strings[value_id]
+            if value_string is None:
+                start = value_string_offsets[value_id]
+                end = value_string_offsets[value_id + 1]
+                value_string = value_strings[value_id] = str(self._strings[start:end], 'utf-8')
+            value.append(value_string)
+        return value
+
+    def __getitem__(self, key: str):
+        index = self._find(key) if isinstance(key, str) else -1
+        if index < 0:
+            raise KeyError(key)
+        return self._value(index)
+
+    def get(self, key: str, default=None):
+        index = self._find(key) if isinstance(key, str) else -1
+        if index < 0:
+            return default
+        return self._value(index)
+
+    def __contains__(self, key) -> bool:
+        return isinstance(key, str) and self._find(key) >= 0
+
+    def __len__(self) -> int:
+        return self._num_entries
+
+    def __iter__(self):
+        key_offsets = self._key_offsets
+        strings = self._strings
+        for i in range(self._num_entries):
+            yield str(strings[key_offsets[i]:key_offsets[i + 1]], 'utf-8')
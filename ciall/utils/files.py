@@ -0,0 +1,116 @@
+"""
+files.py
+
+Utilities for finding input files and writing output files
+
+"""
+
+import os
+import sys
+
+
+# The default size of the output buffer, in bytes
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+
+def find_files(dir_path: str) -> list[str]:
+    """
+    Returns the paths of all the files in a folder and its subfolders, in sorted order.
+    'Dotfiles' and 'dotfolders' are left out.
+    """
+    file_paths = []
+    for dirpath, dirnames, filenames in os.walk(dir_path):
+        dirnames[:] = sorted(dirname for dirname in dirnames if not dirname.startswith("."))
+        file_paths.extend(os.path.join(dirpath, filename) for filename in sorted(filenames)
+                          if not filename.startswith("."))
+    return file_paths
+
+
+def paths_overlap(path1: str, path2: str) -> bool:
+    """
+    Returns True if two paths are the same, or one is inside the other
+    """
+    path1, path2 = os.path.realpath(path1), os.path.realpath(path2)
+    return os.path.commonpath([path1, path2]) in (path1, path2)
+
+
+class OutputSink(object):
+    """
+    Where the output goes, one of:
+      - STDOUT
+      - outfile: One file for all the output, which is appended to
+      - outdir: A file for each input file, at the same path under outdir as the input file is under indir
+
+    Files are opened once, when they're first written to (so nothing is created for input without any documents),
+    with a buffer of buffer_size bytes.
+    If fsync_every is more than 0, the output is synced to disk after every fsync_every docs.
+    """
+
+    def __init__(self, outfile: str = None, outdir: str = None, indir: str = None,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE, fsync_every: int = 0):
+        if outfile is not None and outdir is not None:
+            raise TypeError("Only one of outfile and outdir can be given")
+        self.outfile = outfile
+        self.outdir = outdir
+        self.indir = indir
+        self.buffer_size = buffer_size
+        self.fsync_every = fsync_every
+
+        self._outstr = None
+        self._input_path = None
+        self._num_docs = 0
+
+    def output_path(self, input_path: str) -> str:
+        """
+        Returns the path of the output file for an input file, in outdir mode
+        """
+        if self.indir is None:
+            relpath = os.path.basename(input_path)
+        else:
+            relpath = os.path.relpath(input_path, self.indir)
+        return os.path.join(self.outdir, relpath)
+
+    def stream(self, input_path: str = None):
+        """
+        Returns the stream to write the output for an input file to (input_path is None for STDIN)
+        """
+        if self.outdir is None:
+            if self.outfile is None:
+                return sys.stdout
+            if self._outstr is None:
+                # In the case of multiple input files, append mode ('a') means the outputs will all be in the same file
+                self._outstr = open(self.outfile, "a", buffering=self.buffer_size)
+            return self._outstr
+
+        if self._outstr is None or input_path != self._input_path:
+            self._close_file()
+            output_path = self.output_path(input_path)
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+            self._outstr = open(output_path, "w", buffering=self.buffer_size)
+            self._input_path = input_path
+        return self._outstr
+
+    def doc_written(self):
+        """
+        Call this after writing each doc
+        """
+        self._num_docs += 1
+        if self.fsync_every > 0 and self._num_docs % self.fsync_every == 0:
+            self._sync()
+
+    def _sync(self):
+        if self._outstr is not None:
+            self._outstr.flush()
+            os.fsync(self._outstr.fileno())
+
+    def _close_file(self):
+        if self._outstr is not None:
+            if self.fsync_every > 0:
+                self._sync()
+            self._outstr.close()
+            self._outstr = None
+
+    def close(self):
+        if self.outfile is None and self.outdir is None:
+            sys.stdout.flush()
+        self._close_file()
@@ -1,15 +1,57 @@
 import os
 import csv
 
-# LEMMA_FREQ is a dictionary of lemma(string) -> frequency(integer)
-LEMMA_FREQ = {}
-with open(os.path.dirname(os.path.abspath(__file__)) + "/lemmafreq.csv") as csv_file:
-    reader = csv.reader(csv_file, delimiter=',', quotechar='"')
-    for row in reader:
-        LEMMA_FREQ[row[0]] = int(row[1])
+from ciall.utils.lexicon import load_compiled
+
+
+LEMMA_FREQ_FILE = os.path.dirname(os.path.abspath(__file__)) + "/lemmafreq.csv"
+
+# LEMMA_FREQ is a mapping of lemma(string) -> frequency(integer)
+# It's loaded on the first call of lemmafreq(), so importing this module doesn't read the file
+LEMMA_FREQ = None
+
+# With the cache on (see use_lemmafreq_cache()), LEMMA_FREQ is a read-only CompactMap from the cache folder,
+# which is shared by all the processes using it
+_use_cache = False
+_cache_dir = None
+
+
+def read_lemmafreq(csv_file_path):
+    lemma_freq = {}
+    with open(csv_file_path) as csv_file:
+        reader = csv.reader(csv_file, delimiter=',', quotechar='"')
+        for row in reader:
+            lemma_freq[row[0]] = int(row[1])
+    return (lemma_freq,)
+
+
+def use_lemmafreq_cache(cache_dir=None):
+    """
+    Keeps a compiled copy of the lemma frequencies in cache_dir (see ciall.utils.lexicon.load_compiled())
+    from the next call of lemmafreq() on. The ciall_musas_tagger component calls this when its lexicon_cache is on.
+    """
+    global LEMMA_FREQ, _use_cache, _cache_dir
+    if not _use_cache or cache_dir != _cache_dir:
+        _use_cache = True
+        _cache_dir = cache_dir
+        LEMMA_FREQ = None
+
+
+def load_lemmafreq():
+    """
+    Returns LEMMA_FREQ, loading it first if needed
+    """
+    global LEMMA_FREQ
+    if LEMMA_FREQ is None:
+        LEMMA_FREQ, = load_compiled(LEMMA_FREQ_FILE, ("lemmafreq",), read_lemmafreq, _cache_dir, _use_cache)
+    return LEMMA_FREQ
+
 
 def lemmafreq(lemma):
     """
     returns the relative frequency of the given lemma, or 0 if the lemma is unrecognised
     """
-    return LEMMA_FREQ.get(lemma, 0)
\ No newline at end of file
+    lemma_freq = LEMMA_FREQ
+    if lemma_freq is None:
+        lemma_freq = load_lemmafreq()
+    return lemma_freq.get(lemma, 0)
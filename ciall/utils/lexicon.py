@@ -0,0 +1,187 @@
+"""
+lexicon.py
+
+Utilities for reading the single-word and multi-word (M)USAS lexicon files
+
+"""
+
+import os
+import csv
+import hashlib
+from collections.abc import Mapping
+
+import ciall
+from ciall.utils.compact_map import CompactMap, write_compact_map
+
+
+# Compiled lexicons are saved in this folder unless another is given.
+# Note that the ciall_musas_tagger component only uses the cache when its lexicon_cache option is turned on.
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "ciall")
+
+
+def read_sw_lexicon(tsv_file_path: str) -> tuple[dict, dict]:
+    """
+    Read a single-word lexicon TSV file in one pass.
+
+    This gives the same result as calling pymusas' LexiconCollection.from_tsv() twice,
+    once with include_pos=True and once with include_pos=False, but only reads the file once.
+
+    Returns a tuple containing:
+      - The POS-keyed lexicon, i.e. {"lemma|pos": [semantic_tags]}
+      - The lemma-only lexicon, i.e. {"lemma": [semantic_tags]}
+    """
+    pos_lexicon = {}
+    lemma_lexicon = {}
+
+    with open(tsv_file_path, 'r', newline='', encoding='utf-8') as fp:
+        csv_reader = csv.DictReader(fp, delimiter='\t')
+        field_names = set(csv_reader.fieldnames or [])
+        if not {'lemma', 'semantic_tags'}.issubset(field_names):
+            raise ValueError("The lexicon file %s must have a header containing at least "
+                             "the fields 'lemma' and 'semantic_tags'. Found: %s" % (tsv_file_path, field_names))
+        has_pos = 'pos' in field_names
+
+        for row in csv_reader:
+            lemma = row['lemma']
+            semantic_tags = row['semantic_tags'].split()
+            pos = row['pos'] if has_pos else None
+            if pos is not None:
+                pos_lexicon["%s|%s" % (lemma, pos)] = semantic_tags
+            else:
+                pos_lexicon[lemma] = semantic_tags
+            lemma_lexicon[lemma] = semantic_tags
+
+    return pos_lexicon, lemma_lexicon
+
+
+def read_mw_lexicon(tsv_file_path: str) -> dict:
+    """
+    Read a multi-word expression lexicon TSV file.
+
+    Returns a dict of {"mwe_template": [semantic_tags]}, the same as pymusas' MWELexiconCollection.from_tsv(),
+    but without compiling every template into a MWELexiconCollection along the way.
+    """
+    mw_lexicon = {}
+
+    with open(tsv_file_path, 'r', newline='', encoding='utf-8') as fp:
+        csv_reader = csv.DictReader(fp, delimiter='\t')
+        field_names = set(csv_reader.fieldnames or [])
+        if not {'mwe_template', 'semantic_tags'}.issubset(field_names):
+            raise ValueError("The lexicon file %s must have a header containing at least "
+                             "the fields 'mwe_template' and 'semantic_tags'. Found: %s" % (tsv_file_path, field_names))
+
+        for row in csv_reader:
+            mw_lexicon[row['mwe_template']] = row['semantic_tags'].split()
+
+    return mw_lexicon
+
+
+def file_digest(file_path: str) -> str:
+    """
+    Returns the sha256 hex digest of the contents of the given file
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as fin:
+        for chunk in iter(lambda: fin.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compiled_lexicon_path(tsv_file_path: str, kind: str, cache_dir: str = None) -> str:
+    """
+    Returns the path of the compiled version of a lexicon file.
+    The file name starts with the hash of the lexicon's path, followed by the hash of the lexicon contents
+    and the ciall version, so editing the lexicon (or upgrading ciall) gives a new path and the old compiled
+    file is not used.
+    """
+    if cache_dir is None:
+        cache_dir = DEFAULT_CACHE_DIR
+    digest = hashlib.sha256(("%s:%s:%s" % (ciall.__version__, kind, file_digest(tsv_file_path))).encode())
+    return os.path.join(cache_dir, "%s.%s.%s.bin" % (_source_key(tsv_file_path), kind, digest.hexdigest()))
+
+
+def _source_key(tsv_file_path: str) -> str:
+    """
+    Returns a short hash of the absolute path of a lexicon file, which the names of its compiled copies start with
+    """
+    return hashlib.sha256(os.path.abspath(tsv_file_path).encode()).hexdigest()[:16]
+
+
+def prune_compiled(compiled_path: str):
+    """
+    Deletes the other compiled copies of the same kind of the same lexicon file as compiled_path,
+    i.e. those from earlier versions of the lexicon or of ciall, so the cache folder doesn't keep growing.
+    Processes that still have an old copy memory-mapped keep it until they close it.
+    """
+    cache_dir, file_name = os.path.split(compiled_path)
+    source_key, kind, _, _ = file_name.split(".")
+    prefix = "%s.%s." % (source_key, kind)
+    for old_file_name in os.listdir(cache_dir):
+        if old_file_name.startswith(prefix) and old_file_name.endswith(".bin") and old_file_name != file_name:
+            try:
+                os.unlink(os.path.join(cache_dir, old_file_name))
+            except OSError:
+                # E.g. another process has already deleted it
+                pass
+
+
+def load_compiled(file_path: str, kinds: tuple, read_function, cache_dir: str = None, use_cache: bool = True) -> tuple:
+    """
+    Reads a file into one or more mappings with read_function(file_path), which must return a tuple of
+    mappings, one for each of the given kinds. Each mapping is compiled into a CompactMap file in the cache
+    folder, which is memory-mapped by every process that uses it. The compiled files are (re-)built
+    whenever the file changes, and the out of date ones are deleted.
+
+    Returns a tuple of CompactMaps, or of whatever read_function returns if use_cache is False
+    or if the compiled files can't be written.
+    """
+    if not use_cache:
+        return read_function(file_path)
+
+    compiled_paths = [compiled_lexicon_path(file_path, kind, cache_dir) for kind in kinds]
+    try:
+        return tuple(CompactMap(compiled_path) for compiled_path in compiled_paths)
+    except (OSError, ValueError):
+        # Either it hasn't been compiled yet, or a compiled file is unreadable
+        pass
+
+    data = read_function(file_path)
+    try:
+        for compiled_path, mapping in zip(compiled_paths, data):
+            write_compact_map(compiled_path, mapping)
+            prune_compiled(compiled_path)
+        return tuple(CompactMap(compiled_path) for compiled_path in compiled_paths)
+    except (OSError, ValueError):
+        # Not being able to write the cache shouldn't stop the pipeline
+        return data
+
+
+def load_sw_lexicon(tsv_file_path: str, cache_dir: str = None, use_cache: bool = True) -> tuple[Mapping, Mapping]:
+    """
+    The same as read_sw_lexicon(), but uses a compiled copy of the lexicon from the cache folder where possible.
+    The compiled copy is (re-)built whenever the lexicon file changes.
+    """
+    pos_lexicon, lemma_lexicon = load_compiled(tsv_file_path, ("sw_pos", "sw_lemma"), read_sw_lexicon,
+                                               cache_dir, use_cache)
+    return pos_lexicon, lemma_lexicon
+
+
+def load_mw_lexicon(tsv_file_path: str, cache_dir: str = None, use_cache: bool = True) -> Mapping:
+    """
+    The same as read_mw_lexicon(), but uses a compiled copy of the lexicon from the cache folder where possible.
+    The compiled copy is (re-)built whenever the lexicon file changes.
+    """
+    mw_lexicon, = load_compiled(tsv_file_path, ("mw",), lambda path: (read_mw_lexicon(path),), cache_dir, use_cache)
+    return mw_lexicon
+
+
+def load_mw_trie(tsv_file_path: str, cache_dir: str = None, use_cache: bool = True) -> Mapping:
+    """
+    Returns the trie of the MWE templates without wildcards (see ciall.utils.native_tagger.build_mwe_trie),
+    using a compiled copy from the cache folder where possible.
+    """
+    # Imported here so that the modules which only need the cache (e.g. ciall.utils.lemmafreq) don't load pymusas
+    from ciall.utils.native_tagger import build_mwe_trie
+    mw_trie, = load_compiled(tsv_file_path, ("mw_trie",), lambda path: (build_mwe_trie(read_mw_lexicon(path)),),
+                             cache_dir, use_cache)
+    return mw_trie
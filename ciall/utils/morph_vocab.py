@@ -0,0 +1,103 @@
+"""
+morph_vocab.py
+
+An interned vocabulary of the morphological tags output by the Irish FST, as defined here:
+    https://www.scss.tcd.ie/~uidhonne/morphtag.htm
+
+Each tag is given its own bit the first time it's seen, so a set of tags can be kept as an integer bitmask,
+and testing for a tag (or for several tags at once) is a single AND:
+
+    >>> noun = MORPH_VOCAB.mask(["Noun"])
+    >>> mask = MORPH_VOCAB.mask(["Noun", "Masc", "Com", "Sg"])
+    >>> mask & noun == noun
+    True
+
+Bits are never reused, so masks stay valid for the life of the process (but not across processes).
+
+As a bitmask doesn't keep the order of the tags, lists of tags are also interned as tuples (see intern_tags()),
+so the tokens with the same tags share one tuple and the tags can be written out in their original order.
+At most MAX_TAG_LISTS tuples are kept, so odd input can't grow the table for ever.
+
+"""
+
+
+# The most tuples of tags that a MorphVocab keeps for sharing (there are a few thousand in a large corpus)
+MAX_TAG_LISTS = 1 << 16
+
+
+class MorphVocab(object):
+    """
+    A vocabulary of morphological tags, with a bit for each tag
+    """
+
+    def __init__(self, tags: list[str] = (), max_tag_lists: int = MAX_TAG_LISTS):
+        # The tag of each bit, by bit index
+        self.tags = []
+        # Tag -> bit
+        self.bits = {}
+        # Tuple of tags -> (the same tuple, its bitmask)
+        self._tag_lists = {}
+        self.max_tag_lists = max_tag_lists
+        for tag in tags:
+            self.intern(tag)
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+    def __contains__(self, tag: str) -> bool:
+        return tag in self.bits
+
+    def intern(self, tag: str) -> int:
+        """
+        Returns the bit of a tag, adding the tag to the vocabulary if it's new
+        """
+        bit = self.bits.get(tag)
+        if bit is None:
+            bit = 1 << len(self.tags)
+            self.tags.append(tag)
+            self.bits[tag] = bit
+        return bit
+
+    def mask(self, tags: list[str]) -> int:
+        """
+        Returns the bitmask of a list of tags, adding any new tags to the vocabulary
+        """
+        bits = self.bits
+        mask = 0
+        for tag in tags:
+            bit = bits.get(tag)
+            if bit is None:
+                bit = self.intern(tag)
+            mask |= bit
+        return mask
+
+    def intern_tags(self, tags: list[str]) -> tuple[tuple[str, ...], int]:
+        """
+        Returns a tuple of the tags (the same tuple for all equal lists of tags) and the bitmask of the tags.
+        When the table of tuples is full it's emptied, so from then on new tuples are shared again,
+        but they aren't the same objects as the ones returned before.
+        """
+        tags = tuple(tags)
+        interned = self._tag_lists.get(tags)
+        if interned is None:
+            if len(self._tag_lists) >= self.max_tag_lists:
+                self._tag_lists.clear()
+            interned = self._tag_lists[tags] = (tags, self.mask(tags))
+        return interned
+
+    def tags_of(self, mask: int) -> list[str]:
+        """
+        Returns the tags in a bitmask, in the order they were added to the vocabulary
+        """
+        tags = []
+        index = 0
+        while mask:
+            if mask & 1:
+                tags.append(self.tags[index])
+            mask >>= 1
+            index += 1
+        return tags
+
+
+# The vocabulary of all the morphological tags seen so far (see ciall.utils.pos2par)
+MORPH_VOCAB = MorphVocab()
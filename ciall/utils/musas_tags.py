@@ -6,8 +6,11 @@ This file contains utilities for dealing with the (M)USAS tagset
 """
 
 import re
+import functools
 from enum import Enum
 
+import numpy as np
+
 
 DESCRIPTIONS = {
     # A: GENERAL AND ABSTRACT TERMS
@@ -339,31 +342,122 @@ TAG_COMP_VALUES = {
 }
 
 
+# The maximum number of parsed tags kept by each of Tag.parse(), CompoundTag.parse() and MultiSenseTag.parse()
+PARSE_CACHE_SIZE = 16384
+
+
+# Each category (e.g. 'A1.2') has an integer id. The categories in DESCRIPTIONS come first,
+# and any others are given the next id when they're first seen.
+_CATEGORY_IDS = {}
+_CATEGORIES = []  # (field, subdivisions) for each category id
+
+def _category_id(field: str, subdivisions: tuple) -> int:
+    category = field + ".".join(subdivisions)
+    category_id = _CATEGORY_IDS.get(category)
+    if category_id is None:
+        category_id = _CATEGORY_IDS.setdefault(category, len(_CATEGORIES))
+        if category_id == len(_CATEGORIES):
+            _CATEGORIES.append((field, subdivisions))
+    return category_id
+
+for _category in DESCRIPTIONS:
+    _category_id(_category[0], tuple(_category[1:].split(".")) if len(_category) > 1 else ())
+del _category
+
+
+# The symbols of a tag are stored as bit flags: one bit for each of the EXTRA_CHARS,
+# then two bits for the number of '+' and two bits for the number of '-'
+SYMBOL_FLAGS = {c: 1 << i for i, c in enumerate(EXTRA_CHARS)}
+PLUS_SHIFT = len(EXTRA_CHARS)
+MINUS_SHIFT = PLUS_SHIFT + 2
+
+
+# The comparison between two different categories, keyed by (category id, category id).
+# This is filled in as pairs of categories are compared.
+_CATEGORY_COMPARISONS = {}
+
+def _compare_categories(self_id: int, other_id: int) -> TagComparison:
+    """
+    Compares two different categories (so they can't be EQUAL or SAME_CATEGORY)
+    """
+    comparison = _CATEGORY_COMPARISONS.get((self_id, other_id))
+    if comparison is not None:
+        return comparison
+
+    self_field, self_subdivisions = _CATEGORIES[self_id]
+    other_field, other_subdivisions = _CATEGORIES[other_id]
+    if self_field != other_field:
+        comparison = TagComparison.UNEQUAL
+    elif self_subdivisions[0] != other_subdivisions[0]:
+        comparison = TagComparison.SAME_FIELD
+    elif other_subdivisions[:len(self_subdivisions)] == self_subdivisions:
+        # 'self' is a sub-category of 'other'
+        comparison = TagComparison.SUB_CATEGORY
+    else:
+        # The tags are of the same top-level subdivision
+        comparison = TagComparison.SAME_1L_DIV
+
+    _CATEGORY_COMPARISONS[(self_id, other_id)] = comparison
+    return comparison
+
+
 class Tag:
     """
     A simple tag (i.e. not a compound one)
+    Tags are immutable. Use Tag.parse() rather than Tag() to get a shared instance for each tag string.
     """
 
+    __slots__ = ('tag_str', 'field', 'subdivisions_str', 'subdivisions', 'symbols', 'symbols_str',
+                 'category', 'field_description', '_category_description',
+                 'category_id', 'symbol_flags', '_unmatched')
+
     TAG_REGEX = re.compile("([ABCEFGHIKLMNOPQSTWXYZ])([0-9.]+)([%@fmnci]*)(\\+{0,3}\\-{0,3})")
 
     def __init__(self, tag_str: str):
-        self.tag_str = tag_str.strip()
+        tag_str = tag_str.strip()
 
-        match_res = self.TAG_REGEX.search(self.tag_str)
+        match_res = self.TAG_REGEX.search(tag_str)
         if match_res is None:
             raise TypeError("'%s' is an invalid Tag value" % tag_str)
 
-        self.field = match_res.group(1)
-
-        self.subdivisions_str = match_res.group(2)
-        self.subdivisions = self.subdivisions_str.split(".")
-
+        field = match_res.group(1)
+        subdivisions_str = match_res.group(2)
         symbols_str = match_res.group(3)
-        self.symbols = set([c for c in symbols_str])
         plusminus_str = match_res.group(4)
+        symbols = set(symbols_str)
         if plusminus_str != "":
-            self.symbols.add(plusminus_str)
-        self.symbols_str = symbols_str + plusminus_str
+            symbols.add(plusminus_str)
+        category = "%s%s" % (field, subdivisions_str)
+        subdivisions = tuple(subdivisions_str.split("."))
+
+        symbol_flags = 0
+        for c in symbols_str:
+            symbol_flags |= SYMBOL_FLAGS[c]
+        symbol_flags |= (plusminus_str.count("+") << PLUS_SHIFT) | (plusminus_str.count("-") << MINUS_SHIFT)
+
+        _set = object.__setattr__
+        _set(self, 'tag_str', tag_str)
+        _set(self, 'field', field)
+        _set(self, 'subdivisions_str', subdivisions_str)
+        _set(self, 'subdivisions', subdivisions)
+        _set(self, 'symbols', frozenset(symbols))
+        _set(self, 'symbols_str', symbols_str + plusminus_str)
+        _set(self, 'category', category)
+        _set(self, 'field_description', DESCRIPTIONS[field])
+        _set(self, '_category_description', DESCRIPTIONS.get(category))
+        _set(self, 'category_id', _category_id(field, subdivisions))
+        _set(self, 'symbol_flags', symbol_flags)
+        _set(self, '_unmatched', tag_str == "Z99")
+
+    @classmethod
+    def parse(cls, tag_str: str) -> 'Tag':
+        """
+        Returns the Tag for the given string. Tags are cached, so the same string gives the same instance.
+        """
+        return _parse_tag(tag_str)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("%s is immutable" % self.__class__.__name__)
 
     def __str__(self) -> str:
         return self.tag_str
@@ -371,21 +465,19 @@ class Tag:
     def __repr__(self) -> str:
         return "%s(%s)" % (self.__class__.__name__, str(self))
 
-    @property
-    def category(self) -> str:
-        return "%s%s" % (self.field, self.subdivisions_str)
-
-    @property
-    def field_description(self) -> str:
-        return DESCRIPTIONS[self.field]
-
     @property
     def category_description(self) -> str:
-        return DESCRIPTIONS[self.category]
+        if self._category_description is None:
+            raise KeyError(self.category)
+        return self._category_description
 
     def __eq__(self, other: 'Tag') -> bool:
-        return (self.field, self.subdivisions, self.symbols) == \
-            (other.field, other.subdivisions, other.symbols)
+        if not isinstance(other, Tag):
+            return NotImplemented
+        return (self.category_id, self.symbol_flags) == (other.category_id, other.symbol_flags)
+
+    def __hash__(self) -> int:
+        return hash((self.category_id, self.symbol_flags))
 
     def compare(self, other: 'Tag') -> TagComparison:
         """
@@ -393,35 +485,19 @@ class Tag:
         Returns: a TagComparison object (enum)
         """
         # If either of them is Z99 then they are unequal
-        if (self.tag_str == "Z99") or (other.tag_str == "Z99"):
+        if self._unmatched or other._unmatched:
             return TagComparison.UNEQUAL
 
-        # if everything matches, EQUAL
-        if self == other:
-            return TagComparison.EQUAL
-
-        if self.category == other.category:
+        if self.category_id == other.category_id:
+            if self.symbol_flags == other.symbol_flags:
+                # if everything matches, EQUAL
+                return TagComparison.EQUAL
             # Category is equal (but symbols are not)
             return TagComparison.SAME_CATEGORY
 
-        if self.field == other.field:
-            # Fields are the same, but how similar are the subdivisions?
-            # if top-level subdivision matches, 
-            if self.subdivisions[0] == other.subdivisions[0]:
-                # is 'self' a sub-category of 'other'?
-                len_sds_self = len(self.subdivisions)
-                len_sds_other = len(other.subdivisions)
-                if (len_sds_other >= len_sds_self) and (other.subdivisions[:len_sds_self] == self.subdivisions):
-                    return TagComparison.SUB_CATEGORY
-
-                # The tags are of the same top-level subdivision
-                return TagComparison.SAME_1L_DIV
+        # Otherwise it only depends on the categories
+        return _compare_categories(self.category_id, other.category_id)
 
-            return TagComparison.SAME_FIELD
-
-        # at this point, we know the field is different, so they're UNEQUAL
-        return TagComparison.UNEQUAL
-    
     def match(self, other: 'Tag') -> float:
         """
         Compare this Tag with another and return a match value
@@ -430,15 +506,33 @@ class Tag:
         return TAG_COMP_VALUES[self.compare(other)]
 
 
+_parse_tag = functools.lru_cache(maxsize=PARSE_CACHE_SIZE)(Tag)
+
+
 class CompoundTag:
     """
     A compound tag is one with multiple tags separated by forward slashes.
-    This indicates membership of multiple categories
+    This indicates membership of multiple categories.
+    Compound tags are immutable. Use CompoundTag.parse() to get a shared instance for each tag string.
     """
 
+    __slots__ = ('cmp_tag_str', 'tags')
+
     def __init__(self, cmp_tag_str: str):
-        self.cmp_tag_str = cmp_tag_str.strip()
-        self.tags = [Tag(tag) for tag in self.cmp_tag_str.split("/") if tag != '']
+        cmp_tag_str = cmp_tag_str.strip()
+        object.__setattr__(self, 'cmp_tag_str', cmp_tag_str)
+        object.__setattr__(self, 'tags', tuple(Tag.parse(tag) for tag in cmp_tag_str.split("/") if tag != ''))
+
+    @classmethod
+    def parse(cls, cmp_tag_str: str) -> 'CompoundTag':
+        """
+        Returns the CompoundTag for the given string. Compound tags are cached, so the same string
+        gives the same instance.
+        """
+        return _parse_compound_tag(cmp_tag_str)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("%s is immutable" % self.__class__.__name__)
 
     def __str__(self) -> str:
         return self.cmp_tag_str
@@ -484,18 +578,36 @@ class CompoundTag:
             return 0.0
 
 
+_parse_compound_tag = functools.lru_cache(maxsize=PARSE_CACHE_SIZE)(CompoundTag)
+
+
 class MultiSenseTag:
     """
     A 'tag' sting that has multiple possible matches, separated by spaces.
     This indicates that there are multiple possible 'matches' for a particular token.
     This is probably because there are multiple possible 'senses' for the token, but that may not always be the case.
     'MultiSenseTag' isn't the best name for this, but it'll do.
+    Multi-sense tags are immutable. Use MultiSenseTag.parse() to get a shared instance for each tag string.
     """
 
+    __slots__ = ('ms_tag_str', 'senses')
+
     def __init__(self, ms_tag_str: str):
-        self.ms_tag_str = ms_tag_str.strip()
+        object.__setattr__(self, 'ms_tag_str', ms_tag_str.strip())
         senses = [s for s in re.split(" |,", ms_tag_str) if s != ""]  # Make sure there are no extra spaces
-        self.senses = [CompoundTag(ct) for ct in senses]  # each 'sense' is treated as a compound tag
+        # each 'sense' is treated as a compound tag
+        object.__setattr__(self, 'senses', tuple(CompoundTag.parse(ct) for ct in senses))
+
+    @classmethod
+    def parse(cls, ms_tag_str: str) -> 'MultiSenseTag':
+        """
+        Returns the MultiSenseTag for the given string. Multi-sense tags are cached, so the same string
+        gives the same instance.
+        """
+        return _parse_multi_sense_tag(ms_tag_str)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("%s is immutable" % self.__class__.__name__)
 
     def __str__(self) -> str:
         return self.ms_tag_str
@@ -529,4 +641,115 @@ class MultiSenseTag:
         if num_match_values == 0:
             return 0.0
         else:
-            return sum(match_values) / num_match_values
\ No newline at end of file
+            return sum(match_values) / num_match_values
+
+
+_parse_multi_sense_tag = functools.lru_cache(maxsize=PARSE_CACHE_SIZE)(MultiSenseTag)
+
+
+def match_batch(predicted_tags: list[list[str]], expected_tags: list[str]) -> np.ndarray:
+    """
+    Computes MultiSenseTag.match() for many tokens at once, for example:
+        match_batch([token._.musas_tags for token in doc], [token._.expected_musas_tag for token in doc])
+    gives the same values as:
+        [MultiSenseTag.parse(" ".join(musas_tags)).match(MultiSenseTag.parse(expected_tag).senses[0])
+         for musas_tags, expected_tag in zip(...)]
+
+    Tokens with the same predicted and expected tags are only scored once. Every (predicted tag, expected tag)
+    pair of the distinct tokens is laid out in flat NumPy arrays, each distinct pair of tags is compared once,
+    and the compound tag and multi-sense weightings are then worked out for all of the senses and tokens together.
+
+    Returns an array of match values (0.0 -> 1.0), one for each token.
+    """
+    POSITION_WEIGHT = 0.7
+    NUM_SENSES_WEIGHT = 0.3
+
+    # Tags are given integer ids within the batch
+    tag_ids = {}
+
+    # For each (predicted tag, expected tag) pair, in the same order as MultiSenseTag.match() compares them
+    pair_senses = []         # The index of the predicted sense (across the whole batch)
+    pair_predicted_tags = [] # The index of the predicted tag (across the whole batch)
+    pair_expected_tags = []  # The index of the tag in the expected compound tag
+    pair_tag_ids = []        # (predicted tag id, expected tag id)
+
+    # For each predicted sense
+    sense_tokens = []        # The index of the token
+    sense_positions = []     # The position of the sense, starting from 1
+    sense_num_senses = []    # The number of senses the token has
+    sense_num_tags = []      # The number of tags in the sense
+    sense_num_expected = []  # The number of tags in the expected compound tag
+
+    # The index of each token's (predicted tags, expected tag) in distinct_tokens
+    distinct_tokens = {}
+    token_indexes = [distinct_tokens.setdefault((" ".join(musas_tags), expected_tag), len(distinct_tokens))
+                     for musas_tags, expected_tag in zip(predicted_tags, expected_tags)]
+
+    num_predicted_tags = 0
+    max_expected_tags = 1
+    for token_index, (musas_tags_str, expected_tag) in enumerate(distinct_tokens):
+        senses = MultiSenseTag.parse(musas_tags_str).senses
+        expected = MultiSenseTag.parse(expected_tag).senses[0].tags
+        expected_ids = [tag_ids.setdefault(tag, len(tag_ids)) for tag in expected]
+        max_expected_tags = max(max_expected_tags, len(expected))
+
+        for position, sense in enumerate(senses, 1):
+            sense_index = len(sense_tokens)
+            sense_tokens.append(token_index)
+            sense_positions.append(position)
+            sense_num_senses.append(len(senses))
+            sense_num_tags.append(len(sense.tags))
+            sense_num_expected.append(len(expected))
+            for tag in sense.tags:
+                tag_id = tag_ids.setdefault(tag, len(tag_ids))
+                for expected_index, expected_id in enumerate(expected_ids):
+                    pair_senses.append(sense_index)
+                    pair_predicted_tags.append(num_predicted_tags)
+                    pair_expected_tags.append(expected_index)
+                    pair_tag_ids.append((tag_id, expected_id))
+                num_predicted_tags += 1
+
+    num_tokens = len(distinct_tokens)
+    num_senses = len(sense_tokens)
+    if not pair_tag_ids:
+        return np.zeros(len(token_indexes))
+
+    # Compare each distinct pair of tags once
+    tags = list(tag_ids)
+    pair_codes = np.array(pair_tag_ids, dtype=np.int64)
+    pair_codes = pair_codes[:, 0] * len(tags) + pair_codes[:, 1]
+    unique_codes, pair_unique = np.unique(pair_codes, return_inverse=True)
+    unique_values = np.array([tags[code // len(tags)].match(tags[code % len(tags)]) for code in unique_codes])
+    pair_values = unique_values[pair_unique]
+    pair_matched = pair_values > 0.0
+
+    # CompoundTag.match() for each sense
+    pair_senses = np.array(pair_senses)
+    num_matches = np.bincount(pair_senses, weights=pair_matched, minlength=num_senses)
+    sum_matches = np.bincount(pair_senses, weights=pair_values, minlength=num_senses)
+    # The proportion of the sense's tags that matched any expected tag
+    predicted_matched = np.bincount(pair_predicted_tags, weights=pair_matched, minlength=num_predicted_tags) > 0
+    predicted_tag_senses = np.repeat(np.arange(num_senses), sense_num_tags)
+    num_predicted_matched = np.bincount(predicted_tag_senses, weights=predicted_matched, minlength=num_senses)
+    # The proportion of the expected tags that matched any of the sense's tags
+    expected_slots = pair_senses * max_expected_tags + np.array(pair_expected_tags)
+    expected_matched = np.bincount(expected_slots, weights=pair_matched, minlength=num_senses * max_expected_tags) > 0
+    num_expected_matched = expected_matched.reshape(num_senses, max_expected_tags).sum(axis=1)
+
+    has_match = num_matches > 0
+    sense_values = np.zeros(num_senses)
+    sense_values[has_match] = ((sum_matches[has_match] / num_matches[has_match]) *
+                               (num_predicted_matched[has_match] / np.array(sense_num_tags)[has_match]) *
+                               (num_expected_matched[has_match] / np.array(sense_num_expected)[has_match]))
+
+    # MultiSenseTag.match() for each token
+    sense_matched = sense_values > 0.0
+    multipliers = (POSITION_WEIGHT / np.array(sense_positions)) + (NUM_SENSES_WEIGHT / np.array(sense_num_senses))
+    sense_tokens = np.array(sense_tokens)
+    num_token_matches = np.bincount(sense_tokens, weights=sense_matched, minlength=num_tokens)
+    sum_token_matches = np.bincount(sense_tokens, weights=np.where(sense_matched, sense_values * multipliers, 0.0),
+                                    minlength=num_tokens)
+    values = np.zeros(num_tokens)
+    token_matched = num_token_matches > 0
+    values[token_matched] = sum_token_matches[token_matched] / num_token_matches[token_matched]
+    return values[np.array(token_indexes, dtype=np.int64)]
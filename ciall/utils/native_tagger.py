@@ -0,0 +1,318 @@
+"""
+native_tagger.py
+
+A ciall-specific replacement for pymusas' RuleBasedTagger.
+
+Single-word matches are found with a chain of dictionary lookups per token, rather than by
+evaluating pymusas' generic SingleWordRule and ranking every candidate match.
+Multi-word expressions are found by walking a trie of the MWE lexicon, rather than by
+looking up every n-gram in the text with pymusas' MWERule.
+
+"""
+
+import re
+import functools
+
+from pymusas.lexicon_collection import MWELexiconCollection
+
+
+UNMATCHED_TAGS = ("Z99",)
+
+# The MWE match types, in ranking order (see pymusas' ContextualRuleBasedRanker)
+MWE_NON_SPECIAL = 1
+MWE_WILDCARD = 2
+
+# The lexical match types, in ranking order (see pymusas' LexicalMatch)
+TOKEN = 1
+LEMMA = 2
+TOKEN_LOWER = 3
+LEMMA_LOWER = 4
+
+
+class SingleWordIndex:
+    """
+    A lookup index for the single-word lexicon.
+
+    Lemma-based matches are prioritised over token-based matches, because in Irish there are mutations
+    that can lead to mis-matches on the token, e.g. 'láir' is the genitive of 'lár' (NOUN, 'centre'),
+    but it clashes with 'láir' (NOUN, 'mare').
+
+    For each token, the index is probed in this order, and the first match found is used:
+      1. lemma|POS
+      2. token|POS
+      3. lowercased lemma|POS
+      4. lowercased token|POS
+      5. lemma
+      6. token
+      7. lowercased lemma
+      8. lowercased token
+    """
+
+    def __init__(self, pos_lexicon: dict, lemma_lexicon: dict):
+        # pos_lexicon is keyed by "lemma|pos", lemma_lexicon is keyed by "lemma"
+        self.pos_lexicon = pos_lexicon
+        self.lemma_lexicon = lemma_lexicon
+
+    def __len__(self):
+        return len(self.pos_lexicon) + len(self.lemma_lexicon)
+
+    def lookup(self, token: str, lemma: str, pos: str):
+        """
+        Returns the semantic tags for the token, or None if there is no match
+        """
+        forms = (lemma, token, lemma.lower(), token.lower())
+
+        pos_lexicon = self.pos_lexicon
+        for form in forms:
+            tags = pos_lexicon.get("%s|%s" % (form, pos))
+            if tags is not None:
+                return tags
+
+        lemma_lexicon = self.lemma_lexicon
+        for form in forms:
+            tags = lemma_lexicon.get(form)
+            if tags is not None:
+                return tags
+
+        return None
+
+
+def build_mwe_trie(mwe_lexicon: dict) -> dict:
+    """
+    Compiles the MWE templates without wildcards into a trie, stored as a dict where each key is a
+    template prefix ("word1_POS1 word2_POS2"). The value is the template's semantic tags if the prefix
+    is a whole template, or an empty list otherwise.
+    """
+    trie = {}
+    for template, semantic_tags in mwe_lexicon.items():
+        if '*' in template or '{' in template or '}' in template:
+            continue
+        elements = template.split()
+        for i in range(1, len(elements)):
+            trie.setdefault(" ".join(elements[:i]), [])
+        trie[" ".join(elements)] = semantic_tags
+    return trie
+
+
+class MWEMatcher:
+    """
+    Finds multi-word expression (MWE) matches, and chooses the best match for each token
+    in the same way as pymusas' MWERule and ContextualRuleBasedRanker.
+
+    MWE templates without wildcards are compiled into a trie (see build_mwe_trie()), unless a pre-compiled
+    trie is given. The trie is walked from each token, so each match is found in a single left-to-right pass
+    that stops as soon as no template starts with the tokens seen so far.
+    This means the cost doesn't depend on the size of the lexicon.
+
+    MWE templates with wildcards (e.g. "tar_* éis_*") are matched with regular expressions, but each one
+    is indexed by an anchor: its first element without any wildcards (e.g. "tar_Sp"), or failing that
+    its first literal word (e.g. "tar") or literal POS tag. The regex is only tried where the anchor
+    occurs in the text, at the position given by the anchor's offset in the template, so the cost depends
+    on the number of anchor hits rather than the number of wildcard templates. Templates with no
+    literal parts at all (e.g. "*_* *_*") are tried at every position.
+    """
+
+    def __init__(self, mwe_lexicon: dict, trie: dict = None):
+        self.trie = build_mwe_trie(mwe_lexicon) if trie is None else trie
+        # Wildcard templates are stored as tuples of (anchor_offset, n, num_wildcards, order, regex, semantic_tags).
+        # Equally ranked matches are chosen in lexicon order (pymusas chooses one at random)
+        self.symbol_anchors = {}
+        self.word_anchors = {}
+        self.pos_anchors = {}
+        self.unanchored_templates = []
+        self.longest_wildcard_template = 0
+
+        for order, template in enumerate(mwe_lexicon):
+            if '*' not in template:
+                continue
+            if '{' in template or '}' in template:
+                # Curly brace templates are not supported (pymusas ignores them too)
+                continue
+            elements = template.split()
+            if len(elements) < 2:
+                # Like pymusas, only n-grams of two or more tokens are matched
+                continue
+            regex = re.compile(MWELexiconCollection.escape_mwe(template))
+            self._add_wildcard_template(elements, template.count('*'), order, regex, mwe_lexicon[template])
+            self.longest_wildcard_template = max(self.longest_wildcard_template, len(elements))
+
+    def _add_wildcard_template(self, elements: list[str], num_wildcards: int, order: int, regex,
+                              semantic_tags: list[str]):
+        entry = (len(elements), num_wildcards, order, regex, semantic_tags)
+        token_pos_pairs = [element.split('_') for element in elements]
+        # pymusas doesn't escape the POS tags in templates, so only plain POS tags can be compared directly
+        literal_pos = [('*' not in pos) and (re.escape(pos) == pos) for _, pos in token_pos_pairs]
+
+        for offset, ((token, pos), pos_is_literal) in enumerate(zip(token_pos_pairs, literal_pos)):
+            if '*' not in token and pos_is_literal:
+                self.symbol_anchors.setdefault(elements[offset], []).append((offset,) + entry)
+                return
+        for offset, (token, _) in enumerate(token_pos_pairs):
+            if '*' not in token:
+                self.word_anchors.setdefault(token, []).append((offset,) + entry)
+                return
+        for offset, ((_, pos), pos_is_literal) in enumerate(zip(token_pos_pairs, literal_pos)):
+            if pos_is_literal:
+                self.pos_anchors.setdefault(pos, []).append((offset,) + entry)
+                return
+        self.unanchored_templates.append((0,) + entry)
+
+    def __len__(self):
+        return (len(self.trie) + len(self.unanchored_templates) +
+                sum(len(templates)
+                    for anchors in (self.symbol_anchors, self.word_anchors, self.pos_anchors)
+                    for templates in anchors.values()))
+
+    def _find_matches(self, words: list[str], pos_tags: list[str], lexical_match: int, matches: list):
+        """
+        Appends all matches for a list of words and POS tags to matches, as tuples of:
+          (rank, start, end, semantic_tags)
+        Lower ranks are better.
+        """
+        symbols = ["%s_%s" % (word, pos) for word, pos in zip(words, pos_tags)]
+        trie = self.trie
+        num_symbols = len(symbols)
+
+        # Templates without wildcards
+        for start in range(num_symbols - 1):
+            key = symbols[start]
+            end = start + 1
+            while key in trie:
+                semantic_tags = trie[key]
+                if semantic_tags and (end - start > 1):
+                    n = end - start
+                    matches.append(((MWE_NON_SPECIAL, -n, 0, lexical_match, start, 0), start, end, semantic_tags))
+                if end >= num_symbols:
+                    break
+                key = key + " " + symbols[end]
+                end += 1
+
+        # Templates with wildcards
+        if self.longest_wildcard_template < 2:
+            return
+
+        def try_templates(position, templates):
+            for offset, n, num_wildcards, order, regex, semantic_tags in templates:
+                start = position - offset
+                end = start + n
+                if start < 0 or end > num_symbols:
+                    continue
+                if regex.fullmatch(" ".join(symbols[start:end])):
+                    rank = (MWE_WILDCARD, -n, num_wildcards, lexical_match, start, order)
+                    matches.append((rank, start, end, semantic_tags))
+
+        symbol_anchors = self.symbol_anchors
+        word_anchors = self.word_anchors
+        pos_anchors = self.pos_anchors
+        for position, (symbol, word, pos) in enumerate(zip(symbols, words, pos_tags)):
+            for anchors, key in ((symbol_anchors, symbol), (word_anchors, word), (pos_anchors, pos)):
+                templates = anchors.get(key)
+                if templates:
+                    try_templates(position, templates)
+            if self.unanchored_templates:
+                try_templates(position, self.unanchored_templates)
+
+    def __call__(self, tokens: list[str], lemmas: list[str], pos_tags: list[str]) -> list:
+        """
+        Returns a list containing, for each token, either None if it's not part of a MWE,
+        or a tuple of (start, end, semantic_tags) for the best MWE match that it's part of.
+        """
+        best_matches = [None] * len(tokens)
+        if len(tokens) < 2:
+            return best_matches
+
+        lower_pos_tags = [pos.lower() for pos in pos_tags]
+
+        matches = []
+        self._find_matches(tokens, pos_tags, TOKEN, matches)
+        self._find_matches(lemmas, pos_tags, LEMMA, matches)
+        self._find_matches([token.lower() for token in tokens], lower_pos_tags, TOKEN_LOWER, matches)
+        self._find_matches([lemma.lower() for lemma in lemmas], lower_pos_tags, LEMMA_LOWER, matches)
+
+        # Take the best ranked matches first, skipping any that overlap with a better one
+        matches.sort(key=lambda match: match[0])
+        for _, start, end, semantic_tags in matches:
+            if any(best_matches[start:end]):
+                continue
+            match = (start, end, semantic_tags)
+            for i in range(start, end):
+                best_matches[i] = match
+
+        return best_matches
+
+
+class NativeTagger:
+    """
+    This can be called in the same way as pymusas' RuleBasedTagger,
+    and returns results in the same format.
+
+    If result_cache_size is more than 0, the single-word results for the most recently seen
+    (token, lemma, pos) are kept in a LRU cache of that size. Tokens that are part of a MWE
+    don't use the cache, because their tags depend on the tokens around them.
+    """
+
+    def __init__(self, pos_lexicon: dict, lemma_lexicon: dict, mwe_lexicon: dict, result_cache_size: int = 0,
+                 mwe_trie: dict = None):
+        self.single_word_index = SingleWordIndex(pos_lexicon, lemma_lexicon)
+        self.mwe_matcher = MWEMatcher(mwe_lexicon, mwe_trie)
+        self.result_cache_size = result_cache_size
+        if result_cache_size > 0:
+            self._lookup = functools.lru_cache(maxsize=result_cache_size)(self.single_word_index.lookup)
+        else:
+            self._lookup = self.single_word_index.lookup
+
+    def cache_info(self):
+        """
+        Returns the result cache's hits, misses, maxsize and currsize (see functools.lru_cache),
+        or None if there is no result cache
+        """
+        if self.result_cache_size > 0:
+            return self._lookup.cache_info()
+        return None
+
+    def __call__(self, tokens: list[str], lemmas: list[str], pos_tags: list[str]) -> list[tuple[list[str], list[tuple[int, int]]]]:
+        """
+        For each token, returns a tuple containing:
+          - A list of semantic tags, the first one being the most likely
+          - A list containing a single (start, end) tuple of the token indexes of the match
+        """
+        return self.tag_batch([(tokens, lemmas, pos_tags)])[0]
+
+    def tag_batch(self, texts: list[tuple[list[str], list[str], list[str]]]) -> list[list[tuple[list[str], list[tuple[int, int]]]]]:
+        """
+        Tags a batch of texts, each given as a tuple of (tokens, lemmas, pos_tags).
+        Returns a list of results for each text, in the same format as __call__().
+
+        MWEs are matched per text, but the single-word lexicon is only looked up once
+        for each distinct (token, lemma, pos) in the batch.
+        """
+        for tokens, lemmas, pos_tags in texts:
+            if not (len(tokens) == len(lemmas) == len(pos_tags)):
+                raise ValueError("The tokens, lemmas and pos_tags must be the same length, got %s, %s and %s" %
+                                 (len(tokens), len(lemmas), len(pos_tags)))
+
+        # Multi-word expressions are always ranked above single-word matches,
+        # so any token that is part of the best MWE match gets the MWE's tags
+        best_mwe_matches = [self.mwe_matcher(tokens, lemmas, pos_tags) for tokens, lemmas, pos_tags in texts]
+
+        # Look up each distinct token that isn't part of a MWE once
+        single_word_tags = {}
+        lookup = self._lookup
+        for (tokens, lemmas, pos_tags), mwe_matches in zip(texts, best_mwe_matches):
+            for key, mwe_match in zip(zip(tokens, lemmas, pos_tags), mwe_matches):
+                if mwe_match is None and key not in single_word_tags:
+                    tags = lookup(*key)
+                    single_word_tags[key] = UNMATCHED_TAGS if tags is None else tags
+
+        results = []
+        for (tokens, lemmas, pos_tags), mwe_matches in zip(texts, best_mwe_matches):
+            text_results = []
+            for i, (key, mwe_match) in enumerate(zip(zip(tokens, lemmas, pos_tags), mwe_matches)):
+                if mwe_match is not None:
+                    start, end, tags = mwe_match
+                    text_results.append((list(tags), [(start, end)]))
+                else:
+                    text_results.append((list(single_word_tags[key]), [(i, i + 1)]))
+            results.append(text_results)
+
+        return results
@@ -1,3 +1,7 @@
+import functools
+
+from ciall.utils.morph_vocab import MORPH_VOCAB
+
 
 # Universal dependency tags (https://universaldependencies.org/u/pos/)
 #  ADJ: adjective
@@ -39,6 +43,10 @@ PAR_TO_UDT = {
     "Q": "PART",
 }
 
+# The number of distinct sets of morphological tags whose conversions are cached by pos2par()
+POS2PAR_CACHE_SIZE = 4096
+
+
 # TODO: Make sure all of the rules here are obeyed:
 # https://universaldependencies.org/ga/index.html
 def pos2par(pos_tags, lemma=None):
@@ -51,7 +59,6 @@ def pos2par(pos_tags, lemma=None):
     Arguments:
         pos_tags ([str]): The list of morphological tags associated with the token
         lemma (str): The lemma of the token
-        short (bool): If True, a short version of the tag will be returned
     
     Return:
         A tuple containing:
@@ -60,8 +67,26 @@ def pos2par(pos_tags, lemma=None):
           - Universal dependency tag (str))
     """
 
+    # The rules only check which tags are present, so the conversion is cached on the bitmask of the tags.
+    # None of the rules use the lemma yet (see the 'bí' TODO in PAROLE_RULES), so it isn't part of the key.
+    # The list of tags itself isn't kept, so the memory used is bounded by POS2PAR_CACHE_SIZE.
+    return pos2par_mask(MORPH_VOCAB.mask(pos_tags))
+
+
+def pos2par_cache_info():
+    """
+    Returns the pos2par() cache's hits, misses, maxsize and currsize (see functools.lru_cache)
+    """
+    return pos2par_mask.cache_info()
+
+
+@functools.lru_cache(maxsize=POS2PAR_CACHE_SIZE)
+def pos2par_mask(mask: int):
+    """
+    The same as pos2par(), for the bitmask of the morphological tags (see ciall.utils.morph_vocab)
+    """
     # Build the tag - this returns a list of characters
-    par_long = _build_par_tag(pos_tags, lemma)
+    par_long = _build_par_tag(mask)
 
     # make the par_short tag
     par_short = shorten_par_tag(par_long)
@@ -75,7 +100,6 @@ def pos2par(pos_tags, lemma=None):
     par_short = "".join(par_short).rstrip("-")
     
     # return the PAROLE tag
-    # If short is True, we return shortened versions
     return par_long, par_short, udep
 
 
@@ -92,767 +116,321 @@ def shorten_par_tag(par_long):
         return par_long
 
 
-def _build_par_tag(pos_tags, lemma=None):
-
-    # Convert the list of POS tags into a set, for quick comparisons
-    pos_tags = set(pos_tags)
-
-    # Initialise the resultant PAROLE tag as a list of 9 dashes
-    # This will be converted into a single string tag before return
-    result = ['-', '-', '-', '-', '-', '-', '-', '-', '-']
+# The rules for building a PAROLE tag from a set of morphological tags.
+#
+# A rule is (tags, slots), where tags is a space-separated list of morphological tags that must all be present
+# ("" is always true), and slots is a pattern for the PAROLE tag that sets its characters ('.' leaves the
+# character as it is, e.g. "..ih" sets the 3rd and 4th characters).
+#
+# A slot rule is a list of rules, of which only the first one whose tags are all present is used
+# (like an if/elif chain, so a last rule with the tags "" is the 'else').
+#
+# Each part of speech is (tags, slots, [slot rules]). The first part of speech whose tags are all present is used:
+# its slots are set and then each of its slot rules is applied in turn, so later ones can overwrite earlier ones.
 
-    ### Guessed analyses
-    if ("Guess" in pos_tags) or ("GuessCmpd" in pos_tags):
-        # We can't predict what this is, so we'll just use Unknown
-        result[0] = 'X'
-        result[1] = 'x'
+# Guessed analyses, these are applied before the part of speech
+GUESS_SLOT_RULE = [
+    # We can't predict what this is, so we'll just use Unknown
+    ("Guess", "Xx"),
+    ("GuessCmpd", "Xx"),
+]
 
+PAROLE_RULES = [
     ### Foreign
-    if "Foreign" in pos_tags:
-        result[0] = 'X'
-        result[1] = 'f'
-
+    ("Foreign", "Xf", [
         # English
-        if "English" in pos_tags:
-            result[2] = 'e'
-            if "Noun" in pos_tags:
-                # English Noun
-                result[3] = 'n'
-                if "Prop" in pos_tags:
-                    # Proper Noun
-                    result[4] = 'p'
-                    if "Def" in pos_tags:
-                        # Definite Proper Noun (e.g. 'The Bahamas')
-                        result[5] = 'd'
-            elif "Verb" in pos_tags:
-                # English Verb
-                result[3] = 'v'
-            elif "Adj" in pos_tags:
-                # English Adjective
-                result[3] = 'a'
-            elif "Pron" in pos_tags:
-                # English Pronoun
-                result[3] = 'p'
-            elif "Det" in pos_tags:
-                # English Determiner
-                result[3] = 'd'
-            elif "Adv" in pos_tags:
-                # English Adverb
-                result[3] = 'r'
-            elif "Prep" in pos_tags:
-                # English Preposition
-                result[3] = 's'
-            elif "Conj" in pos_tags:
-                # English Conjunction
-                result[3] = 'c'
-            elif "Num" in pos_tags:
-                # English Numeral
-                result[3] = 'm'
-        
+        [("English", "..e")],
+        [("English Noun", "...n"), ("English Verb", "...v"), ("English Adj", "...a"), ("English Pron", "...p"),
+         ("English Det", "...d"), ("English Adv", "...r"), ("English Prep", "...s"), ("English Conj", "...c"),
+         ("English Num", "...m")],
+        # English Proper Noun
+        [("English Noun Prop", "....p")],
+        # Definite Proper Noun (e.g. 'The Bahamas')
+        [("English Noun Prop Def", ".....d")],
         # Latin
-        if "Latin" in pos_tags:
-            result[2] = 'l'
+        [("Latin", "..l")],
+    ]),
 
     ### Noun
-    elif "Noun" in pos_tags:
-        result[0] = 'N'
-
-        # Noun sub-class
-        if "Verbal" in pos_tags:
-            # Verbal
-            result[1] = 'v'
-        elif "Prop" in pos_tags:
-            # Proper
-            result[1] = 'p'
-        elif "Subst" in pos_tags:
-            # Substantiative
-            result[1] = 's'
-        else:
-            # Common
-            result[1] = 'c'
-
+    ("Noun", "N", [
+        # Noun sub-class: Verbal, Proper, Substantiative or Common
+        [("Verbal", ".v"), ("Prop", ".p"), ("Subst", ".s"), ("", ".c")],
         # Noun Gender
-        if "Masc" in pos_tags:
-            # Masculine
-            result[2] = 'm'
-        elif "Fem" in pos_tags:
-            # Feminine
-            result[2] = 'f'
-        
+        [("Masc", "..m"), ("Fem", "..f")],
         # Noun Number
-        if "Sg" in pos_tags:
-            # Singular
-            result[3] = 's'
-        elif "Pl" in pos_tags:
-            # Plural
-            result[3] = 'p'
-        
-        # Noun Case
-        if "Com" in pos_tags:
-            # Common
-            result[4] = 'c'
-        elif "Gen" in pos_tags:
-            # Genitive
-            result[4] = 'g'
-        elif "Voc" in pos_tags:
-            # Vocative
-            result[4] = 'v'
-        elif "Dat" in pos_tags:
-            # Dative
-            result[4] = 'd'
-        
-        # Noun Contrast
-        if "Emph" in pos_tags:
-            # Emphatic
-            result[6] = 'e'
-        
-        # Noun Derived
-        if "NStem" in pos_tags:
-            # De-nominal
-            result[7] = 'n'
-    
-    ### Verb
-    elif "Verb" in pos_tags:
-        result[0] = 'V'
-
-        # Main
-        result[1] = 'm'
-
-        # TODO: This was in the java version, but it's not in the parole tags definition
-        #if lemma == "bí":
-        #    # 'bí' could be an auxiliary verb
-        #    result[1] = 't'
-        
-        # Verb Mood
-        if "Ind" in pos_tags:
-            # Indicative
-            result[2] = 'i'
-        elif "Subj" in pos_tags:
-            # Subjunctive
-            result[2] = 's'
-        elif "Imper" in pos_tags:
-            # Imperavie
-            result[2] = 'm'
-        elif "Cond" in pos_tags:
-            # Conditional
-            result[2] = 'c'
-
-        # Verb Tense
-        if "Pres" in pos_tags:
-            # Present
-            result[3] = 'p'
-        elif "Past" in pos_tags:
-            # Past
-            result[3] = 's'
-        elif "Fut" in pos_tags:
-            # Future
-            result[3] = 'f'
-        elif "PastImp" in pos_tags:
-            # Indicative Past Imperfect/Habitual
-            result[2] = 'i'
-            result[3] = 'h'
-        elif "FutInd" in pos_tags:
-            # Indicative Future
-            result[2] = 'i'
-            result[3] = 'f'
-        elif "PresImp" in pos_tags:
-            # Indicative Present Habitual
-            result[2] = 'i'
-            result[3] = 'g'
-        elif "PastInd" in pos_tags:
-            # Indicative Past
-            result[2] = 'i'
-            result[3] = 's'
-        elif "PastIndDep" in pos_tags:
-            # Indicative Past Dependent
-            result[2] = 'i'
-            result[3] = 's'
-            result[7] = 'd'
-        elif "PresInd" in pos_tags:
-            # Indicative Present
-            result[2] = 'i'
-            result[3] = 'p'
-        elif "PresSubj" in pos_tags:
-            # Subjunctive Present
-            result[2] = 's'
-            result[3] = 'p'
-        elif "PastSubj" in pos_tags:
-            # Subjunctive Past
-            result[2] = 's'
-            result[3] = 's'
-        elif "Imper" in pos_tags:
-            # Imperative
-            result[2] = 'm'
-            result[3] = 'p'
-        
-        # Verb Person
-        if "1P" in pos_tags:
-            # First Person
-            result[4] = '1'
-        elif "2P" in pos_tags:
-            # Second Person
-            result[4] = '2'
-        elif "3P" in pos_tags:
-            # Third Person
-            result[4] = '3'
-        elif "Auto" in pos_tags:
-            # Autonomous form
-            result[4] = '0'
-        
+        [("Sg", "...s"), ("Pl", "...p")],
+        # Noun Case: Common, Genitive, Vocative or Dative
+        [("Com", "....c"), ("Gen", "....g"), ("Voc", "....v"), ("Dat", "....d")],
+        # Noun Contrast: Emphatic
+        [("Emph", "......e")],
+        # Noun Derived: De-nominal
+        [("NStem", ".......n")],
+    ]),
+
+    ### Verb (Main)
+    # TODO: This was in the java version, but it's not in the parole tags definition:
+    #   'bí' could be an auxiliary verb ("Vt"), which would need the lemma
+    ("Verb", "Vm", [
+        # Verb Mood: Indicative, Subjunctive, Imperative or Conditional
+        [("Ind", "..i"), ("Subj", "..s"), ("Imper", "..m"), ("Cond", "..c")],
+        # Verb Tense, some of the tags include the mood too
+        [("Pres", "...p"), ("Past", "...s"), ("Fut", "...f"),
+         ("PastImp", "..ih"),       # Indicative Past Imperfect/Habitual
+         ("FutInd", "..if"),        # Indicative Future
+         ("PresImp", "..ig"),       # Indicative Present Habitual
+         ("PastInd", "..is"),       # Indicative Past
+         ("PastIndDep", "..is...d"), # Indicative Past Dependent
+         ("PresInd", "..ip"),       # Indicative Present
+         ("PresSubj", "..sp"),      # Subjunctive Present
+         ("PastSubj", "..ss"),      # Subjunctive Past
+         ("Imper", "..mp")],        # Imperative
+        # Verb Person, or the Autonomous form
+        [("1P", "....1"), ("2P", "....2"), ("3P", "....3"), ("Auto", "....0")],
         # Verb Number
-        if "Sg" in pos_tags:
-            # Singular
-            result[5] = 's'
-        elif "Pl" in pos_tags:
-            # Plural
-            result[5] = 'p'
-        
-        # Verb Dependency
-        if "Dep" in pos_tags:
-            # Dependent
-            result[7] = 'd'
-        elif "Rel" in pos_tags:
-            # Relative
-            result[7] = 'r'
-        elif "Neg" in pos_tags:
-            # Negative
-            result[7] = 'n'
-        
-        # Verb Contrast
-        if "Emph" in pos_tags:
-            # Emphatic
-            result[8] = 'e'
+        [("Sg", ".....s"), ("Pl", ".....p")],
+        # Verb Dependency: Dependent, Relative or Negative
+        [("Dep", ".......d"), ("Rel", ".......r"), ("Neg", ".......n")],
+        # Verb Contrast: Emphatic
+        [("Emph", "........e")],
+    ]),
 
     ### Adjective
-    elif "Adj" in pos_tags:
-        result[0] = 'A'
-
-        # Adjective Type
-        if "Verbal" in pos_tags:
-            # Verbal Adjective
-            result[1] = 'v'
-        else:
-            # Qualificator
-            result[1] = 'q'
-        
-        # Adjective Degree
-        if "Comp" in pos_tags:
-            # Comparative
-            result[2] = 'c'
-        #elif "Base" in pos_tags:
-        else: # TODO: Is this the default???
-            # Positive
-            result[2] = 'p'
-        
+    ("Adj", "A", [
+        # Adjective Type: Verbal or Qualificator
+        [("Verbal", ".v"), ("", ".q")],
+        # Adjective Degree: Comparative or Positive
+        # TODO: Is Positive the default, rather than only for "Base"?
+        [("Comp", "..c"), ("", "..p")],
         # Adjective Gender
-        if "Masc" in pos_tags:
-            # Masculine
-            result[3] = 'm'
-        elif "Fem" in pos_tags:
-            # Feminine
-            result[3] = 'f'
-        
+        [("Masc", "...m"), ("Fem", "...f")],
         # Adjective Number
-        if "Sg" in pos_tags:
-            # Singular
-            result[4] = 's'
-        elif "Pl" in pos_tags:
-            # Plural
-            result[4] = 'p'
-        
-        # Adjective Case
-        if "Com" in pos_tags:
-            # Common
-            result[5] = 'c'
-        elif "Gen" in pos_tags:
-            # Genitive
-            result[5] = 'g'
-        elif "Voc" in pos_tags:
-            # Vocative
-            result[5] = 'v'
-        
-        # Adjective Contrast
-        if "Emph" in pos_tags:
-            # Emphatic
-            result[6] = 'e'
-    
+        [("Sg", "....s"), ("Pl", "....p")],
+        # Adjective Case: Common, Genitive or Vocative
+        [("Com", ".....c"), ("Gen", ".....g"), ("Voc", ".....v")],
+        # Adjective Contrast: Emphatic
+        [("Emph", "......e")],
+    ]),
+
     ### Pronoun
-    elif "Pron" in pos_tags:
-        result[0] = 'P'
-
-        # Pronoun Type
-        if "Pers" in pos_tags:
-            # Personal
-            result[1] = 'p'
-        elif "Ref" in pos_tags:
-            # Reflexive
-            result[1] = 'x'
-        elif "Idf" in pos_tags:
-            # Indefinite
-            result[1] = 'i'
-        elif "Prep" in pos_tags:
-            # Prepositional
-            result[1] = 'r'
-        elif "Dem" in pos_tags:
-            # Demonstrative
-            result[1] = 'd'
-        elif "Q" in pos_tags:
-            # Interrogative
-            result[1] = 'q'
-        
+    ("Pron", "P", [
+        # Pronoun Type: Personal, Reflexive, Indefinite, Prepositional, Demonstrative or Interrogative
+        [("Pers", ".p"), ("Ref", ".x"), ("Idf", ".i"), ("Prep", ".r"), ("Dem", ".d"), ("Q", ".q")],
         # Pronoun Person
-        if "1P" in pos_tags:
-            # First Person
-            result[2] = '1'
-        elif "2P" in pos_tags:
-            # Second Person
-            result[2] = '2'
-        elif "3P" in pos_tags:
-            # Third Person
-            result[2] = '3'
-
+        [("1P", "..1"), ("2P", "..2"), ("3P", "..3")],
         # Pronoun Gender
-        if "Masc" in pos_tags:
-            # Masculine
-            result[3] = 'm'
-        elif "Fem" in pos_tags:
-            # Feminine
-            result[3] = 'f'
-
+        [("Masc", "...m"), ("Fem", "...f")],
         # Pronoun Number
-        if "Sg" in pos_tags:
-            # Singular
-            result[4] = 's'
-        elif "Pl" in pos_tags:
-            # Plural
-            result[4] = 'p'
-
-        # Pronoun Case
+        [("Sg", "....s"), ("Pl", "....p")],
+        # Pronoun Case: Nominative/Accusative (Common)
         # TODO: Is this used anymore? What about other cases?
-        if ("VerbSubj" in pos_tags) or ("Sbj" in pos_tags):
-            # Nominative/Accusative (Common) Case
-            result[5] = 'n'
-        
-        # Pronoun Contrast
-        if "Emph" in pos_tags:
-            # Emphatic
-            result[6] = 'e'
-    
+        [("VerbSubj", ".....n"), ("Sbj", ".....n")],
+        # Pronoun Contrast: Emphatic
+        [("Emph", "......e")],
+    ]),
+
     ### Determiner
-    elif "Det" in pos_tags:
-        result[0] = 'D'
-
-        # Determiner Type
-        if "Dem" in pos_tags:
-            # Demonstrative
-            result[1] = 'd'
-        elif "Poss" in pos_tags:
-            # Possessive
-            result[1] = 'p'
-        elif "Qty" in pos_tags:
-            # Quantifier
-            result[1] = 'q'
-        elif "Q" in pos_tags:
-            # Interrogative
-            # TODO: This might be obsolete
-            result[1] = 'w'
-        
+    ("Det", "D", [
+        # Determiner Type: Demonstrative, Possessive, Quantifier or Interrogative
+        # TODO: Interrogative might be obsolete
+        [("Dem", ".d"), ("Poss", ".p"), ("Qty", ".q"), ("Q", ".w")],
         # Determiner Person
-        if "1P" in pos_tags:
-            # First Person
-            result[2] = '1'
-        elif "2P" in pos_tags:
-            # Second Person
-            result[2] = '2'
-        elif "3P" in pos_tags:
-            # Third Person
-            result[2] = '3'
-        
+        [("1P", "..1"), ("2P", "..2"), ("3P", "..3")],
         # Determiner Gender
-        if "Masc" in pos_tags:
-            # Masculine
-            result[3] = 'm'
-        elif "Fem" in pos_tags:
-            # Feminine
-            result[3] = 'f'
-        
+        [("Masc", "...m"), ("Fem", "...f")],
         # Determiner Number
-        if "Sg" in pos_tags:
-            # Singular
-            result[4] = 's'
-        elif "Pl" in pos_tags:
-            # Plural
-            result[4] = 'p'
-    
+        [("Sg", "....s"), ("Pl", "....p")],
+    ]),
+
     ### Copula
-    elif "Cop" in pos_tags:
-        result[0] = 'W'
-
-        # Copula Tense/Mood
-        if "Pres" in pos_tags:
-            # Present Indicative
-            result[1] = 'p'
-            result[3] = 'i'
-        elif "Past" in pos_tags:
-            # Past Indicative
-            result[1] = 's'
-            result[3] = 'i'
-        elif "Cond" in pos_tags:
-            # Conditional
-            result[1] = 's'
-        elif "PresSubj" in pos_tags:
-            # Present Subjunctive
-            result[1] = 'p'
-            result[3] = 's'
-        
-        # Copula Clause Type
-        if "Rel" in pos_tags:
-            # Relative Direct
-            result[2] = 'r'
-        elif "RelInd" in pos_tags:
-            # Relative Indirect
-            result[2] = 's'
-        elif "Dep" in pos_tags:
-            # Dependent
-            result[2] = 'd'
-        
-        # Copula Person
-        if "Pron" in pos_tags:
-            # 3rd Person
-            result[5] = '3'
-        
-        # Copula Negative/Question
-        if "Neg" in pos_tags:
-            # Negative
-            result[4] = 'n'
-        if "NegQ" in pos_tags:
-            # Negative Question
-            result[4] = 'n'
-            result[3] = 'q'
-        if "Q" in pos_tags:
-            # Question
-            result[3] = 'q'
+    ("Cop", "W", [
+        # Copula Tense/Mood: Present Indicative, Past Indicative, Conditional or Present Subjunctive
+        [("Pres", ".p.i"), ("Past", ".s.i"), ("Cond", ".s"), ("PresSubj", ".p.s")],
+        # Copula Clause Type: Relative Direct, Relative Indirect or Dependent
+        [("Rel", "..r"), ("RelInd", "..s"), ("Dep", "..d")],
+        # Copula Person: 3rd Person
+        [("Pron", ".....3")],
+        # Copula Negative/Question: Negative, Negative Question, Question
+        [("Neg", "....n")],
+        [("NegQ", "...qn")],
+        [("Q", "...q")],
+    ]),
 
     ### Adverb
-    elif "Adv" in pos_tags:
-        result[0] = 'R'
-
-        # Adverb Type
-        if "Gn" in pos_tags:
-            # General
-            result[1] = 'g'
-        elif "Its" in pos_tags:
-            # Intensifier
-            result[1] = 'i'
-        elif "Q" in pos_tags:
-            # Interrogative
-            result[1] = 'q'
-        #elif "Rel" in pos_tags:
-        #    # Relative? NOT USED
-        #    # result[1] = 'r'
-        elif "Temp" in pos_tags:
-            # Temporal
-            result[1] = 't'
-        elif "Dir" in pos_tags:
-            # Direction
-            result[1] = 'd'
-        elif "Loc" in pos_tags:
-            # Locative
-            result[1] = 'l'
-    
+    ("Adv", "R", [
+        # Adverb Type: General, Intensifier, Interrogative, Temporal, Direction or Locative
+        # (Relative isn't used)
+        [("Gn", ".g"), ("Its", ".i"), ("Q", ".q"), ("Temp", ".t"), ("Dir", ".d"), ("Loc", ".l")],
+    ]),
+
     ### Adposition
-    elif "Prep" in pos_tags:
-        # Note: this comes after Pronouns because 'Prep' can be used for prepositional pronouns
-
-        result[0] = 'S'
-
-        # Preposition (this is always the case)
-        result[1] = 'p'
-
-        # Adposition Formation
-        if "Cmpd" in pos_tags:
-            # Compound
-            result[2] = 'c'
-        elif "Art" in pos_tags:
-            # With Article
-            result[2] = 'a'
-        #elif "Inf" in pos_tags:
-        #    # Infinitive NOT USED
-        #    result[2] = 'i'
-        elif "Deg" in pos_tags:
-            # With Degree Part
-            result[2] = 'd'
-        elif "Poss" in pos_tags:
-            # With Possessive Determiner
-            result[2] = 'p'
-        elif "Rel" in pos_tags:
-            # With Relative Particle (e.g. in+a -> ina mbíonn)
-            result[2] = 'r'
-        elif "Obj" in pos_tags:
-            # With Object Pronoun (e.g. de+a = á mbualadh)
-            result[2] = 'o'
-        
+    # Note: this comes after Pronouns because 'Prep' can be used for prepositional pronouns
+    ("Prep", "Sp", [
+        # Adposition Formation: Compound, With Article, With Degree Part, With Possessive Determiner,
+        # With Relative Particle (e.g. in+a -> ina mbíonn) or With Object Pronoun (e.g. de+a = á mbualadh)
+        # (Infinitive isn't used)
+        [("Cmpd", "..c"), ("Art", "..a"), ("Deg", "..d"), ("Poss", "..p"), ("Rel", "..r"), ("Obj", "..o")],
         # Article Number
-        if "Sg" in pos_tags:
-            # Singular
-            result[4] = 's'
-        if "Pl" in pos_tags:
-            # Plural
-            result[4] = 'p'
-
-    ### Article
-    elif "Art" in pos_tags:
-        # Note: This comes after Prepositions because 'Art' can be used for prepositions with article
-
-        result[0] = 'T'
-
-        # Definite Article
-        result[1] = 'd'
+        [("Sg", "....s")],
+        [("Pl", "....p")],
+    ]),
 
+    ### Article (Definite)
+    # Note: This comes after Prepositions because 'Art' can be used for prepositions with article
+    ("Art", "Td", [
         # Article Gender
-        if "Masc" in pos_tags:
-            # Masculine
-            result[2] = 'm'
-        elif "Fem" in pos_tags:
-            # Feminine
-            result[2] = 'f'
-
+        [("Masc", "..m"), ("Fem", "..f")],
         # Article Number
-        if "Sg" in pos_tags:
-            # Singular
-            result[3] = 's'
-        elif "Pl" in pos_tags:
-            # Plural
-            result[3] = 'p'
-
-        # Article Case
-        if "Gen" in pos_tags:
-            # Genitive
-            result[4] = 'g'
-    
+        [("Sg", "...s"), ("Pl", "...p")],
+        # Article Case: Genitive
+        [("Gen", "....g")],
+    ]),
+
     ### Conjunction
-    elif "Conj" in pos_tags:
-        result[0] = 'C'
-
-        # Conjunction Type
-        if "Coord" in pos_tags:
-            # Coordinate
-            result[1] = 'c'
-        elif "Subord" in pos_tags:
-            # Subordinative
-            result[1] = 's'
-        
-        # Conjunction CType
-        if "Cop" in pos_tags:
-            # With Copula
-            result[2] = 'w'
-        #elif "Rel" in pos_tags:
-        #    # Relative? NOT USED
-        #    result[2] = 'r'
-        
-        # Conjunction Coord-Pos
-        if "Past" in pos_tags:
-            # Past Tense
-            result[3] = 's'
-    
+    ("Conj", "C", [
+        # Conjunction Type: Coordinate or Subordinative
+        [("Coord", ".c"), ("Subord", ".s")],
+        # Conjunction CType: With Copula (Relative isn't used)
+        [("Cop", "..w")],
+        # Conjunction Coord-Pos: Past Tense
+        [("Past", "...s")],
+    ]),
+
     ### Numeral
-    elif "Num" in pos_tags:
-        result[0] = 'M'
-
-        # Numeral Type
-        if "Card" in pos_tags:
-            # Cardinal
-            result[1] = 'c'
-        elif "Ord" in pos_tags:
-            # Ordinal
-            result[1] = 'o'
-        elif "Pers" in pos_tags:
-            # Personal
-            result[1] = 'p'
-        elif "Dig" in pos_tags:
-            # Numeral
-            result[1] = 'n'
-        elif "Rom" in pos_tags:
-            # Roman
-            result[1] = 'r'
-        elif "Op" in pos_tags:
-            # Operator
-            result[1] = 's'
-        
+    ("Num", "M", [
+        # Numeral Type: Cardinal, Ordinal, Personal, Numeral, Roman or Operator
+        [("Card", ".c"), ("Ord", ".o"), ("Pers", ".p"), ("Dig", ".n"), ("Rom", ".r"), ("Op", ".s")],
+    ]),
+
     ### Interjection
-    elif "Itj" in pos_tags:
-        result[0] = 'I'
-    
+    ("Itj", "I", []),
+
     ### Verbal Particles
-    elif ("Part" in pos_tags) and ("Vb" in pos_tags): # only verbal particles (non-verbal are Unique membership class, below)
-        result[0] = 'Q'
-
-        # Verbal Particle Negative/Interrogative
-        if "NegQ" in pos_tags:
-            # Negative type, Interrogative mood
-            result[1] = 'n'
-            result[2] = 'q'
-        elif ("Neg" in pos_tags) and ("Q" in pos_tags):
-            # Negative type, Interrogative mood
-            result[1] = 'n'
-            result[2] = 'q'
-        elif "Neg" in pos_tags:
-            # Negative type
-            result[1] = 'n'
-        elif "Q" in pos_tags:
-            # Question type
-            result[1] = 'q'
-        
-        # Verbal Particle Mood/Relative-ness
-        if "Subj" in pos_tags:
-            # Subjunctive mood
-            result[2] = 's'
-        elif "Imp" in pos_tags:
-            # Imperative mood
-            result[2] = 'm'
-        elif ("Rel" in pos_tags) or ("Direct" in pos_tags):
-            # Relative particle
-            result[2] = 'r'
-        elif "Indirect" in pos_tags:
-            # Indirect relative particle
-            result[2] = 'i'
-        elif "Pro" in pos_tags:
-            # Relative particle with pronoun
-            result[2] = 'p'
-        
+    # TODO: What is "Part Vb Cmpl"? i.e. what is Cmpl?
+    # TODO: "Part Vb Cond" (i.e. 'má') not covered?
+    ("Part Vb", "Q", [
+        # Verbal Particle Negative/Interrogative: Negative type and Interrogative mood, Negative type or Question type
+        [("NegQ", ".nq"), ("Neg Q", ".nq"), ("Neg", ".n"), ("Q", ".q")],
+        # Verbal Particle Mood/Relative-ness: Subjunctive, Imperative, Relative particle,
+        # Indirect relative particle or Relative particle with pronoun
+        [("Subj", "..s"), ("Imp", "..m"), ("Rel", "..r"), ("Direct", "..r"), ("Indirect", "..i"), ("Pro", "..p")],
         # Verbal Particle Tense
-        if ("Past" in pos_tags) or ("PastIrreg" in pos_tags):
-            result[3] = 's'
-        
-        # TODO: What is "Part Vb Cmpl"? i.e. what is Cmpl?
-        # TODO: "Part Vb Cond" (i.e. 'má') not covered?
+        [("Past", "...s"), ("PastIrreg", "...s")],
+    ]),
 
     ### Unique Membership Class
-    elif ("Part" in pos_tags) and ("Vb" not in pos_tags): # particles except verbal ones
-        result[0] = 'U'
-
-        # Particle Type
-        if "Cp" in pos_tags:
-            # Copular Particle
-            result[1] = 'w'
-        elif "Ad" in pos_tags:
-            # Adverbial Particle 'go'
-            result[1] = 'a'
-        elif "Deg" in pos_tags:
-            # Degree Particle 'a'
-            result[1] = 'd'
-        elif "Voc" in pos_tags:
-            # Vocative particle 'a'
-            result[1] = 'v'
-        elif "Nm" in pos_tags:
-            # Numeral Particle 'a'
-            result[1] = 'm'
-        elif "Comp" in pos_tags:
-            # Comparative Particle 'níos'
-            result[1] = 'c'
-        elif "Pat" in pos_tags:
-            # Patronymic Particle 'Mac', 'ó', 'Uí', 'Ní' etc.
-            result[1] = 'p'
-        #elif "Sup" in pos_tags:
-        #    # Superlative Particle 'is' NOT USED
-        #    result[1] = 's'
-        #elif "Inf" in pos_tags:
-        #    # ??? Particle NOT USED
-        #    result[1] = 'i'
-    
+    # Particles except verbal ones, which come first
+    ("Part", "U", [
+        # Particle Type: Copular Particle, Adverbial Particle 'go', Degree Particle 'a', Vocative particle 'a',
+        # Numeral Particle 'a', Comparative Particle 'níos' or Patronymic Particle 'Mac', 'ó', 'Uí', 'Ní' etc.
+        # (Superlative Particle 'is' isn't used)
+        [("Cp", ".w"), ("Ad", ".a"), ("Deg", ".d"), ("Voc", ".v"), ("Nm", ".m"), ("Comp", ".c"), ("Pat", ".p")],
+    ]),
+
     ### Punctuation
-    elif "Punct" in pos_tags:
-        result[0] = 'F'
-
-        # Punctuation Type
-        if "Fin" in pos_tags:
-            # Sentence-Final
-            result[1] = 'e'
-        elif "Int" in pos_tags:
-            # Sentence-Internal (comma, semicolon etc.)
-            result[1] = 'i'
-        elif "Quo" in pos_tags:
-            # Quotation Marks
-            result[1] = 'a'
-        elif "Bar" in pos_tags:
-            # Hyphen, Underscore
-            result[1] = 'b'
-        elif "Brack" in pos_tags:
-            # Brackets (round and square)
-            result[1] = 'p'
-        elif "Curr" in pos_tags:
-            # Currency symbol
-            result[1] = 'c'
-        
-        if "Q" in pos_tags:
-            # Question (this overwrites 'e' above)
-            result[1] = 'q'
-    
+    ("Punct", "F", [
+        # Punctuation Type: Sentence-Final, Sentence-Internal (comma, semicolon etc.), Quotation Marks,
+        # Hyphen/Underscore, Brackets (round and square) or Currency symbol
+        [("Fin", ".e"), ("Int", ".i"), ("Quo", ".a"), ("Bar", ".b"), ("Brack", ".p"), ("Curr", ".c")],
+        # Question (this overwrites 'e' above)
+        [("Q", ".q")],
+    ]),
+
     ### Abbreviation
-    elif "Abr" in pos_tags:
-        result[0] = 'Y'
-    
+    ("Abr", "Y", []),
+
     ### Residuals
-    # TODO: Tags without equivalent 
+    # TODO: Tags without equivalent
     #   Xa: acronym
     #   Xd: date
     #   Xn: number
     #   Xt: toponym
     #   Xy: symbol
-    elif "Item" in pos_tags:
-        # List Item
-        result[0] = 'X'
-        result[1] = 'l'
-    elif "Email" in pos_tags:
-        # Email Address
-        result[0] = 'X'
-        result[1] = 'e'
-    elif "Web" in pos_tags:
-        # Web Adress
-        result[0] = 'X'
-        result[1] = 'w'
-    elif "Filler" in pos_tags:
-        # Spoken filler
-        result[0] = 'X'
-        result[1] = 's'
-        result[2] = 'f'
-    elif ("Cmc" in pos_tags) and ("English" in pos_tags):
-        # Spoken communicator - English
-        result[0] = 'X'
-        result[1] = 'l'
-        result[2] = 'c'
-        result[3] = 'e'
-    elif "Event" in pos_tags:
-        # Spoken event (cough, sneeze, laugh)
-        result[0] = 'X'
-        result[1] = 's'
-        result[2] = 'e'
-    elif "Fragment" in pos_tags:
-        # Spoken phonetic fragment
-        result[0] = 'X'
-        result[1] = 's'
-        result[2] = 'p'
-    elif "Xxx" in pos_tags:
-        # Indecipherable speech
-        result[0] = 'X'
-        result[1] = 's'
-        result[2] = 'x'
-    #elif "Disfluency" in pos_tags:
-    #    # Disfluency (correction, repetition etc.) IS THIS USED?
-    #    result[0] = 'X'
-    #    result[1] = 's'
-    #    result[2] = 'd'
-
-    ### Unknown
-    elif "?" in pos_tags:
-        # Unknown
-        result[0] = 'X'
-        result[1] = 'x'
-    
-    ### Everything else is unknown
-    else:
-        # Unknown
-        result[0] = 'X'
-        result[1] = 'x'
-    
-    return result
\ No newline at end of file
+    ("Item", "Xl", []),         # List Item
+    ("Email", "Xe", []),        # Email Address
+    ("Web", "Xw", []),          # Web Adress
+    ("Filler", "Xsf", []),      # Spoken filler
+    ("Cmc English", "Xlce", []),  # Spoken communicator - English
+    ("Event", "Xse", []),       # Spoken event (cough, sneeze, laugh)
+    ("Fragment", "Xsp", []),    # Spoken phonetic fragment
+    ("Xxx", "Xsx", []),         # Indecipherable speech
+    # Disfluency (correction, repetition etc.) "Xsd" - IS THIS USED?
+
+    ### Unknown, and everything else is unknown too
+    ("", "Xx", []),
+]
+
+
+def _compile_slots(slots: str) -> tuple:
+    # The (index, character) pairs to set
+    return tuple((i, char) for i, char in enumerate(slots) if char != '.')
+
+
+def _compile_slot_rule(slot_rule: list) -> tuple:
+    """
+    Compiles a slot rule into a tuple of:
+      - The bitmask of all the tags the rule checks
+      - A dict of the (compiled) slots to set for each combination of those tags (missing if none are set)
+    so applying the rule is an AND and a dict lookup
+    """
+    rules = [(MORPH_VOCAB.mask(tags.split()), _compile_slots(slots)) for tags, slots in slot_rule]
+    rule_tags = 0
+    for tags, _ in rules:
+        rule_tags |= tags
+
+    # Resolve every subset of the rule's tags, like the if/elif chain would
+    table = {}
+    subset = rule_tags
+    while True:
+        for tags, slots in rules:
+            if subset & tags == tags:
+                table[subset] = slots
+                break
+        if subset == 0:
+            break
+        subset = (subset - 1) & rule_tags
+    return rule_tags, table
+
+
+# The rules, with the tags as bitmasks (see ciall.utils.morph_vocab)
+_GUESS_SLOT_RULE = _compile_slot_rule(GUESS_SLOT_RULE)
+_PAROLE_RULES = tuple((MORPH_VOCAB.mask(tags.split()), _compile_slots(slots),
+                       tuple(_compile_slot_rule(slot_rule) for slot_rule in slot_rules))
+                      for tags, slots, slot_rules in PAROLE_RULES)
+
+# The tags that decide the part of speech
+_POS_TAGS = 0
+for _rule in _PAROLE_RULES:
+    _POS_TAGS |= _rule[0]
+del _rule
+
+# The part of speech rule used for each combination of part of speech tags, filled in as they are seen
+_pos_rules = {}
+
+
+def _pos_rule(mask: int) -> tuple:
+    pos_tags = mask & _POS_TAGS
+    pos_rule = _pos_rules.get(pos_tags)
+    if pos_rule is None:
+        # The first one whose tags are all present, there is always one as the last rule has no tags
+        pos_rule = next(rule for rule in _PAROLE_RULES if pos_tags & rule[0] == rule[0])
+        _pos_rules[pos_tags] = pos_rule
+    return pos_rule
+
+
+def _build_par_tag(mask: int) -> list:
+    # The PAROLE tag starts as a list of 9 dashes
+    # This will be converted into a single string tag before return
+    result = ['-', '-', '-', '-', '-', '-', '-', '-', '-']
+
+    rule_tags, table = _GUESS_SLOT_RULE
+    for i, char in table.get(mask & rule_tags, ()):
+        result[i] = char
+
+    _, slots, slot_rules = _pos_rule(mask)
+    for i, char in slots:
+        result[i] = char
+    for rule_tags, table in slot_rules:
+        for i, char in table.get(mask & rule_tags, ()):
+            result[i] = char
+
+    return result
@@ -1,9 +1,13 @@
 import csv
 import io
+import itertools
 
 import spacy
 
+from ciall.components.token_attributes import doc_column
 from ciall.utils.pos2par import pos2par, shorten_par_tag
+from ciall.utils.musas_tags import MultiSenseTag
+from ciall.utils.morph_vocab import MORPH_VOCAB
 
 
 VALID_FIELDS = [
@@ -56,49 +60,46 @@ def doc_from_tuples(nlp: spacy.language.Language,
     if 'TOKEN' not in fields:
         raise TypeError("Must have at least a 'TOKEN' field specified!")
 
-    # initialise data for processing
-    data = {'space': []}
-    for f in VALID_FIELDS:
-        if f in fields:
-            data[f] = []
-
-    for row in lines[start_index:]:
-        if len(row) == 0:
-            continue  # skip blank rows
+    # Gather the values of each field into columns
+    rows = [row for row in lines[start_index:] if len(row) > 0]  # skip blank rows
+    for row in rows:
         if len(row) != len(fields):
             raise TypeError("Row doesn't match header length: %s" % (row,))
-        for f, v in zip(fields, row):
-            data[f].append(v)
-        data['space'].append(True)  # TODO: something more intelligent?
-
-    doc = spacy.tokens.doc.Doc(vocab=nlp.vocab, words=data['TOKEN'], spaces=data['space'])
-
-    # read the other input fields (if they are present)
-    for i in range(len(data['TOKEN'])):
-        if 'LEMMA' in data:
-            doc[i].lemma_ = data['LEMMA'][i]
+    data = {f: list(column) for f, column in zip(fields, zip(*rows))} if rows else {f: [] for f in fields}
 
-        if 'UPOS' in data:
-            doc[i].pos_ = data['UPOS'][i]
+    # Make the doc with the token, lemma and UPOS columns
+    doc = spacy.tokens.doc.Doc(vocab=nlp.vocab,
+                               words=data['TOKEN'],
+                               spaces=[True] * len(data['TOKEN']),  # TODO: something more intelligent?
+                               lemmas=data.get('LEMMA'),
+                               pos=data.get('UPOS'))
 
-        if 'PAROLE' in data:
-            doc[i]._.par_long = data['PAROLE'][i]
+    # read the other input fields (if they are present) into the doc-level columns
+    # (see ciall.components.token_attributes)
+    if 'PAROLE' in data:
+        doc._.par_long_column = data['PAROLE']
 
-        if 'PAR_SHORT' in data:
-            doc[i]._.par_short = data['PAR_SHORT'][i]
-        elif 'PAROLE' in data:
-            doc[i]._.par_short = shorten_par_tag(doc[i]._.par_long)
+    if 'PAR_SHORT' in data:
+        doc._.par_short_column = data['PAR_SHORT']
+    elif 'PAROLE' in data:
+        # Each distinct tag is only shortened once
+        par_shorts = {par_long: shorten_par_tag(par_long) for par_long in set(data['PAROLE'])}
+        doc._.par_short_column = [par_shorts[par_long] for par_long in data['PAROLE']]
 
-        if 'MORPH_TAGS' in data:
-            doc[i]._.morph_tags = data['MORPH_TAGS'][i].split(" ")
+    if 'MORPH_TAGS' in data:
+        # Each distinct list of tags is only split and interned once
+        interned = {morph_tags: MORPH_VOCAB.intern_tags(morph_tags.split(" "))
+                    for morph_tags in set(data['MORPH_TAGS'])}
+        doc._.morph_tags_column = [interned[morph_tags][0] for morph_tags in data['MORPH_TAGS']]
+        doc._.morph_mask_column = [interned[morph_tags][1] for morph_tags in data['MORPH_TAGS']]
 
-        if 'DEP_TAGS' in data:
-            doc[i]._.dep_tags = data['DEP_TAGS'][i].split(" ")
+    if 'DEP_TAGS' in data:
+        doc._.dep_tags_column = [dep_tags.split(" ") for dep_tags in data['DEP_TAGS']]
 
-        # Used for accuracy reporting
-        if accuracy:
-            if 'USAS' in data:
-                doc[i]._.expected_musas_tag = data['USAS'][i]
+    # Used for accuracy reporting
+    if accuracy:
+        if 'USAS' in data:
+            doc._.expected_musas_tag_column = data['USAS']
 
     return doc
 
@@ -112,33 +113,164 @@ def doc_from_tsv(nlp: spacy.language.Language,
     return doc_from_tuples(nlp, lines=lines, fields=fields, accuracy=accuracy)
 
 
-def output_tsv(doc: spacy.tokens.doc.Doc, fields: list[str]):
-    for f in fields:
-        if f not in VALID_FIELDS:
-            raise TypeError("Invalid output field: '%s'" % f)
+# Where one document ends and the next begins in a TSV input:
+#   file:    The whole file is one document
+#   blank:   Documents are separated by blank lines
+#   doc_tag: Each document starts with a <doc ...> line, and can end with a </doc> line
+DOC_BOUNDARIES = ("file", "blank", "doc_tag")
 
-    outstr = io.StringIO()
 
-    outstr.write("\t".join(fields) + "\n")
-
-    for i in range(len(doc)):
-        line_number = i + 1
-        token = doc[i]
-        token_text = token.text.replace('\n', '\\n')
-        t = {
-            'ID': str(line_number),
-            'TOKEN': token_text,
-            'LEMMA': token.lemma_,
-            'UPOS': token.pos_,
-            'PAROLE': token._.par_long,
-            'PAR_SHORT': token._.par_short,
-            'MORPH_TAGS': token._.morph_tags_str(),
-            'DEP_TAGS': token._.dep_tags_str(),
-            'MWE': token._.musas_mwe_indexes_str(),
-            'USAS': token._.musas_tags_str(),
-            'USAS_DESCRIPTION': token._.musas_desc_str(),
-            'DEPTREE_TAG': token._.deptree_tag,
-        }
-        outstr.write("\t".join([t[f] for f in fields]) + "\n")
-
-    return outstr.getvalue()
\ No newline at end of file
+def is_doc_tag(row: list[str]) -> bool:
+    """
+    Whether a TSV row is a <doc ...> or </doc> document marker
+    """
+    return len(row) > 0 and (row[0].startswith("<doc") or row[0].startswith("</doc"))
+
+
+def docs_from_tsv_stream(nlp: spacy.language.Language,
+                         fin,
+                         fields: list[str] = [],
+                         accuracy: bool = False,
+                         doc_boundary: str = "file"):
+    """
+    Read Doc objects from a TSV file object, one document at a time.
+
+    The file is read a line at a time, so only one document is held in memory at once.
+    As with doc_from_tuples(), if fields is empty the first line of the file is the header row,
+    and the header applies to every document in the file.
+    doc_boundary is one of DOC_BOUNDARIES.
+
+    Yields a Doc for each (non-empty) document.
+    """
+    if doc_boundary not in DOC_BOUNDARIES:
+        raise TypeError("input.doc_boundary must be one of %s, not '%s'" % (", ".join(DOC_BOUNDARIES), doc_boundary))
+
+    header = list(fields)
+    rows = []
+    for row in csv.reader(fin, delimiter="\t", quoting=csv.QUOTE_NONE):
+        if doc_boundary == "blank" and len(row) == 0:
+            end_of_doc = True
+        elif doc_boundary == "doc_tag" and is_doc_tag(row):
+            end_of_doc = True
+        else:
+            if len(row) == 0:
+                continue  # skip blank rows
+            if len(header) == 0:
+                header = row
+            elif row != header:  # A repeated header, e.g. in concatenated files
+                rows.append(row)
+            continue
+
+        if rows:
+            yield doc_from_tuples(nlp, lines=rows, fields=header, accuracy=accuracy)
+            rows = []
+
+    if rows:
+        yield doc_from_tuples(nlp, lines=rows, fields=header, accuracy=accuracy)
+
+
+# The number of rows written to the output stream at once
+WRITE_CHUNK_SIZE = 1024
+
+
+def _tags_str(tags, separator):
+    return "" if tags is None else separator.join(tags)
+
+
+def _mwe_index_str(mwe_indexes):
+    # NOTE: This only prints out the first mwe index
+    if mwe_indexes is None:
+        return ""
+    start, end = mwe_indexes[0]
+    return "(%s, %s)" % (start, end)
+
+
+class TSVWriter(object):
+    """
+    Writes Docs as TSV with the given output fields.
+    The fields are checked and turned into a list of column functions once, when the writer is made,
+    and only the requested fields are worked out for each Doc.
+    The USAS descriptions are worked out once for each tag.
+    """
+
+    def __init__(self, fields: list[str]):
+        for f in fields:
+            if f not in VALID_FIELDS:
+                raise TypeError("Invalid output field: '%s'" % f)
+        self.fields = list(fields)
+        self.header = "\t".join(fields) + "\n"
+        self.columns = [getattr(self, "_column_" + f.lower()) for f in fields]
+        self.descriptions = {}  # USAS tag -> USAS description
+
+    def write(self, doc: spacy.tokens.doc.Doc, outstr):
+        """
+        Writes the header line and a line for each token in the doc to outstr, a chunk of lines at a time
+        """
+        outstr.write(self.header)
+        # Each chunk of lines is made and written before the next one, so the whole doc is never held as text
+        rows = zip(*[column(doc) for column in self.columns])
+        while True:
+            chunk = "".join(["\t".join(row) + "\n" for row in itertools.islice(rows, WRITE_CHUNK_SIZE)])
+            if not chunk:
+                break
+            outstr.write(chunk)
+
+    def _description(self, musas_tag: str) -> str:
+        description = self.descriptions.get(musas_tag)
+        if description is None:
+            description = self.descriptions[musas_tag] = MultiSenseTag.parse(musas_tag).senses[0].description
+        return description
+
+    # The column functions, each returns a list of strings with one for each token in the doc
+
+    @staticmethod
+    def _column_id(doc):
+        return [str(i) for i in range(1, len(doc) + 1)]
+
+    @staticmethod
+    def _column_token(doc):
+        return [token.text.replace('\n', '\\n') for token in doc]
+
+    @staticmethod
+    def _column_lemma(doc):
+        return [token.lemma_ for token in doc]
+
+    @staticmethod
+    def _column_upos(doc):
+        return [token.pos_ for token in doc]
+
+    @staticmethod
+    def _column_parole(doc):
+        return doc_column(doc, "par_long")
+
+    @staticmethod
+    def _column_par_short(doc):
+        return doc_column(doc, "par_short")
+
+    @staticmethod
+    def _column_morph_tags(doc):
+        return [_tags_str(tags, ",") for tags in doc_column(doc, "morph_tags")]
+
+    @staticmethod
+    def _column_dep_tags(doc):
+        return [_tags_str(tags, ",") for tags in doc_column(doc, "dep_tags")]
+
+    @staticmethod
+    def _column_mwe(doc):
+        return [_mwe_index_str(token._.musas_mwe_indexes) for token in doc]
+
+    @staticmethod
+    def _column_usas(doc):
+        return [_tags_str(token._.musas_tags, " ") for token in doc]
+
+    def _column_usas_description(self, doc):
+        return ["" if token._.musas_tags is None else self._description(token._.musas_tags[0]) for token in doc]
+
+
+def output_tsv(doc: spacy.tokens.doc.Doc, fields: list[str]):
+    """
+    Returns the doc as a TSV string with the given output fields, see TSVWriter
+    """
+    outstr = io.StringIO()
+    TSVWriter(fields).write(doc, outstr)
+    return outstr.getvalue()
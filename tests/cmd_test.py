@@ -1,3 +1,6 @@
+import os
+import shutil
+import tempfile
 import subprocess
 import unittest
 
@@ -24,6 +27,151 @@ class CMDTest(unittest.TestCase):
             shell=True)
         self.assertEqual(cp.returncode, 0)
 
+        # With the distribution of the match values
+        cp = subprocess.run(
+            "python3 -m ciall.cmd --conf=example/example_conf.yaml --infile=example/example_accuracy_test.tsv "
+            "--accuracy --histogram",
+            shell=True, capture_output=True, text=True)
+        self.assertEqual(cp.returncode, 0)
+        self.assertIn("### Match Value Distribution", cp.stdout)
+
+    def test_accuracy_jobs(self):
+        # Several accuracy test files in parallel give the same report as one process
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for i in range(3):
+                shutil.copy("example/example_accuracy_test.tsv", os.path.join(tmpdir, "test%d.tsv" % i))
+            outputs = []
+            for jobs in (1, 2):
+                cp = subprocess.run(
+                    "python3 -m ciall.cmd --conf=example/example_conf.yaml --infile=%s --accuracy --jobs=%d" %
+                    (tmpdir, jobs),
+                    shell=True,
+                    capture_output=True)
+                self.assertEqual(cp.returncode, 0)
+                outputs.append(cp.stdout)
+            self.assertIn(b"Num tokens: 18\n", outputs[0])
+            self.assertEqual(outputs[0], outputs[1])
+
+            # An input that can't be read is reported, and gives exit code 1, from a worker process too
+            with open(os.path.join(tmpdir, "test3.tsv"), "w", encoding="utf-8") as fout:
+                fout.write("NOT\tFIELDS\nx\ty\n")
+            for options in ("--accuracy --jobs=2", ""):
+                cp = subprocess.run(
+                    "python3 -m ciall.cmd --conf=example/example_conf.yaml --infile=%s %s" % (tmpdir, options),
+                    shell=True,
+                    capture_output=True)
+                self.assertEqual(cp.returncode, 1)
+                self.assertIn(b"When reading %s got exception:\n" % os.path.join(tmpdir, "test3.tsv").encode(),
+                              cp.stdout)
+                self.assertIn(b"TypeError: Field 'NOT' is not a valid field!", cp.stderr)
+
+    def test_accuracy_empty(self):
+        # Empty and header-only input files have no tokens to score
+        with tempfile.TemporaryDirectory() as tmpdir:
+            open(os.path.join(tmpdir, "empty.tsv"), "w").close()
+            with open(os.path.join(tmpdir, "header.tsv"), "w", encoding="utf-8") as fout:
+                fout.write("TOKEN\tLEMMA\tPAROLE\tUSAS\n")
+            for jobs in (1, 2):
+                cp = subprocess.run(
+                    "python3 -m ciall.cmd --conf=example/example_conf.yaml --infile=%s -A -j %d" % (tmpdir, jobs),
+                    shell=True,
+                    capture_output=True)
+                self.assertEqual(cp.returncode, 1)
+                self.assertEqual(cp.stdout, b'No input data!\n')
+
+    def test_accuracy_cache(self):
+        # A second run reuses the saved reports and prints the same report
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for i in range(2):
+                shutil.copy("example/example_accuracy_test.tsv", os.path.join(tmpdir, "test%d.tsv" % i))
+            cache_dir = os.path.join(tmpdir, ".cache")
+            outputs = []
+            for _ in range(2):
+                cp = subprocess.run(
+                    "python3 -m ciall.cmd --conf=example/example_conf.yaml --infile=%s --accuracy "
+                    "--accuracy-cache=%s --lemma-diff" % (tmpdir, cache_dir),
+                    shell=True,
+                    capture_output=True)
+                self.assertEqual(cp.returncode, 0)
+                outputs.append(cp)
+            self.assertIn(b"Reused 0 of 2 file report(s)", outputs[0].stderr)
+            self.assertIn(b"Reused 2 of 2 file report(s)", outputs[1].stderr)
+            self.assertEqual(outputs[0].stdout, outputs[1].stdout)
+
+    def test_doc_boundary(self):
+        # Documents separated by blank lines are each output with a header
+        with tempfile.TemporaryDirectory() as tmpdir:
+            conf_file = os.path.join(tmpdir, "conf.yaml")
+            with open("example/example_conf.yaml") as fin, open(conf_file, "w") as fout:
+                fout.write(fin.read().replace("  format: tsv\n", "  format: tsv\n  doc_boundary: blank\n", 1))
+            cp = subprocess.run(
+                "(cat example/example_text.tsv; echo; echo; tail -n 2 example/example_text.tsv) | "
+                "python3 -m ciall.cmd --conf=%s" % conf_file,
+                shell=True,
+                capture_output=True)
+            self.assertEqual(cp.returncode, 0)
+            self.assertEqual(cp.stdout.count(b"ID\tTOKEN\t"), 2)
+
+    def test_cg3_sentences(self):
+        # cg3 input is read a sentence at a time
+        with tempfile.TemporaryDirectory() as tmpdir:
+            conf_file = os.path.join(tmpdir, "conf.yaml")
+            with open("example/example_conf.yaml") as fin, open(conf_file, "w") as fout:
+                fout.write(fin.read().replace("  format: tsv\n", "  format: cg3\n  doc_boundary: sentence\n", 1))
+            cg3_file = os.path.join(tmpdir, "input.cg3")
+            with open(cg3_file, "w") as fout:
+                fout.write('"<Níl>"\n\t"bí" Verb VI PresInd Neg\n"<.>"\n\t"." Punct Fin\n'
+                           '"<Bhuail>"\n\t"buail" Verb VTI PastInd Len\n"<.>"\n\t"." Punct Fin\n')
+            cp = subprocess.run(
+                "python3 -m ciall.cmd --conf=%s --infile=%s" % (conf_file, cg3_file),
+                shell=True,
+                capture_output=True)
+            self.assertEqual(cp.returncode, 0)
+            self.assertEqual(cp.stdout.count(b"ID\tTOKEN\t"), 2)
+
+    def test_outdir(self):
+        # Each input file has its own output file
+        with tempfile.TemporaryDirectory() as tmpdir:
+            indir = os.path.join(tmpdir, "in")
+            os.makedirs(os.path.join(indir, "sub"))
+            shutil.copy("example/example_text.tsv", os.path.join(indir, "text.tsv"))
+            shutil.copy("example/example_text.tsv", os.path.join(indir, "sub", "text.tsv"))
+            outdir = os.path.join(tmpdir, "out")
+            cp = subprocess.run(
+                "python3 -m ciall.cmd --conf=example/example_conf.yaml --infile=%s --outdir=%s --fsync-every=1" %
+                (indir, outdir),
+                shell=True)
+            self.assertEqual(cp.returncode, 0)
+            expected = subprocess.run(
+                "python3 -m ciall.cmd --conf=example/example_conf.yaml --infile=example/example_text.tsv",
+                shell=True,
+                capture_output=True).stdout
+            for path in ("text.tsv", os.path.join("sub", "text.tsv")):
+                with open(os.path.join(outdir, path), "rb") as fin:
+                    self.assertEqual(fin.read(), expected)
+
+            # The inputs can't be overwritten
+            for outdir in (indir, os.path.join(indir, "sub"), tmpdir):
+                cp = subprocess.run(
+                    "python3 -m ciall.cmd --conf=example/example_conf.yaml --infile=%s --outdir=%s" % (indir, outdir),
+                    shell=True,
+                    capture_output=True)
+                self.assertEqual(cp.returncode, 1)
+            with open(os.path.join(indir, "text.tsv"), "rb") as fin, open("example/example_text.tsv", "rb") as fin2:
+                self.assertEqual(fin.read(), fin2.read())
+
+            # Nothing is written for an input without any documents
+            empty_file = os.path.join(tmpdir, "empty.tsv")
+            open(empty_file, "w").close()
+            outfile = os.path.join(tmpdir, "empty_out.tsv")
+            cp = subprocess.run(
+                "python3 -m ciall.cmd --conf=example/example_conf.yaml --infile=%s --outfile=%s" %
+                (empty_file, outfile),
+                shell=True,
+                capture_output=True)
+            self.assertEqual(cp.stdout, b'No input data!\n')
+            self.assertFalse(os.path.exists(outfile))
+
     def test_user_errors(self):
         # no input file
         cp = subprocess.run(
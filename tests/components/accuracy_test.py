@@ -32,7 +32,11 @@ class TestAccuracy(unittest.TestCase):
                              expected_musas_tag=expected_musas_tag)
         report.calculate_totals()
 
-        print(report.all_match_values)
+        # The histogram has a line for each bucket of match values, with the fully wrong and fully right at the ends
+        histogram_lines = report.histogram_str.splitlines()
+        self.assertEqual(len(histogram_lines), 12)
+        self.assertEqual(histogram_lines[2].split(), ["[0.0,", "0.1)", "4", "2"])
+        self.assertEqual(histogram_lines[-1].split(), ["[0.9,", "1.0]", "4", "2"])
         self.assertAlmostEqual(report.lexical_coverage, 60.0)
         self.assertAlmostEqual(report.pc_all_fully_correct, 40.0)
         self.assertAlmostEqual(report.pc_cont_fully_correct, 40.0)
@@ -41,6 +45,46 @@ class TestAccuracy(unittest.TestCase):
         self.assertGreater(report.pc_cont_accuracy, 40.0)
         self.assertLess(report.pc_cont_accuracy, 60.0)
 
+    def test_add_tokens(self):
+        par_shorts = ["Nc", "Nc", "Vm", "D", "Sp", "Nc"]
+        musas_tags_list = [["A1"], ["A1", "C1"], ["Z99"], ["Z5"], ["Z8", "Q1.2/S2mf"], ["S2", "A1.2"]]
+        expected_musas_tags = ["A1", "A1", "A1", "Z5", "S2mf", "Q1.2/S2mf A1"]
+
+        report = AccuracyReport()
+        for par_short, musas_tags, expected_musas_tag in zip(par_shorts, musas_tags_list, expected_musas_tags):
+            report.add_token(par_short, musas_tags, expected_musas_tag)
+        batch_report = AccuracyReport()
+        batch_report.add_tokens(par_shorts, musas_tags_list, expected_musas_tags)
+
+        self.assertEqual(vars(batch_report), vars(report))
+
+    def test_merge(self):
+        tokens = [
+            ("Nc", ["A1"], "A1"), ("Nc", ["A1", "C1"], "A1"), ("Nc", ["Z99"], "A1"), ("D", ["Z5"], "Z5"),
+            ("Sp", ["Z8"], "Z5"), ("Vm", ["A1.1.1", "Q2.2"], "Q2.2"), ("D", ["Z99"], "Z5"), ("Aq", ["T3-"], "T3+"),
+        ]
+        reports = []
+        for i in range(0, len(tokens), 3):
+            report = AccuracyReport()
+            for token in tokens[i:i + 3]:
+                report.add_token(*token)
+            reports.append(report)
+
+        # Merging gives the same totals however the reports are grouped
+        merged1 = AccuracyReport().merge(reports[0]).merge(reports[1]).merge(reports[2])
+        merged2 = AccuracyReport().merge(reports[0]).merge(AccuracyReport().merge(reports[1]).merge(reports[2]))
+        single = AccuracyReport()
+        for token in tokens:
+            single.add_token(*token)
+        for report in (merged1, merged2, single):
+            report.calculate_totals()
+        self.assertEqual(merged1.report_str, single.report_str)
+        self.assertEqual(merged2.report_str, single.report_str)
+        self.assertEqual(merged1.all_histogram, single.all_histogram)
+        self.assertEqual(merged1.cont_histogram, single.cont_histogram)
+        self.assertEqual(sum(single.all_histogram), len(tokens))
+        self.assertEqual(AccuracyReport.combine_reports(reports).report_str, single.report_str)
+
     def test_accuracy_component(self):
         # TODO!
         pass
\ No newline at end of file
@@ -1,4 +1,8 @@
 import os
+import time
+import shutil
+import tempfile
+import threading
 import unittest
 import spacy
 
@@ -11,10 +15,14 @@ TEST_SW_LEXICON = CURR_DIR + "/test_sw_lexicon.tsv"
 TEST_MW_LEXICON = CURR_DIR + "/test_mw_lexicon.tsv"
 
 
-def process_test_text(test_text):
+def make_nlp(engine="pymusas"):
     nlp = spacy.blank("ga")
-    nlp.add_pipe("ciall_musas_tagger", config={'sw_lexicon': TEST_SW_LEXICON, 'mw_lexicon': TEST_MW_LEXICON})
+    nlp.add_pipe("ciall_musas_tagger", config={'sw_lexicon': TEST_SW_LEXICON, 'mw_lexicon': TEST_MW_LEXICON,
+                                               'engine': engine})
+    return nlp
 
+
+def make_doc(nlp, test_text):
     words = [t[0] for t in test_text]
     spaces = [True for t in test_text]
     lemmas = [t[1] for t in test_text]
@@ -23,12 +31,18 @@ def process_test_text(test_text):
     for token, lemma, par_short in zip (doc, lemmas, par_shorts):
         token.lemma_ = lemma
         token._.par_short = par_short
+    return doc
+
 
-    return nlp(doc)
+def process_test_text(test_text, engine="pymusas"):
+    nlp = make_nlp(engine)
+    return nlp(make_doc(nlp, test_text))
 
 
 class TestMUSASTagger(unittest.TestCase):
 
+    ENGINE = "pymusas"
+
     def test_simple_input(self):
         test_text = [
             ("Níl",        "bí",        "Vm"),
@@ -57,7 +71,7 @@ class TestMUSASTagger(unittest.TestCase):
             ["A1.1.2"], "Z8", "Z5", "Z5", "P1", "T1.1.1", "Z9"
         ]
 
-        doc = process_test_text(test_text)
+        doc = process_test_text(test_text, self.ENGINE)
 
         for token, sem_tags in zip (doc, expected_sem_tags):
             if isinstance(sem_tags, str):
@@ -107,7 +121,7 @@ class TestMUSASTagger(unittest.TestCase):
             'éis': ("éis", "Z5"),
         }
 
-        doc = process_test_text(test_text)
+        doc = process_test_text(test_text, self.ENGINE)
 
         result = {}
         for token in doc:
@@ -136,7 +150,7 @@ class TestMUSASTagger(unittest.TestCase):
             "M1", "Z8", "Z5", "Z5", "Z0", "T1.1.1"
         ]
 
-        doc = process_test_text(test_text)
+        doc = process_test_text(test_text, self.ENGINE)
 
         for token, sem_tags in zip (doc, expected_sem_tags):
             if isinstance(sem_tags, str):
@@ -144,11 +158,103 @@ class TestMUSASTagger(unittest.TestCase):
             self.assertEqual(sem_tags, token._.musas_tags, "For '%s' expected %s, got %s" % \
                              (token.text, sem_tags, token._.musas_tags))
 
+    def test_pipe(self):
+        test_texts = [
+            [("Rith", "rith", "Vm"), ("mé", "mé", "Pp"), ("ó", "ó", "Sp"),
+             ("Bhaile", "Baile", "Np"), ("Átha", "Átha", "Np"), ("Cliath", "Cliath", "Np")],
+            [("Bhuail", "buail", "Vm"), ("mé", "mé", "Pp"), ("leis", "le", "Sp"), ("Siberia", "Siberia", "Np")],
+            [],
+            [("ceathrú", "ceathrú", "Nc"), ("tar", "tar", "Sp"), ("éis", "éis", "Sp"), ("a", "a", "Q"),
+             ("trí", "trí", "Mc"), ("mé", "mé", "Pp")],
+        ]
+        nlp = make_nlp(self.ENGINE)
+        expected = [[(token._.musas_tags, token._.musas_mwe_indexes) for token in nlp(make_doc(nlp, test_text))]
+                    for test_text in test_texts]
+
+        docs = list(nlp.pipe([make_doc(nlp, test_text) for test_text in test_texts], batch_size=3))
+        result = [[(token._.musas_tags, token._.musas_mwe_indexes) for token in doc] for doc in docs]
+        self.assertEqual(result, expected)
+
+    def test_reload(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sw_lexicon = os.path.join(tmpdir, "sw_lexicon.tsv")
+            mw_lexicon = os.path.join(tmpdir, "mw_lexicon.tsv")
+            shutil.copy(TEST_SW_LEXICON, sw_lexicon)
+            shutil.copy(TEST_MW_LEXICON, mw_lexicon)
+            nlp = spacy.blank("ga")
+            tagger = nlp.add_pipe("ciall_musas_tagger", config={
+                'sw_lexicon': sw_lexicon, 'mw_lexicon': mw_lexicon, 'engine': self.ENGINE,
+                'lexicon_cache': True, 'cache_dir': os.path.join(tmpdir, "cache"), 'watch_lexicons': True})
+            test_text = [("nua", "nua", "Aq")]
+            self.assertEqual(nlp(make_doc(nlp, test_text))[0]._.musas_tags, ["Z99"])
+            self.assertEqual(tagger.reload_metrics['builds'], 1)
+            index_size = tagger.reload_metrics['index_size']
+
+            # Reloading by hand
+            with open(sw_lexicon, "a", encoding="utf-8") as fout:
+                fout.write("\nnua\tAq\tT3-\n")
+            tagger.reload()
+            self.assertEqual(nlp(make_doc(nlp, test_text))[0]._.musas_tags, ["T3-"])
+            self.assertEqual(tagger.reload_metrics['builds'], 2)
+            self.assertEqual(tagger.reload_metrics['index_size'], index_size + 2)
+            self.assertGreater(tagger.reload_metrics['duration'], 0)
+
+            # Reloading in the background when the file changes
+            with open(sw_lexicon, "a", encoding="utf-8") as fout:
+                fout.write("sean\tAq\tT3+\n")
+            nlp(make_doc(nlp, test_text))
+            tagger._reload_thread.join()
+            self.assertEqual(nlp(make_doc(nlp, [("sean", "sean", "Aq")]))[0]._.musas_tags, ["T3+"])
+            self.assertEqual(tagger.reload_metrics['builds'], 3)
+
+            # A broken lexicon is not loaded, and the old one is kept
+            with open(sw_lexicon, "w", encoding="utf-8") as fout:
+                fout.write("not a lexicon\n")
+            with self.assertLogs("ciall.components.musas_tagger", "ERROR"):
+                nlp(make_doc(nlp, test_text))
+                tagger._reload_thread.join()
+            self.assertEqual(nlp(make_doc(nlp, test_text))[0]._.musas_tags, ["T3-"])
+            self.assertEqual(tagger.reload_metrics['builds'], 3)
+
+    def test_concurrent_reloads(self):
+        nlp = spacy.blank("ga")
+        tagger = nlp.add_pipe("ciall_musas_tagger", config={'sw_lexicon': TEST_SW_LEXICON,
+                                                            'mw_lexicon': TEST_MW_LEXICON, 'engine': self.ENGINE})
+        # Reloads by hand and in the background never build and swap at the same time
+        build_tagger = tagger._build_tagger
+        running = []
+        overlaps = []
+        def slow_build_tagger():
+            running.append(1)
+            overlaps.append(len(running) > 1)
+            time.sleep(0.01)
+            result = build_tagger()
+            running.pop()
+            return result
+        tagger._build_tagger = slow_build_tagger
+        threads = [threading.Thread(target=tagger.reload) for _ in range(4)]
+        threads.append(tagger.reload(background=True))
+        for thread in threads[:-1]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(overlaps, [False] * 5)
+        self.assertEqual(tagger.reload_metrics['builds'], 6)
+
     # NOTE:
     # Disabled because it will fail with standard PyMUSAS ranking behaviour.
-    # If we find a way to change that behaviour, we can enable this test.
+    # It is enabled for the native engine, which changes that behaviour.
     @unittest.skip("Fails with standard PyMUSAS ranking behaviour")
     def test_token_lemma_matching(self):
+        self.check_token_lemma_matching()
+
+    def test_result_cache_pymusas(self):
+        with self.assertRaises(TypeError):
+            nlp = spacy.blank("ga")
+            nlp.add_pipe("ciall_musas_tagger", config={'sw_lexicon': TEST_SW_LEXICON, 'mw_lexicon': TEST_MW_LEXICON,
+                                                       'engine': "pymusas", 'result_cache_size': 100})
+
+    def check_token_lemma_matching(self):
         """
         This tests the ranking of token-based and lemma-based matches in PyMUSAS
 
@@ -170,10 +276,35 @@ class TestMUSASTagger(unittest.TestCase):
             ["L2fn", "L2"],  # mare
         ]
 
-        doc = process_test_text(test_text)
+        doc = process_test_text(test_text, self.ENGINE)
 
         for token, sem_tags in zip (doc, expected_sem_tags):
             if isinstance(sem_tags, str):
                 sem_tags = [sem_tags]
             self.assertEqual(sem_tags, token._.musas_tags, "For '%s' expected %s, got %s" % \
-                             (token.text, sem_tags, token._.musas_tags))
\ No newline at end of file
+                             (token.text, sem_tags, token._.musas_tags))
+
+class TestNativeMUSASTagger(TestMUSASTagger):
+
+    ENGINE = "native"
+
+    def test_token_lemma_matching(self):
+        # The native engine prioritises lemma-based matches, so this passes
+        self.check_token_lemma_matching()
+
+    def test_result_cache(self):
+        nlp = spacy.blank("ga")
+        nlp.add_pipe("ciall_musas_tagger", config={'sw_lexicon': TEST_SW_LEXICON, 'mw_lexicon': TEST_MW_LEXICON,
+                                                   'engine': self.ENGINE, 'result_cache_size': 100})
+        test_text = [("mé", "mé", "Pp"), ("mé", "mé", "Pp"), ("Siberia", "Siberia", "Np")]
+        doc = nlp(make_doc(nlp, test_text))
+        self.assertEqual([token._.musas_tags for token in doc], [["Z8"], ["Z8"], ["Z0"]])
+        cache_info = nlp.get_pipe("ciall_musas_tagger").result_cache_info()
+        self.assertEqual((cache_info.hits, cache_info.misses), (0, 2))
+        doc = nlp(make_doc(nlp, test_text))
+        cache_info = nlp.get_pipe("ciall_musas_tagger").result_cache_info()
+        self.assertEqual((cache_info.hits, cache_info.misses), (2, 2))
+
+    def test_invalid_engine(self):
+        with self.assertRaises(TypeError):
+            process_test_text([], "not_an_engine")
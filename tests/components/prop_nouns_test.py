@@ -1 +1,24 @@
-# TODO!
\ No newline at end of file
+import unittest
+
+import spacy
+
+import ciall.components.musas_tagger  # The musas_tags extension
+import ciall.components.prop_nouns
+from ciall.utils.tsv import doc_from_tuples
+
+
+class TestPropNouns(unittest.TestCase):
+
+    def test_prop_nouns(self):
+        tuples = [
+            ("TOKEN",   "PAR_SHORT", "MORPH_TAGS"           ),
+            ("Seán",    "Np",        "Noun Masc Com Sg Pers"),
+            ("Gaillimh", "Np",       "Noun Fem Com Sg Place"),
+            ("Mac",     "Np",        "Noun Masc Com Sg Fam" ),
+            ("cat",     "Nc",        "Noun Masc Com Sg Pers"),
+            ("Ó",       "Np",        "Noun Masc Com Sg"     ),
+        ]
+        nlp = spacy.blank("ga")
+        nlp.add_pipe("ciall_prop_nouns")
+        doc = nlp(doc_from_tuples(nlp, tuples))
+        self.assertEqual([token._.musas_tags for token in doc], [["Z1"], ["Z2"], ["Z1"], None, None])
@@ -0,0 +1,33 @@
+import unittest
+
+import spacy
+from spacy.tokens import Doc
+
+from ciall.components.token_attributes import doc_column, doc_from_docs
+
+
+class TestTokenAttributes(unittest.TestCase):
+
+    def test_mutable_default(self):
+        nlp = spacy.blank("ga")
+        doc = Doc(nlp.vocab, words=["Níl", "aon"])
+        # Changes to a mutable default value are kept
+        doc[0]._.ifst_matches.append("x")
+        self.assertEqual(doc[0]._.ifst_matches, ["x"])
+        self.assertEqual(doc_column(doc, "ifst_matches"), [["x"], []])
+        # Immutable defaults don't make a column until they're set
+        self.assertEqual(doc[0]._.par_short, "")
+        self.assertIsNone(doc._.par_short_column)
+
+    def test_doc_from_docs(self):
+        nlp = spacy.blank("ga")
+        doc1 = Doc(nlp.vocab, words=["Níl", "aon"])
+        doc2 = Doc(nlp.vocab, words=["scrúdú"])
+        doc1._.par_short_column = ["Vm", "Dq"]
+        doc2[0]._.dep_tags = ["@SUBJ"]
+
+        doc = doc_from_docs([doc1, doc2])
+        self.assertEqual([token.text for token in doc], ["Níl", "aon", "scrúdú"])
+        self.assertEqual(doc._.par_short_column, ["Vm", "Dq", ""])
+        self.assertEqual(doc._.dep_tags_column, [[], [], ["@SUBJ"]])
+        self.assertIsNone(doc._.morph_tags_column)
@@ -0,0 +1,71 @@
+import os
+import subprocess
+import tempfile
+import unittest
+
+from ciall import score
+
+
+GOLD_FILE = "example/example_accuracy_test.tsv"
+
+
+class ScoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.output_file = os.path.join(self.tmpdir.name, "output.tsv")
+        cp = subprocess.run(
+            "python3 -m ciall.cmd --conf=example/example_conf.yaml --infile=%s --outfile=%s" %
+            (GOLD_FILE, self.output_file),
+            shell=True)
+        self.assertEqual(cp.returncode, 0)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_same_as_accuracy(self):
+        # Scoring the output gives the same report as running the pipeline with --accuracy
+        accuracy = subprocess.run(
+            "python3 -m ciall.cmd --conf=example/example_conf.yaml --infile=%s --accuracy" % GOLD_FILE,
+            shell=True,
+            capture_output=True)
+        scored = subprocess.run(
+            "python3 -m ciall.score --output=%s --gold=%s" % (self.output_file, GOLD_FILE),
+            shell=True,
+            capture_output=True)
+        self.assertEqual(scored.returncode, 0)
+        self.assertEqual(scored.stdout, accuracy.stdout)
+
+    def test_no_spacy(self):
+        cp = subprocess.run(
+            "python3 -c \"import sys, ciall.score; print('spacy' in sys.modules, 'pymusas' in sys.modules)\"",
+            shell=True,
+            capture_output=True)
+        self.assertEqual(cp.stdout, b"False False\n")
+
+    def test_mismatched_files(self):
+        with open(self.output_file, encoding="utf-8") as fin:
+            lines = fin.read().splitlines()
+
+        # A missing token
+        with open(self.output_file, "w", encoding="utf-8") as fout:
+            fout.write("\n".join(lines[:-1]) + "\n")
+        with self.assertRaises(ValueError):
+            score.score_file(self.output_file, GOLD_FILE)
+
+        # A different token
+        with open(self.output_file, "w", encoding="utf-8") as fout:
+            fout.write("\n".join(lines[:-1] + [lines[-1].replace("\t.\t", "\t!\t", 1)]) + "\n")
+        with self.assertRaises(ValueError):
+            score.score_file(self.output_file, GOLD_FILE)
+
+    def test_chunks(self):
+        # The report is the same however many tokens are scored at once
+        report = score.score_file(self.output_file, GOLD_FILE)
+        chunk_size = score.CHUNK_SIZE
+        try:
+            score.CHUNK_SIZE = 4
+            chunked_report = score.score_file(self.output_file, GOLD_FILE)
+        finally:
+            score.CHUNK_SIZE = chunk_size
+        self.assertEqual(vars(chunked_report), vars(report))
@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from ciall.utils.accuracy import AccuracyReport
+from ciall.utils.accuracy_cache import AccuracyCache, lexicon_changes
+
+
+CURR_DIR = os.path.dirname(os.path.abspath(__file__))
+EXAMPLE_DIR = CURR_DIR + "/../../example"
+
+
+class TestAccuracyCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmpdir, "cache")
+        self.sw_lexicon = os.path.join(self.tmpdir, "sw_lexicon.tsv")
+        self.mw_lexicon = os.path.join(self.tmpdir, "mw_lexicon.tsv")
+        shutil.copy(EXAMPLE_DIR + "/example_sw_lexicon.tsv", self.sw_lexicon)
+        shutil.copy(EXAMPLE_DIR + "/example_mw_lexicon.tsv", self.mw_lexicon)
+        self.conf = {'components': ["ciall_musas_tagger"],
+                     'ciall_musas_tagger': {'sw_lexicon': self.sw_lexicon, 'mw_lexicon': self.mw_lexicon}}
+
+        self.report = AccuracyReport()
+        self.report.add_token("Nc", ["A1"], "A1")
+        self.report.add_token("Vm", ["A1", "Z5"], "Z5")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def append_to_lexicon(self, file_path, line):
+        # The example lexicons don't end with a newline
+        with open(file_path, "a", encoding="utf-8") as fout:
+            fout.write("\n" + line)
+
+    def test_get_put(self):
+        cache = AccuracyCache(self.cache_dir, self.conf)
+        self.assertIsNone(cache.get("file one"))
+        cache.put("file one", self.report)
+        cache.save()
+
+        report = AccuracyCache(self.cache_dir, self.conf).get("file one")
+        self.report.calculate_totals()
+        self.assertEqual(report.report_str, self.report.report_str)
+        self.assertIsNone(cache.get("file two"))
+
+        # Changing the config or the lexicons means the file is evaluated again
+        self.assertIsNone(AccuracyCache(self.cache_dir, dict(self.conf, components=[])).get("file one"))
+        self.append_to_lexicon(self.sw_lexicon, "zú\tNc\tL2")
+        self.assertIsNone(AccuracyCache(self.cache_dir, self.conf).get("file one"))
+
+    def test_lemma_diff(self):
+        cache = AccuracyCache(self.cache_dir, self.conf, lemma_diff=True)
+        cache.put("file one", self.report, {"bó", "mór"})
+        cache.put("file two", self.report, {"cat", "ainm", "cleite"})
+        cache.save()
+
+        # Only files containing the words of a changed entry are evaluated again
+        self.append_to_lexicon(self.sw_lexicon, "Bó\tNc\tL2")
+        cache = AccuracyCache(self.cache_dir, self.conf, lemma_diff=True)
+        self.assertIsNone(cache.get("file one"))
+        self.assertIsNotNone(cache.get("file two"))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # A MWE only affects files containing all its words
+        self.append_to_lexicon(self.mw_lexicon, "mór_Aq cat_Nc\tZ8")
+        cache = AccuracyCache(self.cache_dir, self.conf, lemma_diff=True)
+        self.assertIsNone(cache.get("file one"))
+        self.assertIsNotNone(cache.get("file two"))
+
+        # A MWE with only wildcard words could affect any file
+        self.append_to_lexicon(self.mw_lexicon, "*_Nc *_Aq\tZ8")
+        cache = AccuracyCache(self.cache_dir, self.conf, lemma_diff=True)
+        self.assertIsNone(cache.get("file two"))
+
+    def test_lexicon_changes(self):
+        new_sw_lexicon = os.path.join(self.tmpdir, "new_sw_lexicon.tsv")
+        new_mw_lexicon = os.path.join(self.tmpdir, "new_mw_lexicon.tsv")
+        with open(self.sw_lexicon, encoding="utf-8") as fin, open(new_sw_lexicon, "w", encoding="utf-8") as fout:
+            fout.write(fin.read().replace("bí\tVm\tZ5 A3+", "bí\tVm\tA3+"))
+        with open(self.mw_lexicon, encoding="utf-8") as fin, open(new_mw_lexicon, "w", encoding="utf-8") as fout:
+            fout.write(fin.read() + "\ntar_* éis_Sp\tZ5")
+
+        changes = lexicon_changes(self.sw_lexicon, self.mw_lexicon, new_sw_lexicon, new_mw_lexicon)
+        # The POS and lemma-only lexicons both change
+        self.assertEqual(changes, [{"bí"}, {"bí"}, {"tar", "éis"}])
+        self.assertEqual(lexicon_changes(self.sw_lexicon, self.mw_lexicon, self.sw_lexicon, self.mw_lexicon), [])
@@ -47,7 +47,7 @@ class CG3Test(unittest.TestCase):
         cg3doc.reorder_by_lemma_freq()
         self.assertEqual(cg3doc.tokens[0].token, "Níl")
         self.assertEqual(cg3doc.tokens[0].matches[0].lemma, "bí")
-        self.assertEqual(cg3doc.tokens[0].matches[0].morph_tags, ["Verb", "VI", "PresInd", "Neg"])
+        self.assertEqual(cg3doc.tokens[0].matches[0].morph_tags, ("Verb", "VI", "PresInd", "Neg"))
         self.assertEqual(cg3doc.tokens[0].matches[0].par_tag_long, "Vmip---n")
         self.assertEqual(cg3doc.tokens[0].matches[0].par_tag_short, "Vm")
         self.assertEqual(cg3doc.tokens[0].matches[0].udep_tag, "VERB")
@@ -69,8 +69,82 @@ class CG3Test(unittest.TestCase):
         doc = cg3.doc_from_cg3(nlp, CG3_TESTFILE)
         self.assertEqual(doc[0].text, "Níl")
         self.assertEqual(doc[0].lemma_, "bí")
-        self.assertEqual(doc[0]._.morph_tags, ["Verb", "VI", "PresInd", "Neg"])
+        self.assertEqual(doc[0]._.morph_tags, ("Verb", "VI", "PresInd", "Neg"))
         self.assertEqual(doc[0]._.par_long, "Vmip---n")
         self.assertEqual(doc[0]._.par_short, "Vm")
         self.assertEqual(doc[0].pos_, "VERB")
-        self.assertEqual(doc[0]._.dep_tags, ["@FMV", "#1->0"])
\ No newline at end of file
+        self.assertEqual(doc[0]._.dep_tags, ["@FMV", "#1->0"])
+
+    def test_iter_cg3_entries(self):
+        # Entries are read one at a time
+        lines = iter(CG3_TESTFILE.splitlines(keepends=True))
+        entries = cg3.iter_cg3_entries(lines)
+        entry = next(entries)
+        self.assertEqual(entry.token, "Níl")
+        self.assertEqual(next(lines), '"<scrúduithe>"\n')  # The next entry has been read to see that "aon" is complete
+
+        # Marker lines are yielded as strings
+        entries = list(cg3.iter_cg3_entries(["<s>", '"<Níl>"', '\t"bí" Verb VI PresInd Neg', "</s>"]))
+        self.assertEqual(entries[0], "<s>")
+        self.assertEqual(entries[1].token, "Níl")
+        self.assertEqual(entries[2], "</s>")
+
+    def test_docs_from_cg3_stream(self):
+        nlp = spacy.blank("ga")
+        lines = CG3_TESTFILE.splitlines(keepends=True)
+
+        docs = list(cg3.docs_from_cg3_stream(nlp, lines))
+        self.assertEqual([len(doc) for doc in docs], [13])
+        self.assertEqual([token.text for token in docs[0]], [token.text for token in cg3.doc_from_cg3(nlp, CG3_TESTFILE)])
+
+        # Sentences end after sentence-final punctuation
+        docs = list(cg3.docs_from_cg3_stream(nlp, lines, doc_boundary="sentence"))
+        self.assertEqual([doc[0].text for doc in docs], ["Níl", "Bhuail"])
+        self.assertEqual(docs[1][0]._.par_short, "Vm")
+        self.assertEqual(docs[1][0].lemma_, "buail")
+        # The matches are reordered by lemma frequency
+        self.assertEqual([match.lemma for match in docs[0][2]._.ifst_matches], ["bí", "scrúdú"])
+
+        # ...or at marker lines
+        marked_lines = ["<doc id=1>", "<s>"] + lines[:4] + ["</s>", "<s>"] + lines[4:13] + ["</s>", "</doc>",
+                        "<doc id=2>"] + lines[13:] + ["</doc>"]
+        docs = list(cg3.docs_from_cg3_stream(nlp, marked_lines, doc_boundary="sentence"))
+        self.assertEqual([len(doc) for doc in docs], [2, 4, 7])
+        docs = list(cg3.docs_from_cg3_stream(nlp, marked_lines, doc_boundary="doc_tag"))
+        self.assertEqual([len(doc) for doc in docs], [6, 7])
+        # Other marker lines don't end a sentence
+        docs = list(cg3.docs_from_cg3_stream(nlp, ["<p>"] + lines[:4] + ["<p>"] + lines[4:], doc_boundary="sentence"))
+        self.assertEqual([len(doc) for doc in docs], [6, 7])
+
+        # Whether a token ends a sentence depends on its most frequent reading, which is the one it's tagged with
+        fin_lines = ['"<agus>"\n', '\t"ciallaigh" Punct Fin\n', '\t"agus" Conj Coord\n'] + lines[13:]
+        docs = list(cg3.docs_from_cg3_stream(nlp, fin_lines, doc_boundary="sentence"))
+        self.assertEqual([len(doc) for doc in docs], [8])
+        self.assertEqual(docs[0][0].lemma_, "agus")
+
+        with self.assertRaises(TypeError):
+            list(cg3.docs_from_cg3_stream(nlp, lines, doc_boundary="blank"))
+
+    def test_max_readings(self):
+        nlp = spacy.blank("ga")
+        lines = CG3_TESTFILE.splitlines(keepends=True)
+
+        # Only the first (most frequent) readings are kept
+        doc = next(cg3.docs_from_cg3_stream(nlp, lines, max_readings=1))
+        self.assertEqual([match.lemma for match in doc[2]._.ifst_matches], ["bí"])
+        self.assertEqual(doc[2]._.par_short, "Vm")
+        self.assertEqual(doc[2]._.ifst_matches[0].morph_mask, doc[2]._.morph_mask)
+
+        with self.assertRaises(TypeError):
+            list(cg3.docs_from_cg3_stream(nlp, lines, max_readings=0))
+
+    def test_match(self):
+        # Readings with the same tags share them
+        match = cg3.CG3Match("bí", ["Verb", "VI", "PresInd", "Neg"], ["@FMV", "#1->0"])
+        other = cg3.CG3Match("bí", ["Verb", "VI", "PresInd", "Neg"], ["@FMV", "#1->0"])
+        self.assertEqual(match, other)
+        self.assertIs(match.morph_tags, other.morph_tags)
+        self.assertIs(match.dep_tags[0], other.dep_tags[0])
+        self.assertEqual((match.par_tag_long, match.par_tag_short, match.udep_tag), ("Vmip---n", "Vm", "VERB"))
+        with self.assertRaises(AttributeError):
+            match.par_tag_long = "Vm"
@@ -0,0 +1,61 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+from ciall.utils.compact_map import CompactMap, write_compact_map
+
+
+class TestCompactMap(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "map.bin")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_strings(self):
+        mapping = {"bí|Vm": ["Z5", "A3+"], "lár": ["M6", "N2"], "mór": ["N3.2"], "": [], "x": ["Z5"]}
+        write_compact_map(self.path, mapping)
+        compact_map = CompactMap(self.path)
+        self.assertEqual(compact_map, mapping)
+        self.assertEqual(len(compact_map), 5)
+        self.assertEqual(list(compact_map), list(mapping))
+        self.assertEqual(compact_map["bí|Vm"], ["Z5", "A3+"])
+        self.assertEqual(compact_map.get("bí|Nc"), None)
+        self.assertIn("", compact_map)
+        self.assertNotIn("bí", compact_map)
+        self.assertNotIn(1, compact_map)
+        with self.assertRaises(KeyError):
+            compact_map["bí"]
+
+    def test_ints(self):
+        mapping = {"agus": 819476, "a": 1375733, "mór": 1 << 40}
+        write_compact_map(self.path, mapping)
+        compact_map = CompactMap(self.path)
+        self.assertEqual(compact_map, mapping)
+        self.assertEqual(compact_map.get("xyz", 0), 0)
+
+    def test_empty(self):
+        write_compact_map(self.path, {})
+        compact_map = CompactMap(self.path)
+        self.assertEqual(len(compact_map), 0)
+        self.assertIsNone(compact_map.get("a"))
+
+    def test_pickle(self):
+        write_compact_map(self.path, {"a": ["Z5"]})
+        compact_map = pickle.loads(pickle.dumps(CompactMap(self.path)))
+        self.assertEqual(compact_map["a"], ["Z5"])
+
+    def test_invalid_file(self):
+        with open(self.path, "wb") as fout:
+            fout.write(b"\x00not a map")
+        with self.assertRaises(ValueError):
+            CompactMap(self.path)
+
+        write_compact_map(self.path, {"a": ["Z5"]})
+        with open(self.path, "ab") as fout:
+            fout.write(b"\x00")
+        with self.assertRaises(ValueError):
+            CompactMap(self.path)
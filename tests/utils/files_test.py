@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from ciall.utils.files import find_files, OutputSink
+
+
+class TestFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.indir = os.path.join(self.tmpdir.name, "in")
+        for path in ("b.tsv", "a.tsv", "sub/c.tsv", ".hidden.tsv", ".git/d.tsv"):
+            os.makedirs(os.path.dirname(os.path.join(self.indir, path)), exist_ok=True)
+            with open(os.path.join(self.indir, path), "w") as fout:
+                fout.write(path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_find_files(self):
+        self.assertEqual([os.path.relpath(path, self.indir) for path in find_files(self.indir)],
+                         ["a.tsv", "b.tsv", os.path.join("sub", "c.tsv")])
+
+    def test_outdir(self):
+        outdir = os.path.join(self.tmpdir.name, "out")
+        sink = OutputSink(outdir=outdir, indir=self.indir)
+        for path in find_files(self.indir):
+            sink.stream(path).write("output of %s" % os.path.relpath(path, self.indir))
+            sink.doc_written()
+        sink.close()
+
+        # The output folder mirrors the input folder
+        self.assertEqual([os.path.relpath(path, outdir) for path in find_files(outdir)],
+                         ["a.tsv", "b.tsv", os.path.join("sub", "c.tsv")])
+        with open(os.path.join(outdir, "sub", "c.tsv")) as fin:
+            self.assertEqual(fin.read(), "output of %s" % os.path.join("sub", "c.tsv"))
+
+    def test_outfile(self):
+        outfile = os.path.join(self.tmpdir.name, "out.tsv")
+        with mock.patch("os.fsync") as fsync:
+            sink = OutputSink(outfile=outfile, buffer_size=16, fsync_every=2)
+            for path in find_files(self.indir):
+                self.assertIs(sink.stream(path), sink.stream(path))  # The file is only opened once
+                sink.stream(path).write(os.path.basename(path) + "\n")
+                sink.doc_written()
+            # Synced after the second doc, and when closed
+            self.assertEqual(fsync.call_count, 1)
+            sink.close()
+            self.assertEqual(fsync.call_count, 2)
+        with open(outfile) as fin:
+            self.assertEqual(fin.read(), "a.tsv\nb.tsv\nc.tsv\n")
+
+        with self.assertRaises(TypeError):
+            OutputSink(outfile=outfile, outdir=self.tmpdir.name)
@@ -1,9 +1,34 @@
+import os
+import sys
+import tempfile
 import unittest
+import subprocess
 
-from ciall.utils.lemmafreq import lemmafreq
+import ciall.utils.lemmafreq
+from ciall.utils.lemmafreq import lemmafreq, use_lemmafreq_cache
+from ciall.utils.compact_map import CompactMap
 
 
 class TestLemmafreq(unittest.TestCase):
     def test_lemmafreq(self):
         # A very simple test to ensure that the lemmafreq() function works
-        self.assertGreater(lemmafreq("agus"), lemmafreq("ciallaigh"))
\ No newline at end of file
+        self.assertGreater(lemmafreq("agus"), lemmafreq("ciallaigh"))
+
+    def test_lazy_load(self):
+        # Importing the module neither reads the table nor imports pymusas
+        code = ("import sys, ciall.utils.lemmafreq as lf; "
+                "print(lf.LEMMA_FREQ is None, any(name.startswith('pymusas') for name in sys.modules))")
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.split(), ["True", "False"])
+
+    def test_cache(self):
+        module = ciall.utils.lemmafreq
+        saved = module.LEMMA_FREQ, module._use_cache, module._cache_dir
+        try:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                use_lemmafreq_cache(tmpdir)
+                self.assertGreater(lemmafreq("agus"), lemmafreq("ciallaigh"))
+                self.assertIsInstance(module.LEMMA_FREQ, CompactMap)
+                self.assertEqual(len(os.listdir(tmpdir)), 1)
+        finally:
+            module.LEMMA_FREQ, module._use_cache, module._cache_dir = saved
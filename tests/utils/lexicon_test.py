@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pymusas.lexicon_collection import LexiconCollection, MWELexiconCollection
+
+from ciall.utils.lexicon import read_sw_lexicon, read_mw_lexicon, load_sw_lexicon, compiled_lexicon_path
+
+
+CURR_DIR = os.path.dirname(os.path.abspath(__file__))
+TEST_SW_LEXICON = CURR_DIR + "/../components/test_sw_lexicon.tsv"
+TEST_MW_LEXICON = CURR_DIR + "/../components/test_mw_lexicon.tsv"
+
+
+class TestLexicon(unittest.TestCase):
+
+    def test_read_sw_lexicon(self):
+        # Reading the file once should give the same as reading it twice with pymusas
+        pos_lexicon, lemma_lexicon = read_sw_lexicon(TEST_SW_LEXICON)
+        self.assertEqual(pos_lexicon, LexiconCollection.from_tsv(TEST_SW_LEXICON))
+        self.assertEqual(lemma_lexicon, LexiconCollection.from_tsv(TEST_SW_LEXICON, include_pos=False))
+        self.assertEqual(pos_lexicon["bí|Vm"], ["Z5", "A3+"])
+        self.assertEqual(lemma_lexicon["bí"], ["Z5", "A3+"])
+
+    def test_read_mw_lexicon(self):
+        mw_lexicon = read_mw_lexicon(TEST_MW_LEXICON)
+        self.assertEqual(mw_lexicon, MWELexiconCollection.from_tsv(TEST_MW_LEXICON))
+        self.assertEqual(mw_lexicon["ainm_* cleite_*"], ["Q2.2"])
+
+    def test_invalid_header(self):
+        with self.assertRaises(ValueError):
+            read_sw_lexicon(TEST_MW_LEXICON)
+        with self.assertRaises(ValueError):
+            read_mw_lexicon(TEST_SW_LEXICON)
+
+
+class TestCompiledLexicon(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmpdir.name, "cache")
+        self.sw_lexicon = os.path.join(self.tmpdir.name, "sw_lexicon.tsv")
+        shutil.copy(TEST_SW_LEXICON, self.sw_lexicon)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_compiled_lexicon(self):
+        expected = read_sw_lexicon(self.sw_lexicon)
+        compiled_path = compiled_lexicon_path(self.sw_lexicon, "sw_pos", self.cache_dir)
+        self.assertFalse(os.path.exists(compiled_path))
+
+        # The first load compiles the lexicon into the cache folder
+        self.assertEqual(load_sw_lexicon(self.sw_lexicon, self.cache_dir), expected)
+        self.assertTrue(os.path.exists(compiled_path))
+        # Readable by others, not just by the owner as a new temporary file is
+        umask = os.umask(0o022)
+        os.umask(umask)
+        self.assertEqual(os.stat(compiled_path).st_mode & 0o777, 0o666 & ~umask)
+
+        # The second load reads the compiled lexicon
+        self.assertEqual(load_sw_lexicon(self.sw_lexicon, self.cache_dir), expected)
+
+    def test_lexicon_changed(self):
+        load_sw_lexicon(self.sw_lexicon, self.cache_dir)
+        old_compiled_path = compiled_lexicon_path(self.sw_lexicon, "sw_pos", self.cache_dir)
+
+        with open(self.sw_lexicon, "a", encoding="utf-8") as fout:
+            fout.write("\nnua\tAq\tT3-\n")
+
+        new_compiled_path = compiled_lexicon_path(self.sw_lexicon, "sw_pos", self.cache_dir)
+        self.assertNotEqual(old_compiled_path, new_compiled_path)
+        pos_lexicon, lemma_lexicon = load_sw_lexicon(self.sw_lexicon, self.cache_dir)
+        self.assertEqual(pos_lexicon["nua|Aq"], ["T3-"])
+        self.assertTrue(os.path.exists(new_compiled_path))
+        # The out of date copy is deleted
+        self.assertFalse(os.path.exists(old_compiled_path))
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_corrupt_compiled_lexicon(self):
+        compiled_path = compiled_lexicon_path(self.sw_lexicon, "sw_pos", self.cache_dir)
+        os.makedirs(self.cache_dir)
+        with open(compiled_path, "wb") as fout:
+            fout.write(b"\x00not a lexicon")
+        self.assertEqual(load_sw_lexicon(self.sw_lexicon, self.cache_dir), read_sw_lexicon(self.sw_lexicon))
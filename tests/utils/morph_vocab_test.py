@@ -0,0 +1,39 @@
+import unittest
+
+from ciall.utils.morph_vocab import MorphVocab
+
+
+class TestMorphVocab(unittest.TestCase):
+
+    def test_mask(self):
+        vocab = MorphVocab(["Noun", "Verb"])
+        self.assertEqual(vocab.intern("Noun"), 1)
+        self.assertEqual(vocab.intern("Verb"), 2)
+
+        # New tags are added as they're seen
+        mask = vocab.mask(["Masc", "Noun", "Sg"])
+        self.assertEqual(len(vocab), 4)
+        self.assertIn("Sg", vocab)
+        self.assertNotIn("Fem", vocab)
+        self.assertEqual(mask & vocab.mask(["Noun", "Sg"]), vocab.mask(["Sg", "Noun"]))
+        self.assertEqual(mask & vocab.mask(["Verb"]), 0)
+        self.assertEqual(vocab.tags_of(mask), ["Noun", "Masc", "Sg"])
+        self.assertEqual(vocab.mask([]), 0)
+
+    def test_intern_tags(self):
+        vocab = MorphVocab()
+        tags, mask = vocab.intern_tags(["Noun", "Masc", "Sg"])
+        self.assertEqual(tags, ("Noun", "Masc", "Sg"))
+        self.assertEqual(mask, vocab.mask(["Sg", "Masc", "Noun"]))
+        # Equal lists of tags share a tuple, and keep their order
+        self.assertIs(vocab.intern_tags(["Noun", "Masc", "Sg"])[0], tags)
+        self.assertEqual(vocab.intern_tags(["Sg", "Masc", "Noun"]), (("Sg", "Masc", "Noun"), mask))
+
+        # The table of tuples is bounded
+        vocab = MorphVocab(max_tag_lists=2)
+        vocab.intern_tags(["Noun"])
+        vocab.intern_tags(["Verb"])
+        tags, mask = vocab.intern_tags(["Noun", "Sg"])
+        self.assertEqual(len(vocab._tag_lists), 1)
+        self.assertEqual(vocab.intern_tags(["Noun"]), (("Noun",), vocab.mask(["Noun"])))
+        self.assertIs(vocab.intern_tags(["Noun", "Sg"])[0], tags)
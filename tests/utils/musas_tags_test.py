@@ -1,6 +1,28 @@
+import random
 import unittest
 
-from ciall.utils.musas_tags import Tag, TagComparison, CompoundTag, MultiSenseTag
+from ciall.utils.musas_tags import DESCRIPTIONS, Tag, TagComparison, CompoundTag, MultiSenseTag, match_batch
+
+
+def reference_compare(tag1, tag2):
+    """
+    Tag.compare() as it was before tags had integer ids, for checking against
+    """
+    if (tag1.tag_str == "Z99") or (tag2.tag_str == "Z99"):
+        return TagComparison.UNEQUAL
+    if (tag1.field, list(tag1.subdivisions), set(tag1.symbols)) == \
+            (tag2.field, list(tag2.subdivisions), set(tag2.symbols)):
+        return TagComparison.EQUAL
+    if tag1.category == tag2.category:
+        return TagComparison.SAME_CATEGORY
+    if tag1.field == tag2.field:
+        if tag1.subdivisions[0] == tag2.subdivisions[0]:
+            len1 = len(tag1.subdivisions)
+            if (len(tag2.subdivisions) >= len1) and (tag2.subdivisions[:len1] == tag1.subdivisions):
+                return TagComparison.SUB_CATEGORY
+            return TagComparison.SAME_1L_DIV
+        return TagComparison.SAME_FIELD
+    return TagComparison.UNEQUAL
 
 
 class TestMusasTag(unittest.TestCase):
@@ -9,7 +31,7 @@ class TestMusasTag(unittest.TestCase):
         tag = Tag("S1.2.3mf-")
         self.assertEqual(tag.field, "S")
         self.assertEqual(tag.subdivisions_str, "1.2.3")
-        self.assertEqual(tag.subdivisions, ["1", "2", "3"])
+        self.assertEqual(tag.subdivisions, ("1", "2", "3"))
         self.assertEqual(tag.category, "S1.2.3")
         self.assertEqual(tag.symbols_str, "mf-")
         self.assertEqual(tag.symbols, {"m", "-", "f"})
@@ -17,7 +39,7 @@ class TestMusasTag(unittest.TestCase):
         tag = Tag("A1.2fci++")
         self.assertEqual(tag.field, "A")
         self.assertEqual(tag.subdivisions_str, "1.2")
-        self.assertEqual(tag.subdivisions, ["1", "2"])
+        self.assertEqual(tag.subdivisions, ("1", "2"))
         self.assertEqual(tag.category, "A1.2")
         self.assertEqual(tag.symbols_str, "fci++")
         self.assertEqual(tag.symbols, {"c", "++", "i", "f"})
@@ -44,6 +66,16 @@ class TestMusasTag(unittest.TestCase):
         self.assertNotEqual(tag2, tag3)
         self.assertNotEqual(tag3, tag1)
 
+    def test_tag_parse(self):
+        tag = Tag.parse("S1.2.3mf-")
+        self.assertIs(Tag.parse("S1.2.3mf-"), tag)
+        self.assertEqual(tag, Tag("S1.2.3mf-"))
+        self.assertEqual(hash(tag), hash(Tag("S1.2.3mf-")))
+        with self.assertRaises(AttributeError):
+            tag.field = "A"
+        with self.assertRaises(TypeError):
+            Tag.parse("not a tag")
+
     def test_tag_comparison(self):
         self.assertEqual(Tag("A1.2.3f+").compare(Tag("A1.2.3f+")), TagComparison.EQUAL)
         self.assertEqual(Tag("A1.2.3m+").compare(Tag("A1.2.3f+")), TagComparison.SAME_CATEGORY)
@@ -73,6 +105,18 @@ class TestMusasTag(unittest.TestCase):
         self.assertEqual(Tag("Q4.5").match(Tag("A1.2.3f+")), 0.0)
 
 
+    def test_tag_comparison_table(self):
+        # Comparing the tag ids gives the same as comparing the tags' fields, subdivisions and symbols
+        rng = random.Random(0)
+        categories = [c for c in DESCRIPTIONS if len(c) > 1] + ["A1.2.3.4", "S7.2.5", "Q9"]
+        symbols = ["", "f", "m", "mf", "fm", "i", "%", "@c", "+", "++", "-", "---", "f+", "n--", "+-"]
+        tags = [Tag(rng.choice(categories) + rng.choice(symbols)) for _ in range(300)] + [Tag("Z99")]
+        for tag1 in tags:
+            for tag2 in rng.sample(tags, 50) + [tag1]:
+                self.assertEqual(tag1.compare(tag2), reference_compare(tag1, tag2), "%s, %s" % (tag1, tag2))
+                self.assertEqual(tag1 == tag2, (tag1.category, tag1.symbols) == (tag2.category, tag2.symbols))
+
+
 class TestMusasCompoundTag(unittest.TestCase):
 
     def test_compound_tag_parsing(self):
@@ -81,6 +125,13 @@ class TestMusasCompoundTag(unittest.TestCase):
         self.assertEqual(ctag.tags[0].category, "Q1.2")
         self.assertEqual(ctag.tags[1].category, "S2")
 
+    def test_compound_tag_parse(self):
+        ctag = CompoundTag.parse("Q1.2/S2mf")
+        self.assertIs(CompoundTag.parse("Q1.2/S2mf"), ctag)
+        self.assertIs(ctag.tags[1], Tag.parse("S2mf"))
+        with self.assertRaises(AttributeError):
+            ctag.tags = ()
+
     def test_compount_tag_description(self):
         ctag = CompoundTag("Q1.2/S2mf")
         self.assertEqual(ctag.description, "Paper documents and writing / People")
@@ -112,6 +163,11 @@ class TestMusasMultiSenseTag(unittest.TestCase):
         self.assertEqual(mstag.senses[1].num_tags, 1)
         self.assertEqual(mstag.senses[1].tags[0].category, "S7.2.5")
 
+    def test_multisense_tag_parse(self):
+        mstag = MultiSenseTag.parse("Q1.2/S2mf S7.2.5-")
+        self.assertIs(MultiSenseTag.parse("Q1.2/S2mf S7.2.5-"), mstag)
+        self.assertIs(mstag.senses[0], CompoundTag.parse("Q1.2/S2mf"))
+
     def test_multisense_tag_match(self):
         tests = [
             # no match
@@ -134,4 +190,20 @@ class TestMusasMultiSenseTag(unittest.TestCase):
         ]
 
         for mst, ct, mv in tests:
-            self.assertEqual(round(MultiSenseTag(mst).match(CompoundTag(ct)), 3), mv)
\ No newline at end of file
+            self.assertEqual(round(MultiSenseTag(mst).match(CompoundTag(ct)), 3), mv)
+
+    def test_match_batch(self):
+        rng = random.Random(0)
+        categories = [c for c in DESCRIPTIONS if len(c) > 1]
+
+        def random_compound_tag():
+            return "/".join(rng.choice(categories) + rng.choice(["", "f", "+", "m-"])
+                            for _ in range(rng.choice([1, 1, 2, 3])))
+
+        predicted = [[random_compound_tag() for _ in range(rng.randint(1, 4))] for _ in range(500)] + [[]]
+        expected = [rng.choice([random_compound_tag(), tags[0] if tags else "Z99", " ".join(tags) or "A1"])
+                    for tags in predicted]
+        match_values = [MultiSenseTag.parse(" ".join(tags)).match(MultiSenseTag.parse(expected_tag).senses[0])
+                        for tags, expected_tag in zip(predicted, expected)]
+        self.assertEqual(match_batch(predicted, expected).tolist(), match_values)
+        self.assertEqual(match_batch([], []).tolist(), [])
@@ -0,0 +1,188 @@
+import os
+import random
+import unittest
+
+from pymusas.rankers.lexicon_entry import ContextualRuleBasedRanker
+from pymusas.taggers.rules.single_word import SingleWordRule
+from pymusas.taggers.rules.mwe import MWERule
+from pymusas.taggers.rule_based import RuleBasedTagger
+
+from ciall.utils.lexicon import read_sw_lexicon, read_mw_lexicon
+from ciall.utils.native_tagger import SingleWordIndex, MWEMatcher, NativeTagger
+
+
+CURR_DIR = os.path.dirname(os.path.abspath(__file__))
+TEST_SW_LEXICON = CURR_DIR + "/../components/test_sw_lexicon.tsv"
+TEST_MW_LEXICON = CURR_DIR + "/../components/test_mw_lexicon.tsv"
+
+
+def pymusas_tagger(pos_lexicon, lemma_lexicon, mwe_lexicon):
+    rules = [SingleWordRule(pos_lexicon, lemma_lexicon), MWERule(mwe_lexicon)]
+    ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments(rules))
+    return RuleBasedTagger(rules, ranker)
+
+
+def random_text(rng, pos_lexicon, mwe_lexicon, length):
+    """
+    Makes a random text from the lexicon entries, some unknown words, and some MWEs.
+    Tokens are either the same as their lemma, or not in the lexicon at all,
+    so there are no clashes between token-based and lemma-based matches.
+    """
+    entries = [key.split("|") for key in pos_lexicon]
+    mwes = [[token_pos.split("_") for token_pos in template.split()] for template in mwe_lexicon]
+    pos_tags = sorted(set(pos for _, pos in entries)) + ["Np", "F", ""]
+
+    tokens, lemmas, pos = [], [], []
+    while len(tokens) < length:
+        r = rng.random()
+        if r < 0.5:
+            lemma, p = rng.choice(entries)
+            if rng.random() < 0.3:
+                p = rng.choice(pos_tags)  # wrong POS, so only the lemma-only lexicon can match
+            token = rng.choice([lemma, lemma.upper(), lemma.capitalize(), "bh" + lemma])
+        elif r < 0.8:
+            lemma = token = rng.choice(["xyz", "Siberia", "1990", ".", "\n"])
+            p = rng.choice(pos_tags)
+        else:
+            for word, p in rng.choice(mwes):
+                if p == "*":
+                    p = rng.choice(pos_tags)
+                tokens.append(rng.choice([word, word.lower()]))
+                lemmas.append(word)
+                pos.append(p)
+            continue
+        tokens.append(token)
+        lemmas.append(lemma)
+        pos.append(p)
+
+    return tokens, lemmas, pos
+
+
+class TestSingleWordIndex(unittest.TestCase):
+
+    def test_lookup_order(self):
+        index = SingleWordIndex({"lár|Nc": ["M6", "N2"], "láir|Nc": ["L2fn", "L2"]},
+                                {"lár": ["M6", "N2"], "láir": ["L2fn", "L2"], "mór": ["N3.2"]})
+        # The lemma is matched before the token
+        self.assertEqual(index.lookup("láir", "lár", "Nc"), ["M6", "N2"])
+        self.assertEqual(index.lookup("láir", "láir", "Nc"), ["L2fn", "L2"])
+        # Lowercased token
+        self.assertEqual(index.lookup("Láir", "xyz", "Nc"), ["L2fn", "L2"])
+        # Without the POS tag
+        self.assertEqual(index.lookup("Mhóra", "mór", "Aq"), ["N3.2"])
+        # No match
+        self.assertIsNone(index.lookup("xyz", "xyz", "Nc"))
+
+
+class TestMWEMatcher(unittest.TestCase):
+
+    def test_overlapping_matches(self):
+        matcher = MWEMatcher({
+            "North_Np East_Np": ["Z2"],
+            "East_Np London_Np brewery_Nc": ["I2.1"],
+            "London_Np brewery_Nc": ["H1"],
+        })
+        tokens = ["North", "East", "London", "brewery"]
+        pos = ["Np", "Np", "Np", "Nc"]
+        # The longest match is the best, so 'North' is left without a MWE match
+        self.assertEqual(matcher(tokens, tokens, pos),
+                         [None, (1, 4, ["I2.1"]), (1, 4, ["I2.1"]), (1, 4, ["I2.1"])])
+
+    def test_wildcard_matches(self):
+        matcher = MWEMatcher({
+            "tar_* éis_*": ["Z5"],
+            "tar_Sp éis_Sp": ["T2"],
+        })
+        # A match without wildcards is better than a match with wildcards
+        self.assertEqual(matcher(["tar", "éis"], ["tar", "éis"], ["Sp", "Sp"]),
+                         [(0, 2, ["T2"]), (0, 2, ["T2"])])
+        self.assertEqual(matcher(["tar", "éis"], ["tar", "éis"], ["Vm", "Nc"]),
+                         [(0, 2, ["Z5"]), (0, 2, ["Z5"])])
+        # Matches on the lemma
+        self.assertEqual(matcher(["thar", "éis"], ["tar", "éis"], ["Vm", "Nc"]),
+                         [(0, 2, ["Z5"]), (0, 2, ["Z5"])])
+        self.assertEqual(matcher(["tar", "x", "éis"], ["tar", "x", "éis"], ["Vm", "Nc", "Nc"]),
+                         [None, None, None])
+
+    def test_wildcard_anchors(self):
+        matcher = MWEMatcher({
+            "*_Vm tar_Sp éis_*": ["A1"],
+            "*_* ar*_* bith_*": ["A2"],
+            "*_Nc *_Aq": ["A3"],
+            "*_* *_*": ["A4"],
+        })
+        # Each template is indexed by its first literal element, word or POS tag
+        self.assertEqual([template[0] for template in matcher.symbol_anchors["tar_Sp"]], [1])
+        self.assertEqual([template[0] for template in matcher.word_anchors["bith"]], [2])
+        self.assertEqual([template[0] for template in matcher.pos_anchors["Nc"]], [0])
+        self.assertEqual(len(matcher.unanchored_templates), 1)
+
+        self.assertEqual(matcher(["bhí", "tar", "éis"], ["bí", "tar", "éis"], ["Vm", "Sp", "Nc"]),
+                         [(0, 3, ["A1"])] * 3)
+        self.assertEqual(matcher(["rud", "ar", "bith"], ["rud", "ar", "bith"], ["Nc", "Sp", "Nc"]),
+                         [(0, 3, ["A2"])] * 3)
+        self.assertEqual(matcher(["cat", "mór", "."], ["cat", "mór", "."], ["Nc", "Aq", "F"]),
+                         [(0, 2, ["A3"]), (0, 2, ["A3"]), None])
+        self.assertEqual(matcher(["a", "b"], ["a", "b"], ["X", "Y"]), [(0, 2, ["A4"])] * 2)
+
+
+class TestNativeTagger(unittest.TestCase):
+
+    def assert_same_as_pymusas(self, pos_lexicon, lemma_lexicon, mwe_lexicon, texts):
+        expected_tagger = pymusas_tagger(pos_lexicon, lemma_lexicon, mwe_lexicon)
+        native_tagger = NativeTagger(pos_lexicon, lemma_lexicon, mwe_lexicon)
+        for tokens, lemmas, pos in texts:
+            self.assertEqual(native_tagger(tokens, lemmas, pos), expected_tagger(tokens, lemmas, pos))
+
+    def test_same_as_pymusas(self):
+        pos_lexicon, lemma_lexicon = read_sw_lexicon(TEST_SW_LEXICON)
+        mwe_lexicon = read_mw_lexicon(TEST_MW_LEXICON)
+        # The lexicon deliberately contains a token/lemma clash, which the engines rank differently.
+        # The extra wildcard templates are never ranked equally, as pymusas chooses between those at random
+        del pos_lexicon["láir|Nc"]
+        del lemma_lexicon["láir"]
+        mwe_lexicon["ceathrú_Nc tar_* éis_*"] = ["T1.2"]
+        mwe_lexicon["*_Vm tar_Sp éis_*"] = ["T2"]
+        mwe_lexicon["*_* *_* m*_Aq"] = ["A13.3"]
+        mwe_lexicon["*_Nc *_Aq *_Aq *_Aq"] = ["Z8"]
+
+        rng = random.Random(1)
+        texts = [random_text(rng, pos_lexicon, mwe_lexicon, rng.randint(0, 40)) for _ in range(300)]
+        self.assert_same_as_pymusas(pos_lexicon, lemma_lexicon, mwe_lexicon, texts)
+
+    def test_tag_batch(self):
+        pos_lexicon, lemma_lexicon = read_sw_lexicon(TEST_SW_LEXICON)
+        mwe_lexicon = read_mw_lexicon(TEST_MW_LEXICON)
+        tagger = NativeTagger(pos_lexicon, lemma_lexicon, mwe_lexicon)
+
+        rng = random.Random(2)
+        texts = [random_text(rng, pos_lexicon, mwe_lexicon, rng.randint(0, 20)) for _ in range(50)]
+        self.assertEqual(tagger.tag_batch(texts), [tagger(*text) for text in texts])
+
+    def test_result_cache(self):
+        pos_lexicon, lemma_lexicon = read_sw_lexicon(TEST_SW_LEXICON)
+        mwe_lexicon = read_mw_lexicon(TEST_MW_LEXICON)
+        tagger = NativeTagger(pos_lexicon, lemma_lexicon, mwe_lexicon)
+        cached_tagger = NativeTagger(pos_lexicon, lemma_lexicon, mwe_lexicon, result_cache_size=10)
+        self.assertIsNone(tagger.cache_info())
+
+        rng = random.Random(3)
+        texts = [random_text(rng, pos_lexicon, mwe_lexicon, rng.randint(0, 20)) for _ in range(50)]
+        for text in texts:
+            self.assertEqual(cached_tagger(*text), tagger(*text))
+        cache_info = cached_tagger.cache_info()
+        self.assertGreater(cache_info.hits, 0)
+        self.assertEqual(cache_info.maxsize, 10)
+        self.assertEqual(cache_info.currsize, 10)
+
+        # MWEs don't use the cache
+        tokens = ["ainm", "cleite"]
+        before = cached_tagger.cache_info()
+        self.assertEqual(cached_tagger(tokens, tokens, ["Nc", "Nc"]), [(["Q2.2"], [(0, 2)])] * 2)
+        after = cached_tagger.cache_info()
+        self.assertEqual((after.hits, after.misses), (before.hits, before.misses))
+
+    def test_length_mismatch(self):
+        tagger = NativeTagger({}, {}, {})
+        with self.assertRaises(ValueError):
+            tagger(["a", "b"], ["a"], ["Nc", "Nc"])
@@ -1,6 +1,14 @@
+import os
+import csv
 import unittest
 
-from ciall.utils.pos2par import pos2par
+from ciall.utils.pos2par import pos2par, pos2par_cache_info
+
+
+CURR_DIR = os.path.dirname(os.path.abspath(__file__))
+# The outputs of the hand-written conversion (before PAROLE_RULES), for all the single tags and pairs of tags
+# it checked, and for random sets of 3-6 tags
+GOLDEN_FILE = CURR_DIR + "/test_pos2par_golden.tsv"
 
 
 class TestPos2Par(unittest.TestCase):
@@ -91,4 +99,19 @@ class TestPos2Par(unittest.TestCase):
             lpt, spt, ut = pos2par(pos_tags)
             self.assertEqual(lpt, long_tag, "%s (long) == %s" % (lpt, long_tag))
             self.assertEqual(spt, short_tag, "%s (short) == %s" % (spt, short_tag))
-            self.assertEqual(ut, udep_tag, "%s (short) == %s" % (ut, udep_tag))
\ No newline at end of file
+            self.assertEqual(ut, udep_tag, "%s (short) == %s" % (ut, udep_tag))
+
+    def test_pos2par_cache(self):
+        # The order of the tags doesn't matter, so both orders share a cache entry
+        pos2par(["Noun", "Masc", "Gen", "Pl"])
+        info = pos2par_cache_info()
+        self.assertEqual(pos2par(["Pl", "Gen", "Masc", "Noun"]), ("Ncmpg", "Nc", "NOUN"))
+        self.assertEqual(pos2par_cache_info().hits, info.hits + 1)
+        self.assertEqual(pos2par_cache_info().misses, info.misses)
+
+    def test_pos2par_golden(self):
+        with open(GOLDEN_FILE, "r", newline="", encoding="utf-8") as fin:
+            rows = list(csv.reader(fin, delimiter="\t", quoting=csv.QUOTE_NONE))
+        self.assertEqual(rows[0], ["morph_tags", "par_long", "par_short", "udep"])
+        for pos_tags, long_tag, short_tag, udep_tag in rows[1:]:
+            self.assertEqual(pos2par(pos_tags.split()), (long_tag, short_tag, udep_tag), pos_tags)
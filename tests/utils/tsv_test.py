@@ -1,7 +1,10 @@
+import io
 import unittest
 import spacy
 
-from ciall.utils.tsv import doc_from_tuples, doc_from_tsv, output_tsv
+from ciall.utils import tsv
+from ciall.utils.tsv import doc_from_tuples, doc_from_tsv, docs_from_tsv_stream, output_tsv, TSVWriter
+from ciall.utils.morph_vocab import MORPH_VOCAB
 
 
 class TSVTest(unittest.TestCase):
@@ -67,6 +70,79 @@ class TSVTest(unittest.TestCase):
         self.assertEqual(sorted(doc[0]._.morph_tags), ["Neg", "PresInd", "VI", "Verb", ])
         self.assertEqual(sorted(doc[0]._.dep_tags), ["#1->0", "@FMV", "^Níl^"])
 
+    def test_doc_columns(self):
+        tuples = [
+            ("TOKEN", "LEMMA", "UPOS", "PAROLE", "MORPH_TAGS"),
+            ("Níl",   "bí",    "VERB", "Vmxx",   "Verb VI"   ),
+            ("Seán",  "Seán",  "PROPN", "Npxx",  "Noun Pers" ),
+        ]
+
+        nlp = spacy.blank("ga")
+        doc = doc_from_tuples(nlp, tuples)
+
+        # The input fields are stored as doc-level columns, which the token extensions read
+        self.assertEqual(doc._.par_long_column, ["Vmxx", "Npxx"])
+        self.assertEqual(doc._.par_short_column, ["Vm", "Np"])
+        self.assertEqual(doc._.morph_tags_column, [("Verb", "VI"), ("Noun", "Pers")])
+        self.assertIsNone(doc._.dep_tags_column)
+        self.assertEqual([token.pos_ for token in doc], ["VERB", "PROPN"])
+        self.assertEqual(doc[1]._.par_short, "Np")
+        self.assertEqual(doc[1]._.dep_tags, [])
+
+        # Setting a token extension sets its value in the column
+        doc[0]._.par_short = "Vx"
+        self.assertEqual(doc._.par_short_column, ["Vx", "Np"])
+        doc[1]._.dep_tags = ["@SUBJ"]
+        self.assertEqual(doc._.dep_tags_column, [[], ["@SUBJ"]])
+
+        # The morphological tags are also kept as bitmasks, which are worked out again when the tags are set
+        pers = MORPH_VOCAB.intern("Pers")
+        self.assertEqual([token._.morph_mask & pers for token in doc], [0, pers])
+        doc[0]._.morph_tags = ["Noun", "Pers"]
+        self.assertIsNone(doc._.morph_mask_column)
+        self.assertEqual(doc[0]._.morph_mask, doc[1]._.morph_mask)
+
+    def test_docs_from_tsv_stream(self):
+        tsv = "TOKEN\tLEMMA\tPAROLE\n" \
+              "Níl\tbí\tVmxx\n" \
+              "aon\taon\tDqxx\n" \
+              "\n" \
+              "\n" \
+              "móra\tmór\tAqxx\n" \
+              ".\t.\tFxx\n"
+
+        nlp = spacy.blank("ga")
+        docs = list(docs_from_tsv_stream(nlp, io.StringIO(tsv)))
+        self.assertEqual([[token.text for token in doc] for doc in docs], [["Níl", "aon", "móra", "."]])
+
+        # Blank lines separate documents
+        docs = list(docs_from_tsv_stream(nlp, io.StringIO(tsv), doc_boundary="blank"))
+        self.assertEqual([[token.text for token in doc] for doc in docs], [["Níl", "aon"], ["móra", "."]])
+        self.assertEqual(docs[1][0].lemma_, "mór")
+        self.assertEqual(docs[1][0]._.par_short, "Aq")
+
+        # <doc> markers separate documents
+        tsv = "<doc id=\"1\">\n" \
+              "Níl\tbí\tVmxx\n" \
+              "</doc>\n" \
+              "<doc id=\"2\">\n" \
+              "aon\taon\tDqxx\n" \
+              "\n" \
+              "móra\tmór\tAqxx\n" \
+              "</doc>\n"
+        docs = list(docs_from_tsv_stream(nlp, io.StringIO(tsv), fields=["TOKEN", "LEMMA", "PAROLE"],
+                                         doc_boundary="doc_tag"))
+        self.assertEqual([[token.text for token in doc] for doc in docs], [["Níl"], ["aon", "móra"]])
+
+        # Documents are read one at a time
+        lines = iter(tsv.splitlines(keepends=True))
+        docs = docs_from_tsv_stream(nlp, lines, fields=["TOKEN", "LEMMA", "PAROLE"], doc_boundary="doc_tag")
+        next(docs)
+        self.assertEqual(next(lines), "<doc id=\"2\">\n")
+
+        with self.assertRaises(TypeError):
+            list(docs_from_tsv_stream(nlp, io.StringIO(tsv), doc_boundary="sentence"))
+
     def test_doc_from_tsv(self):
         tsv = "TOKEN\tLEMMA\tPAROLE\n" \
               "Níl\tbí\tVmxx\n" \
@@ -117,4 +193,38 @@ class TSVTest(unittest.TestCase):
         doc = doc_from_tsv(nlp, intsv)
         outtsv = output_tsv(doc, ['TOKEN', 'LEMMA', 'PAROLE'])
 
-        self.assertEqual(intsv, outtsv)
\ No newline at end of file
+        self.assertEqual(intsv, outtsv)
+
+    def test_tsv_writer(self):
+        intsv = "TOKEN\tLEMMA\tPAROLE\tMORPH_TAGS\n" \
+                "Níl\tbí\tVmxx\tVerb VI\n" \
+                "aon\taon\tDqxx\tDet\n" \
+                "móra\tmór\tAqxx\tAdj\n"
+
+        nlp = spacy.blank("ga")
+        doc = doc_from_tsv(nlp, intsv)
+
+        class Output(io.StringIO):
+            num_writes = 0
+
+            def write(self, s):
+                self.num_writes += 1
+                return super().write(s)
+
+        writer = TSVWriter(["ID", "PAR_SHORT", "MORPH_TAGS"])
+        chunk_size = tsv.WRITE_CHUNK_SIZE
+        try:
+            tsv.WRITE_CHUNK_SIZE = 2
+            outstr = Output()
+            writer.write(doc, outstr)
+        finally:
+            tsv.WRITE_CHUNK_SIZE = chunk_size
+        self.assertEqual(outstr.getvalue(), "ID\tPAR_SHORT\tMORPH_TAGS\n"
+                                            "1\tVm\tVerb,VI\n"
+                                            "2\tDq\tDet\n"
+                                            "3\tAq\tAdj\n")
+        # The header, then the rows in chunks
+        self.assertEqual(outstr.num_writes, 3)
+
+        with self.assertRaises(TypeError):
+            TSVWriter(["TOKEN", "FOO"])